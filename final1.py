@@ -1,55 +1,124 @@
 import streamlit as st
-import numpy as np
-import pandas as pd
-import plotly.express as px
-import json
-import requests
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 import base64
-import plotly.graph_objects as go
+import os
 
-# Função para usar imagem no cabeçalho
+import plotly.io as pio
+
+from painel import (calculos, clusterizacao, correlacao, cubo, dados, figuras, geometria,
+                    instrumentacao, pacote, populacao, previsao, sazonalidade)
+from painel.cache_compartilhado import CacheCompartilhado
+from painel.cache_figuras import CacheFiguras
+
+# Função para usar imagem no cabeçalho (codificada uma vez por processo)
+@st.cache_resource
 def get_base64_image(image_path):
     with open(image_path, "rb") as img_file:
         return base64.b64encode(img_file.read()).decode()
 
-img_base64 = get_base64_image("logo mosquito.png")
-    
+# Instrumentação: ?depurar=1 na URL mostra o tempo e a CPU de cada seção na
+# barra lateral; ?perfil=1 grava um cProfile do rerun completo. Com
+# PAINEL_LOG_DESEMPENHO definida, todas as sessões são medidas, com memória.
+depurar = st.query_params.get("depurar") == "1"
+if depurar or instrumentacao.log_ativo():
+    if "medidor_desempenho" not in st.session_state:
+        st.session_state["medidor_desempenho"] = instrumentacao.Medidor()
+    medidor = st.session_state["medidor_desempenho"]
+else:
+    medidor = instrumentacao.medidor_inativo
+perfil = instrumentacao.Perfil().iniciar() if st.query_params.get("perfil") == "1" else None
+
+img_base64 = medidor.medir("carregamento: logo", get_base64_image, "logo mosquito.png")
     
-# Carrega o dataset
-df = pd.read_csv('dataset_unificado_processado.csv')
-
-# Dados de população dos estados do Sudeste por ano (fonte: IBGE)
-populacao_estados_ano = {
-    "ES": {2017: 4016356, 2018: 3972388},
-    "MG": {2017: 21119536, 2018: 21040662},
-    "RJ": {2017: 16718956, 2018: 17159960},
-    "SP": {2017: 45094866, 2018: 45538936}
-}
-
-# Obtendo o GeoJSON do Brasil
-url_geojson = "https://raw.githubusercontent.com/codeforamerica/click_that_hood/master/public/data/brazil-states.geojson"
-geojson_data = requests.get(url_geojson).json()
-
-# Filtra para manter apenas os estados do Sudeste
-sudeste_states = ["Espírito Santo", "Minas Gerais", "Rio de Janeiro", "São Paulo"]
-sudeste_geojson = {
-    "type": "FeatureCollection",
-    "features": [f for f in geojson_data["features"] if f["properties"]["name"] in sudeste_states]
-}
-
-# Mapeia nomes completos para siglas
-mapa_estados = {
-    "Espírito Santo": "ES",
-    "Minas Gerais": "MG",
-    "Rio de Janeiro": "RJ",
-    "São Paulo": "SP"
-}
-for feature in sudeste_geojson["features"]:
-    feature["id"] = mapa_estados[feature["properties"]["name"]]
     
+# Versão atual dos dados: muda quando meses novos são anexados
+# (python -m painel.incremental), o que invalida os caches abaixo
+versao = medidor.medir("carregamento: versão dos dados", dados.versao_dados)
+
+# Dados, modelos e agregados num cache do processo, compartilhado por todas as
+# sessões: cada chave é construída uma vez (as sessões que chegam durante a
+# construção esperam por ela), com tempo de vida e limite de memória
+# (PAINEL_CACHE_TTL, PAINEL_CACHE_MB). Versões antigas dos dados expiram.
+@st.cache_resource
+def obter_cache_dados():
+    return CacheCompartilhado()
+
+cache_dados = obter_cache_dados()
+
+# Carrega o dataset a partir do arquivo colunar (tipos compactos, memory-map)
+def carregar_dataset(versao):
+    return cache_dados.obter("dataset", versao, dados.carregar_dados)
+
+# Cubo pré-agregado (estado, ano, mês) usado por todos os gráficos filtrados
+def obter_cubo(versao):
+    return cache_dados.obter(
+        "cubo", versao, lambda: cubo.carregar_ou_construir(versao, lambda: carregar_dataset(versao))
+    )
+
+cubo_dados = medidor.medir("carregamento: cubo", obter_cubo, versao)
+
+MESES = calculos.MESES
+
+# População dos estados por ano (fonte: IBGE), indexada por (estado, ano)
+def carregar_tabela_populacao():
+    return cache_dados.obter("populacao", None, populacao.carregar_populacao)
+
+tabela_populacao = medidor.medir("carregamento: população", carregar_tabela_populacao)
+
+# Séries mensais por estado com a decomposição sazonal e as estatísticas de
+# normalização, montadas do cubo uma vez por versão dos dados
+def obter_sazonalidade(versao):
+    return cache_dados.obter(
+        "sazonalidade", versao, lambda: sazonalidade.carregar_ou_construir(versao, obter_cubo(versao))
+    )
+
+# Modelos de previsão de casos por estado (salvos em disco; ajustados neste
+# processo só se ainda não existirem para a versão dos dados)
+def obter_previsoes(versao):
+    return cache_dados.obter("previsao", versao, lambda: previsao.carregar_ou_ajustar(
+        obter_sazonalidade(versao), chave_dados=versao, max_workers=1
+    ))
+
+# Geometria dos estados (artefato simplificado, servido em app/static/): as
+# figuras do mapa levam só a URL e o navegador baixa os contornos uma vez.
+# Sem o artefato e sem rede a URL é None; a chave muda quando o artefato
+# aparece (python -m painel.geometria), sem esperar o cache expirar.
+def obter_url_geometria():
+    existe = os.path.exists(geometria.caminho_geometria("brasil"))
+    return cache_dados.obter("geometria", ("brasil", existe), lambda: geometria.url_geometria("brasil"))
+
+url_geometria = medidor.medir("carregamento: geometria", obter_url_geometria)
+
+# Figuras já montadas, compartilhadas entre sessões e reruns.
+# A chave é o tipo da figura + a parte da seleção da qual ela depende.
+@st.cache_resource
+def obter_cache_figuras():
+    return CacheFiguras()
+
+cache_figuras = obter_cache_figuras()
+
+# Pacote estático (python -m painel.pacote): figuras de todas as seleções com
+# o ano inteiro, lidas do arquivo quando o manifesto é desta versão dos dados.
+# Relido a cada minuto, para pegar um pacote gerado com o painel no ar.
+def obter_manifesto_pacote(versao):
+    return cache_dados.obter("pacote", versao, lambda: pacote.carregar_manifesto(versao), ttl_segundos=60)
+
+manifesto_pacote = medidor.medir("carregamento: pacote", obter_manifesto_pacote, versao)
+
+# Figura do cache; na falta, lida do pacote ou montada. Medida como uma seção
+def obter_figura(tipo, selecao, construir):
+    def montar():
+        figura_json = pacote.ler_figura(manifesto_pacote, tipo, selecao)
+        if figura_json is None:
+            return construir()
+        figura = pio.from_json(figura_json)
+        if tipo == "mapa":
+            # No pacote o mapa aponta para a cópia da geometria ao lado do manifesto
+            figura.update_traces(geojson=url_geometria)
+        return figura
+
+    with medidor.secao(f"figura: {tipo}"):
+        return cache_figuras.obter(tipo, selecao, montar)
+
 # Configura a página para usar largura total
 st.set_page_config(layout="wide") 
 
@@ -77,810 +146,592 @@ st.markdown(f"""
         <img src='data:image/png;base64,{img_base64}' width='150' style='margin-right: 15px;'>
         <div>
             <h1 style='font-size: 40px; font-weight: bold; margin-bottom: 0px;'>Ciclo Viral: Associando a Febre Amarela ao Clima no Sudeste</h1>
-            <h3 style='font-size: 24px; font-weight: normal; margin-top: 0px; line-height: 1.2;'>Uma análise dos casos entre 2017 e 2018 e sua relação com fatores climáticos</h3>
+            <h3 style='font-size: 24px; font-weight: normal; margin-top: 0px; line-height: 1.2;'>Uma análise dos casos entre {cubo_dados['anos'][0]} e {cubo_dados['anos'][-1]} e sua relação com fatores climáticos</h3>
         </div>
     </div>
 """, unsafe_allow_html=True)
 
 st.markdown("<br>", unsafe_allow_html=True)
 
+# Cada seção abaixo é um fragmento: um widget dentro dela reexecuta só a
+# própria seção, com as entradas recebidas como argumentos na última execução
+# completa. Os filtros reexecutam as linhas 1 a 4 (não a clusterização) e o
+# fator climático reexecuta só as linhas 3 e 4.
+
 # ------------------------------------------------------------------------------
-# PRIMEIRA LINHA: Seleção de Ano e de Estado | Mapa do Sudeste | Proporção de casos | Resumo Geral
-with st.container():
-    colA1, colA2, colA3, colA4 = st.columns([2, 4, 3, 2])
-
-    # COLUNA A1: Seleção de dados para análise
-    with colA1:
-        # Título principal
-        st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Seleção de dados para análise</h2>", unsafe_allow_html=True)
-        st.markdown("""
-    
-        """, unsafe_allow_html=True)
-        st.text("")
-
-        # Seção de Anos
-        st.markdown("<h4 style='color: white;'>Anos</h4>", unsafe_allow_html=True)
-        col1, col2 = st.columns(2)
-        with col1:
-            ano_2017 = st.checkbox("2017", value=True)
-        with col2:
-            ano_2018 = st.checkbox("2018", value=True)
-
-        # Espaçamento
-        st.markdown("<br>", unsafe_allow_html=True)
-
-        # Seção de Estados
-        st.markdown("<h4 style='color: white;'>Estados</h4>", unsafe_allow_html=True)
-        col1, col2 = st.columns(2)
-        with col1:
-            estado_es = st.checkbox("ES", value=True)
-            estado_rj = st.checkbox("RJ", value=True)
-        with col2:
-            estado_mg = st.checkbox("MG", value=True)
-            estado_sp = st.checkbox("SP", value=True)
-
-        # Processamento das seleções
-        anos_selecionados = [ano for ano, ativo in [("2017", ano_2017), ("2018", ano_2018)] if ativo] or ["2017", "2018"]
-        estados_selecionados = [
-            estado for estado, ativo in [("ES", estado_es), ("MG", estado_mg), ("RJ", estado_rj), ("SP", estado_sp)] if ativo
-        ] or ["ES", "MG", "RJ", "SP"]
-        
-        # Texto dinâmico com o resumo das seleções
-        texto_estados = ", ".join(estados_selecionados)
-        texto_anos = " e ".join(anos_selecionados) if len(anos_selecionados) == 2 else anos_selecionados[0]
-        texto_resumo = f"<p style='color: rgba(255, 255, 255, 0.7); font-size: 16px; text-align: center;'>Exibindo dados de: <strong>{texto_estados}</strong> entre <strong>{texto_anos}</strong></p>"
-        st.markdown(texto_resumo, unsafe_allow_html=True)
-
-        # Filtragem dos dados
-        df_filtrado = df[df["ANO_IS"].astype(str).isin(anos_selecionados) & df["ESTADO"].isin(estados_selecionados)]
-
-        df_filtrado["POPULACAO"] = df_filtrado.apply(
-            lambda row: populacao_estados_ano[row["ESTADO"]][row["ANO_IS"]], axis=1
-        )
+# PRIMEIRA LINHA: Seleção de Ano e de Estado | Mapa dos estados | Proporção de casos | Resumo Geral
+@st.fragment
+def secao_filtrada(versao, cubo_dados):
+    with st.container():
+        colA1, colA2, colA3, colA4 = st.columns([2, 4, 3, 2])
+
+        # COLUNA A1: Seleção de dados para análise
+        with colA1, medidor.secao("A1: seleção e filtragem"):
+            # Título principal
+            st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Seleção de dados para análise</h2>", unsafe_allow_html=True)
+            st.markdown("""
+
+            """, unsafe_allow_html=True)
+            st.text("")
 
-    # COLUNA A2: Gráfico de Mapa do Sudeste
-with colA2:
-    st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Visualização dos estados selecionados no Sudeste</h2>", unsafe_allow_html=True)
+            # Seção de Anos (opções vindas dos próprios dados)
+            st.markdown("<h4 style='color: white;'>Anos</h4>", unsafe_allow_html=True)
+            colunas_anos = st.columns(2)
+            anos_marcados = []
+            for i, ano in enumerate(cubo_dados["anos"]):
+                with colunas_anos[i % 2]:
+                    if st.checkbox(str(ano), value=True):
+                        anos_marcados.append(ano)
+
+            # Intervalo de meses dentro de cada ano
+            mes_inicio_nome, mes_fim_nome = st.select_slider(
+                "Meses",
+                options=MESES,
+                value=(MESES[0], MESES[-1]),
+                key="intervalo_meses"
+            )
+            mes_inicio = MESES.index(mes_inicio_nome) + 1
+            mes_fim = MESES.index(mes_fim_nome) + 1
+
+            # Espaçamento
+            st.markdown("<br>", unsafe_allow_html=True)
+
+            # Seção de Estados
+            st.markdown("<h4 style='color: white;'>Estados</h4>", unsafe_allow_html=True)
+            colunas_estados = st.columns(2)
+            estados_marcados = []
+            for i, estado in enumerate(cubo_dados["estados"]):
+                with colunas_estados[i % 2]:
+                    if st.checkbox(estado, value=True):
+                        estados_marcados.append(estado)
+
+            # Processamento das seleções (nada marcado = tudo)
+            anos_selecionados = anos_marcados or cubo_dados["anos"]
+            estados_selecionados = estados_marcados or cubo_dados["estados"]
+
+            # Texto dinâmico com o resumo das seleções
+            texto_estados = ", ".join(estados_selecionados)
+            nomes_anos = [str(ano) for ano in anos_selecionados]
+            texto_anos = " e ".join([", ".join(nomes_anos[:-1]), nomes_anos[-1]]) if len(nomes_anos) > 1 else nomes_anos[0]
+            if (mes_inicio, mes_fim) != (1, 12):
+                texto_anos += f" ({mes_inicio_nome} a {mes_fim_nome})"
+            texto_resumo = f"<p style='color: rgba(255, 255, 255, 0.7); font-size: 16px; text-align: center;'>Exibindo dados de: <strong>{texto_estados}</strong> entre <strong>{texto_anos}</strong></p>"
+            st.markdown(texto_resumo, unsafe_allow_html=True)
+
+            # Filtragem dos dados: busca binária no eixo de períodos + bitmaps de estados
+            fatias = calculos.filtrar(cubo_dados, estados_selecionados, anos_selecionados, mes_inicio, mes_fim)
+
+            # Uma linha por (estado, ano, mês) do recorte, com as médias climáticas e a população
+            df_filtrado = calculos.tabela_filtrada(fatias, tabela_populacao)
+
+            # Parte da chave do cache de figuras comum aos gráficos filtrados
+            selecao = {
+                "versao": versao,
+                "estados": estados_selecionados,
+                "anos": anos_selecionados,
+                "meses": (mes_inicio, mes_fim),
+            }
+
+        # COLUNA A2: Mapa dos estados (incidência, letalidade ou casos)
+        with colA2, medidor.secao("A2: mapa"):
+            st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Febre amarela nos estados selecionados</h2>", unsafe_allow_html=True)
+
+            # Incidência (população do IBGE), letalidade ou casos de cada estado no recorte
+            metrica_mapa = st.radio(
+                "Métrica do mapa",
+                list(calculos.METRICAS_MAPA),
+                horizontal=True,
+                key="metrica_mapa",
+                label_visibility="collapsed"
+            )
 
-    df_mapa = pd.DataFrame({"ESTADO": ["ES", "MG", "RJ", "SP"]})
-    df_mapa["Selecionado"] = df_mapa["ESTADO"].apply(
-        lambda x: "Selecionado" if x in estados_selecionados else "Não Selecionado"
-    )
+            def montar_fig_mapa():
+                df_metricas = calculos.metricas_por_estado(fatias, tabela_populacao)
+                return figuras.mapa_metrica(df_metricas, metrica_mapa, url_geometria)
 
-    fig_mapa = px.choropleth(
-        df_mapa,
-        geojson=sudeste_geojson,
-        locations="ESTADO",
-        featureidkey="id",
-        color="Selecionado",
-        color_discrete_map={"Selecionado": "#FCDB04", "Não Selecionado": "#696969"},
-        hover_data={"ESTADO": True, "Selecionado": False} 
-    )
+            st.text("")
+            if url_geometria is None:
+                st.info("Mapa indisponível: a geometria dos estados ainda não foi gerada. "
+                        "Rode `python -m painel.geometria` (precisa de internet uma vez).")
+            else:
+                fig_mapa = obter_figura("mapa", {**selecao, "metrica": metrica_mapa}, montar_fig_mapa)
+                st.plotly_chart(fig_mapa, use_container_width=True, key="mapa_1")
+
+        # COLUNA A3: Proporção de casos 
+        with colA3, medidor.secao("A3: proporção de casos"):
+            st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Proporção de casos por estado</h2>", unsafe_allow_html=True)
+            def montar_fig_pizza():
+                return figuras.pizza_estados(calculos.casos_por_estado(fatias))
+
+            fig_pizza = obter_figura("pizza_estados", selecao, montar_fig_pizza)
+            st.plotly_chart(fig_pizza, use_container_width=True)
+
+
+        # COLUNA A4: Resumo Geral
+        with colA4, medidor.secao("A4: resumo geral"):
+            # st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Resumo Geral</h2>", unsafe_allow_html=True)
+            totais = calculos.totais(fatias)
+            total_casos = totais["casos"]
+            total_obitos = totais["obitos"]
+            taxa_letalidade = totais["letalidade"]
+
+            kpi_style = """
+                    <style>
+                        .kpi-container {
+                            background-color:#003366;
+                            color: white;
+                            text-align: center;
+                            padding: 10px;
+                            border-radius: 10px;
+                            font-size: 26px;
+                            margin-bottom: 25px;
+                        }
+                    </style>
+                """
+            st.markdown(kpi_style, unsafe_allow_html=True)
+            st.text("")
+            st.text("")
+            st.text("")
+            st.text("")
+            kpi_html = f"""
+                <div class="kpi-container"><strong>Casos Totais</strong><br>{total_casos:,}</div>
+                <div class="kpi-container"><strong>Óbitos Totais</strong><br>{total_obitos:,}</div>
+                <div class="kpi-container"><strong>Taxa de letalidade</strong><br>{taxa_letalidade:.2f}%</div>
+            """
+            st.markdown(kpi_html, unsafe_allow_html=True)
 
-    fig_mapa.update_geos(fitbounds="locations", visible=False)
-
-    # Ajusta o layout para ocupar a largura da coluna e melhora a legenda
-    fig_mapa.update_layout(
-        width=600,  
-        height=350, 
-        dragmode=False,
-        geo=dict(bgcolor='#0E1117'),  
-        paper_bgcolor="#0E1117",  
-        plot_bgcolor="#0E1117",  
-        coloraxis_showscale=False,
-        margin={"r":0,"t":30,"l":0,"b":0},  
-        legend=dict(
-            x=0.02,  
-            y=0.02,  
-            bgcolor="#0E1117",  
-            bordercolor="#0E1117",
-            borderwidth=1,
-            font=dict(color="white")  # Deixa a legenda branca
-        ),
-        modebar_remove=["zoom", "pan", "zoomInGeo", "zoomOutGeo", "resetGeo"]
-    )
-    st.text("")
-    st.text("")
-    st.text("")
-    st.plotly_chart(fig_mapa, use_container_width=True, key="mapa_1")
-
-    # COLUNA A3: Proporção de casos 
-    with colA3:
-        st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Proporção de casos por estado</h2>", unsafe_allow_html=True)
-        df_casos_estado = df_filtrado.groupby("ESTADO")["Casos_Total"].sum().reset_index()
-        fig_pizza = px.pie(
-        df_casos_estado,
-            values="Casos_Total",
-            names="ESTADO",
-            color="ESTADO",
-            color_discrete_map={
-                "ES": "#003366",
-                "MG": "#FCDB04",
-                "RJ": "#0068c9",
-                "SP": "#83c9ff"
-    }
-        )
-        fig_pizza.update_traces(hovertemplate="%{value} casos em %{label}")
-        fig_pizza.update_layout(
-            paper_bgcolor="#0E1117",
-            plot_bgcolor="#0E1117",
-            font=dict(color="white"),  
-            legend=dict(
-                font=dict(color="white")  # Deixa os nomes dos estados na legenda brancos
+
+    # ------------------------------------------------------------------------------
+    # SEGUNDA LINHA: Número de Casos e Óbitos por Estado | Evolução Temporal de Casos de Febre Amarela
+    with st.container(), medidor.secao("B: casos e óbitos por estado e por mês"):
+        colB1, colB2 = st.columns([ 5, 5])
+        # COLUNA B1: Número de Casos e Óbitos por Estado
+        with colB1:
+            st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Número de casos e óbitos por febre amarela por estado</h2>", unsafe_allow_html=True)
+            st.text("")
+            st.text("")
+            def montar_fig_bar():
+                return figuras.barras_estados(calculos.casos_por_estado(fatias))
+
+            fig_bar = obter_figura("barras_estados", selecao, montar_fig_bar)
+            st.plotly_chart(fig_bar, use_container_width=True)
+
+        # COLUNA B2: Evolução Temporal de Casos de Febre Amarela
+        with colB2:
+            st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Evolução mensal dos casos de febre amarela por ano</h2>", unsafe_allow_html=True)
+            # Meses previstos a partir do último mês com dados (modelos salvos, sem reajuste)
+            horizonte = st.select_slider(
+                "Meses de previsão",
+                options=list(range(1, previsao.HIPERPARAMETROS_PADRAO["horizonte"] + 1)),
+                value=previsao.HIPERPARAMETROS_PADRAO["horizonte"],
+                key="horizonte_previsao"
             )
-        )
-        st.plotly_chart(fig_pizza, use_container_width=True)
-        
-        
-    # COLUNA A4: Resumo Geral
-    with colA4:
-        # st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Resumo Geral</h2>", unsafe_allow_html=True)
-        total_casos = df_filtrado["Casos_Total"].sum()
-        total_obitos = df_filtrado["Obitos_Total"].sum()
-        taxa_letalidade = (total_obitos / total_casos) * 100 if total_casos > 0 else 0
-
-        kpi_style = """
-                <style>
-                    .kpi-container {
-                        background-color:#003366;
-                        color: white;
-                        text-align: center;
-                        padding: 10px;
-                        border-radius: 10px;
-                        font-size: 26px;
-                        margin-bottom: 25px;
-                    }
-                </style>
-            """
-        st.markdown(kpi_style, unsafe_allow_html=True)
-        st.text("")
-        st.text("")
-        st.text("")
-        st.text("")
-        kpi_html = f"""
-            <div class="kpi-container"><strong>Casos Totais</strong><br>{total_casos:,}</div>
-            <div class="kpi-container"><strong>Óbitos Totais</strong><br>{total_obitos:,}</div>
-            <div class="kpi-container"><strong>Taxa de letalidade</strong><br>{taxa_letalidade:.2f}%</div>
-        """
-        st.markdown(kpi_html, unsafe_allow_html=True)
-        
 
-# ------------------------------------------------------------------------------
-# SEGUNDA LINHA: Número de Casos e Óbitos por Estado | Evolução Temporal de Casos de Febre Amarela
-with st.container():
-    colB1, colB2 = st.columns([ 5, 5])
-    # COLUNA B1: Número de Casos e Óbitos por Estado
-    with colB1:
-        st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Número de casos e óbitos por febre amarela por estado</h2>", unsafe_allow_html=True)
-        st.text("")
-        st.text("")
-        df_estados = df_filtrado.groupby("ESTADO").agg({
-            "Casos_Total": "sum",
-            "Obitos_Total": "sum"
-        }).reset_index()
-        fig_bar = px.bar(
-            df_estados,
-            x="ESTADO",
-            y=["Casos_Total", "Obitos_Total"],
-            barmode='group',
-            labels={"value": "Número de Casos e de Mortes", "variable": "Tipo"}
-        )
-        fig_bar.update_traces(
-            hovertemplate="%{y} %{data.name}<extra></extra>"
-        ).for_each_trace(lambda t: t.update(
-            name=t.name.replace("Casos_Total", "Casos").replace("Obitos_Total", "Óbitos")
-        ))
-        fig_bar.update_traces(hovertemplate="%{y} %{data.name} em %{x}")
-        fig_bar.update_layout(
-                    paper_bgcolor="#0E1117",
-                    plot_bgcolor="#0E1117",
-                    font=dict(color="white"),
-                    legend=dict(
-                        font=dict(color="white")  # Deixa os rótulos da legenda em branco
-                    )
+            def montar_fig_evolucao():
+                df_previsao = calculos.previsao_mensal(
+                    obter_previsoes(versao), obter_sazonalidade(versao),
+                    selecao["estados"], horizonte, *selecao["meses"]
                 )
-        st.plotly_chart(fig_bar, use_container_width=True)
-
-    # COLUNA B2: Evolução Temporal de Casos de Febre Amarela
-    with colB2:
-        st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Evolução mensal dos casos de febre amarela por ano</h2>", unsafe_allow_html=True)
-        st.text("")
-        st.text("")
-        df_evolucao = df_filtrado.groupby(["ANO_IS", "MES_IS"]).agg({"Casos_Total": "sum"}).reset_index()
-
-        fig_evolucao = px.line(
-        df_evolucao,
-        x="MES_IS",
-        y="Casos_Total",
-        color="ANO_IS",
-        labels={"MES_IS": "Mês", "Casos_Total": "Número de casos por mês"},
-        )
-        fig_evolucao.update_xaxes(
-            tickvals=list(range(1, 13)),
-            ticktext=["Jan", "Fev", "Mar", "Abr", "Mai", "Jun",
-                        "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
-        )
-        fig_evolucao.update_traces(
-            hovertemplate="%{y} casos em %{x}/%{data.name}<extra></extra>"
-        )
-        fig_evolucao.update_layout(
-            paper_bgcolor="#0E1117",
-            plot_bgcolor="#0E1117",
-            font=dict(color="white"),
-            legend=dict(
-                font=dict(color="white")  # Deixa os rótulos da legenda em branco
+                return figuras.evolucao_casos(calculos.agregar_mensal(fatias), df_previsao)
+
+            fig_evolucao = obter_figura(
+                "evolucao_casos", {**selecao, "horizonte": horizonte}, montar_fig_evolucao
             )
-        )
-        st.text("")
-        st.plotly_chart(fig_evolucao, use_container_width=True)
-        
-        
+            st.plotly_chart(fig_evolucao, use_container_width=True)
+
+
+    secao_climatica(versao, fatias, df_filtrado, selecao, anos_selecionados)
+
+
 # ------------------------------------------------------------------------------
 # TERCEIRA LINHA: Seletor de Fator Climático | Correlação entre Casos Totais e Fatores Climáticos | Evolução Temporal de um Fator Climático
-with st.container():
-    colC1, colC2, colC3 = st.columns([2, 4, 6])
-
-    # COLUNA C1: Seletor de fator climático geral
-    with colC1:
-        st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Seleção de fator climático para analíse</h2>", unsafe_allow_html=True)
-        
-
-        opcoes_climaticas_disp = {
-            "Temperatura": "TEMPERATURA DO AR - BULBO SECO, HORARIA (°C)",
-            "Precipitação": "PRECIPITAÇÃO TOTAL, HORÁRIO (mm)",
-            "Radiação": "RADIACAO GLOBAL (Kj/m²)",
-            "Pressão": "PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO, HORARIA (mB)"
-        }
+@st.fragment
+def secao_climatica(versao, fatias, df_filtrado, selecao, anos_selecionados):
+    with st.container(), medidor.secao("C: fator climático"):
+        colC1, colC2, colC3 = st.columns([2, 4, 6])
 
-        unidades_climaticas_disp = {
-            "Temperatura": "Temperatura média (°C)",
-            "Precipitação": "Precipitação total (mm)",
-            "Radiação": "Radiação global (Kj/m²)",
-            "Pressão": "Pressão atmosférica (mB)"
-        }
-        
-        var_selecionada = st.radio(
-            label="",
-            options=list(opcoes_climaticas_disp.keys()),
-            index=0,
-            key="fator_climatico_radio"
-        )
-        # Texto dinâmico com o resumo da seleção do fator climático
-        texto_fator_climatico = f"""
-        <p style='color: rgba(255, 255, 255, 0.7); font-size: 16px; text-align: center;'>
-        <strong>{var_selecionada}</strong><br> é o 
-        fator influencia diretamente os dois gráficos ao lado e o gráfico abaixo.
-        </p>
-        """
-        st.markdown(texto_fator_climatico, unsafe_allow_html=True)
-        
-
-    # COLUNA C2: Correlação entre Casos Totais e Fatores Climáticos
-    with colC2:
-        st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Correlação entre casos totais e fatores climáticos</h2>", unsafe_allow_html=True)
-
-        fig_dispersao = px.scatter(
-            df_filtrado,
-            x=opcoes_climaticas_disp[var_selecionada],
-            y="Casos_Total",
-            labels={
-                opcoes_climaticas_disp[var_selecionada]: unidades_climaticas_disp[var_selecionada],
-                "Casos_Total": "Casos Totais"
-            },
-        )
+        # COLUNA C1: Seletor de fator climático geral
+        with colC1:
+            st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Seleção de fator climático para analíse</h2>", unsafe_allow_html=True)
 
-        df_filtrado["Data_Formatada"] = df_filtrado["MES_IS"].map({
-            1: "Jan", 2: "Fev", 3: "Mar", 4: "Abr", 5: "Mai", 6: "Jun",
-            7: "Jul", 8: "Ago", 9: "Set", 10: "Out", 11: "Nov", 12: "Dez"
-        }) + "/" + df_filtrado["ANO_IS"].astype(str)
-
-        fig_dispersao.update_traces(
-            hovertemplate=(
-                "Estado = %{customdata[0]}<br>"
-                "Data = %{customdata[1]}<br>"
-                "%{xaxis.title.text} = %{x:.2f}<br>"
-                "Casos Totais = %{y:.2f}<extra></extra>"
-            ),
-            customdata=df_filtrado[["ESTADO", "Data_Formatada"]]
-        )
-        fig_dispersao.update_layout(
-            paper_bgcolor="#0E1117",
-            plot_bgcolor="#0E1117",
-            font=dict(color="white"),
-            legend=dict(
-                font=dict(color="white")
-            )
-        )
 
-        st.plotly_chart(fig_dispersao, use_container_width=True)
+            var_selecionada = st.radio(
+                label="",
+                options=list(calculos.OPCOES_CLIMATICAS),
+                index=0,
+                key="fator_climatico_radio"
+            )
+            # Texto dinâmico com o resumo da seleção do fator climático
+            texto_fator_climatico = f"""
+            <p style='color: rgba(255, 255, 255, 0.7); font-size: 16px; text-align: center;'>
+            <strong>{var_selecionada}</strong><br> é o 
+            fator influencia diretamente os dois gráficos ao lado e o gráfico abaixo.
+            </p>
+            """
+            st.markdown(texto_fator_climatico, unsafe_allow_html=True)
 
 
-        # COLUNA C3: Evolução Temporal de um Fator Climático
-        with colC3:
-            st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Evolução mensal dos fatores climáticos por ano</h2>", unsafe_allow_html=True)
+        # COLUNA C2: Correlação entre Casos Totais e Fatores Climáticos
+        with colC2:
+            st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Correlação entre casos totais e fatores climáticos</h2>", unsafe_allow_html=True)
 
-            df_climatico = df_filtrado.groupby(["ANO_IS", "MES_IS"]).agg({
-                opcoes_climaticas_disp[var_selecionada]: "mean"
-            }).reset_index()
+            def montar_fig_dispersao():
+                return figuras.dispersao_clima(df_filtrado, var_selecionada)
 
-            df_climatico = df_climatico.rename(
-                columns={opcoes_climaticas_disp[var_selecionada]: var_selecionada}
+            fig_dispersao = obter_figura(
+                "dispersao", {**selecao, "variavel": var_selecionada}, montar_fig_dispersao
             )
+            st.plotly_chart(fig_dispersao, use_container_width=True)
 
-            fig_climatico = px.line(
-                df_climatico,
-                x="MES_IS",
-                y=var_selecionada,
-                color="ANO_IS",
-                labels={
-                    "MES_IS": "Mês",
-                    var_selecionada: unidades_climaticas_disp[var_selecionada],
-                    "ANO_IS": "Ano"
-                },
-            )
-            fig_climatico.update_xaxes(
-                tickvals=list(range(1, 13)),
-                ticktext=["Jan", "Fev", "Mar", "Abr", "Mai", "Jun",
-                        "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
-            )
-            fig_climatico.update_traces(
-                hovertemplate="%{y:.2f} em %{x}/%{data.name}<extra></extra>"
-            )
-            fig_climatico.update_layout(
-                paper_bgcolor="#0E1117",
-                plot_bgcolor="#0E1117",
-                font=dict(color="white"),
-                legend=dict(
-                    font=dict(color="white")
-                )
-            )
-            st.text("")
-            st.plotly_chart(fig_climatico, use_container_width=True)
 
+            # COLUNA C3: Evolução Temporal de um Fator Climático
+            with colC3:
+                st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Evolução mensal dos fatores climáticos por ano</h2>", unsafe_allow_html=True)
 
-# ------------------------------------------------------------------------------
-# QUARTA LINHA: Linha Evol. Temporal de Casos, Óbitos e Fatores Climáticos Normalizada
-with st.container():
-    st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Evolução mensal de um fator climático em comparação com o número de casos e de óbitos por febre amarela</h2>", unsafe_allow_html=True)
-    
-    # *Normalização dos dados*
-    scaler = MinMaxScaler()
-    colunas_normalizar = [
-        "Casos_Total", "Obitos_Total",
-        opcoes_climaticas_disp[var_selecionada]
-    ]
-
-    df_normal = df_filtrado.copy()
-    df_normal[colunas_normalizar] = scaler.fit_transform(df_filtrado[colunas_normalizar])
-
-    # *Ajuste na Ordenação dos Meses*
-    df_normal["MES_GLOBAL"] = df_normal["MES_IS"]
-    if len(anos_selecionados) == 2:  # Se 2017 e 2018 foram selecionados
-        df_normal.loc[df_normal["ANO_IS"] == 2018, "MES_GLOBAL"] += 12
-
-    # Agrupando dados por mês e ano
-    df_evolucao = df_normal.groupby(["ANO_IS", "MES_GLOBAL"]).agg({
-        "Casos_Total": "sum",
-        "Obitos_Total": "sum",
-        opcoes_climaticas_disp[var_selecionada]: "mean"
-    }).reset_index()
-
-    df_plot = df_evolucao.copy()
-
-    # Criando um dataframe longo para o Plotly
-    df_long = df_plot.melt(
-        id_vars=["ANO_IS", "MES_GLOBAL"], 
-        value_vars=["Casos_Total", "Obitos_Total", opcoes_climaticas_disp[var_selecionada]],
-        var_name="Variável", 
-        value_name="Valor"
-    )
+                def montar_fig_climatico():
+                    coluna = calculos.OPCOES_CLIMATICAS[var_selecionada]
+                    df_climatico = calculos.agregar_mensal(fatias, somas=(), medias=(coluna,))
+                    return figuras.evolucao_climatica(df_climatico, var_selecionada)
 
-    # Mapeando nomes para melhor legibilidade no gráfico
-    nome_variaveis = {
-        "Casos_Total": "Casos",
-        "Obitos_Total": "Óbitos",
-        opcoes_climaticas_disp["Temperatura"]: "Temperatura",
-        opcoes_climaticas_disp["Radiação"]: "Radiação",
-        opcoes_climaticas_disp["Precipitação"]: "Precipitação",
-        opcoes_climaticas_disp["Pressão"]: "Pressão"
-    }
-    df_long["Variável"] = df_long["Variável"].map(nome_variaveis)
-
-    cor_personalizada = {
-        "Casos": "#0068c9",
-        "Óbitos": "#83c9ff",
-        "Temperatura": "#FCDB04",
-        "Radiação": "#FCDB04",
-        "Precipitação": "#FCDB04",
-        "Pressão": "#FCDB04"
-    }
-
-    # Criando o gráfico de linhas
-    fig_evolucao = px.line(
-        df_long,
-        x="MES_GLOBAL",
-        y="Valor",
-        color="Variável",
-        markers=True,
-        labels={"MES_GLOBAL": "Tempo", "Valor": f" Fator climático {var_selecionada} normalizado"},
-        color_discrete_map=cor_personalizada
-    )
+                st.text("")
+                fig_climatico = obter_figura(
+                    "evolucao_climatica", {**selecao, "variavel": var_selecionada}, montar_fig_climatico
+                )
+                st.plotly_chart(fig_climatico, use_container_width=True)
 
-    # Definindo os meses de verão (Dez, Jan, Fev)
-    if len(anos_selecionados) == 2:
-        # Para dois anos (24 meses)
-        fig_evolucao.add_vrect(
-            x0=0.5, x1=2.5,  # Jan/2017 a Fev/2017
-            fillcolor="#FFFF99", opacity=0.3, layer="below", line_width=0
-        )
-        fig_evolucao.add_vrect(
-            x0=12.5, x1=14.5,  # Jan/2018 a Fev/2018
-            fillcolor="#FFFF99", opacity=0.3, layer="below", line_width=0
-        )
-        # Dezembro de cada ano
-        fig_evolucao.add_vrect(
-            x0=11.5, x1=12.5,  # Dez/2017
-            fillcolor="#FFFF99", opacity=0.3, layer="below", line_width=0
-        )
-        fig_evolucao.add_vrect(
-            x0=23.5, x1=24.5,  # Dez/2018
-            fillcolor="#FFFF99", opacity=0.3, layer="below", line_width=0
-        )
-    
-        fig_evolucao.update_xaxes(
-            tickvals=list(range(1, 25)),
-            ticktext=["Jan 2017", "Fev 2017", "Mar 2017", "Abr 2017", "Mai 2017", "Jun 2017", "Jul 2017", "Ago 2017", "Set 2017", "Out 2017", "Nov 2017", "Dez 2017",
-                      "Jan 2018", "Fev 2018", "Mar 2018", "Abr 2018", "Mai 2018", "Jun 2018", "Jul 2018", "Ago 2018", "Set 2018", "Out 2018", "Nov 2018", "Dez 2018"]
-        )
-    else:
-        # Para um ano (12 meses)
-        fig_evolucao.add_vrect(
-            x0=0.5, x1=2.5,  # Jan a Fev
-            fillcolor="#FFFF99", opacity=0.3, layer="below", line_width=0
-        )
-        fig_evolucao.add_vrect(
-            x0=11.5, x1=12.5,  # Dez
-            fillcolor="#FFFF99", opacity=0.3, layer="below", line_width=0
-        )
-    
-        fig_evolucao.update_xaxes(
-            tickvals=list(range(1, 13)),
-            ticktext=["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+
+    # ------------------------------------------------------------------------------
+    # QUARTA LINHA: Linha Evol. Temporal de Casos, Óbitos e Fatores Climáticos Normalizada
+    with st.container(), medidor.secao("D: comparação normalizada"):
+        st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Evolução mensal de um fator climático em comparação com o número de casos e de óbitos por febre amarela</h2>", unsafe_allow_html=True)
+
+        # Série observada ou um componente da decomposição sazonal
+        componente = st.radio(
+            "Componente",
+            list(calculos.COMPONENTES_COMPARACAO),
+            horizontal=True,
+            key="componente_comparacao",
+            label_visibility="collapsed"
         )
 
-    # Adicionando legenda para as áreas destacadas
-    fig_evolucao.add_annotation(
-        xref="paper", yref="paper",
-        x=0.02, y=1.15,
-        text="Áreas amarelas: meses de verão (Dez, Jan, Fev)",
-        showarrow=False,
-        font=dict(size=16)
-    )
-    
-    fig_evolucao.update_layout(
-        paper_bgcolor="#0E1117",
-        plot_bgcolor="#0E1117",
-        font=dict(color="white"),
-        legend=dict(
-            font=dict(color="white")
+        # Casos, óbitos e fator climático normalizados, a partir da camada de sazonalidade
+        def montar_fig_normalizada():
+            df_long = calculos.comparacao_sazonal(
+                obter_sazonalidade(versao), calculos.OPCOES_CLIMATICAS[var_selecionada],
+                selecao["estados"], selecao["anos"], *selecao["meses"],
+                componente=calculos.COMPONENTES_COMPARACAO[componente],
+            )
+            return figuras.comparacao_normalizada(df_long, var_selecionada, componente)
+
+        # Exibir o gráfico
+        fig_evolucao = obter_figura(
+            "evolucao_normalizada",
+            {**selecao, "variavel": var_selecionada, "componente": componente},
+            montar_fig_normalizada
         )
-    )
+        st.plotly_chart(fig_evolucao, use_container_width=True)
 
-    # Exibir o gráfico
-    st.plotly_chart(fig_evolucao, use_container_width=True)
 
+secao_filtrada(versao, cubo_dados)
 
-# CLUSTERIZAÇÃO <====
-with st.container():
-    features = df[[
-    'MES_IS',
-    'Casos_Total',
-    'Obitos_Total',
-    'PRECIPITAÇÃO TOTAL, HORÁRIO (mm)',
-    'PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO, HORARIA (mB)',
-    'RADIACAO GLOBAL (Kj/m²)',
-    'TEMPERATURA DO AR - BULBO SECO, HORARIA (°C)',
-    'UMIDADE RELATIVA DO AR, HORARIA (%)'
-    ]].copy()
-    
-    features['MES_IS_MULT_30'] = features['MES_IS'] * 30
 
-    multiplos_30 = features['MES_IS_MULT_30']
-    senos = np.sin(np.radians(multiplos_30))
-    cossenos = np.cos(np.radians(multiplos_30))
+# ------------------------------------------------------------------------------
+# QUINTA LINHA: Correlação entre o clima dos meses anteriores e os casos
+# Todas as variáveis x defasagens x estados numa passagem vetorizada, uma vez por versão dos dados
+def obter_correlacoes(versao):
+    return cache_dados.obter(
+        "correlacoes", versao, lambda: calculos.correlacoes_defasadas(obter_cubo(versao))
+    )
 
-    features['sen'] = senos
-    features['cos'] = cossenos
+@st.fragment
+def secao_correlacao(versao, estados):
+    with st.container(), medidor.secao("F: correlação defasada"):
+        st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Correlação entre o clima dos meses anteriores e os casos de febre amarela</h2>", unsafe_allow_html=True)
+        colF1, colF2 = st.columns([2, 10])
 
-    for col in ['sen', 'cos']:
-        features.loc[np.abs(features[col]) < 0.0001, col] = 0
+        with colF1:
+            estado_correlacao = st.selectbox(
+                "Estado", [correlacao.TODOS, *estados], key="correlacao_estado"
+            )
+            metodo_correlacao = st.radio(
+                "Correlação", ["Spearman", "Pearson"], key="correlacao_metodo"
+            )
+            st.markdown("""
+                <p style='color: rgba(255, 255, 255, 0.7); font-size: 16px; text-align: center;'>
+                   Cada célula compara o clima de alguns meses antes com os casos do mês, em todo o período dos dados. Valores próximos de 1 ou de −1 indicam que a variável antecipa os casos.
+                </p>
+            """, unsafe_allow_html=True)
+
+        with colF2:
+            correlacoes = medidor.medir("correlação: cálculo", obter_correlacoes, versao)
+
+            def montar_fig_correlacao():
+                return figuras.correlacao_defasada(
+                    correlacoes, estado_correlacao, metodo_correlacao.lower()
+                )
 
-    features = features.drop(['MES_IS_MULT_30', 'MES_IS'], axis=1)
+            fig_correlacao = obter_figura(
+                "correlacao_defasada",
+                {"versao": versao, "estado": estado_correlacao, "metodo": metodo_correlacao},
+                montar_fig_correlacao
+            )
+            st.plotly_chart(fig_correlacao, use_container_width=True)
 
-    columns_to_scale = [
-    "Casos_Total",
-    "Obitos_Total",
-    "PRECIPITAÇÃO TOTAL, HORÁRIO (mm)",
-    "PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO, HORARIA (mB)",
-    "RADIACAO GLOBAL (Kj/m²)",
-    "TEMPERATURA DO AR - BULBO SECO, HORARIA (°C)",
-    "UMIDADE RELATIVA DO AR, HORARIA (%)",
 
-    ]
-    columns_not_scaled = ["sen", "cos"]
+secao_correlacao(versao, cubo_dados["estados"])
 
-    scaler = StandardScaler()
-    features_scaled = features.copy()
-    features_scaled[columns_to_scale] = scaler.fit_transform(features[columns_to_scale])
 
+# CLUSTERIZAÇÃO <====
+# O modelo é salvo em disco por hash do dataset e reaproveitado entre reruns
+def obter_clusterizacao(versao):
+    return cache_dados.obter("clusterizacao", versao, lambda: clusterizacao.carregar_ou_ajustar(
+        carregar_dataset(versao), chave_dados=versao
+    ))
 
-    n_clusters = 3
+# Varredura de k gerada offline (python -m painel.clusterizacao)
+def obter_varredura(versao):
+    return cache_dados.obter("varredura", versao, lambda: clusterizacao.carregar_varredura(versao))
 
-    # Ajustando o modelo com n_init e algoritmo Elkan
-    kmeans = KMeans(n_clusters=n_clusters, n_init=100, algorithm="elkan", random_state=0)
+def obter_clusterizacao_varredura(versao, k):
+    return cache_dados.obter("clusterizacao_varredura", {"versao": versao, "k": k}, lambda: (
+        clusterizacao.resultado_da_varredura(carregar_dataset(versao), obter_varredura(versao), k)
+    ))
 
-    # Ajustando o modelo aos dados
-    kmeans.fit(features_scaled)
+n_clusters_padrao = clusterizacao.HIPERPARAMETROS_PADRAO["n_clusters"]
 
-    # Obtendo as labels do cluster
-    labels = kmeans.labels_
 
-    # Adicionando as labels ao DataFrame
-    features_cluster = features_scaled.copy()
-    features_cluster['cluster'] = labels
+# ------------------------------------------------------------------------------
+# SEXTA LINHA: CLusterização
+@st.fragment
+def secao_agrupamentos(versao):
+    st.markdown("<h2 style='font-size: 36px; font-weight: bold; text-align: center; color: white;'>Padrões de ocorrência dos casos de febre amarela</h2>", unsafe_allow_html=True)
+
+    # A clusterização só é carregada e enviada ao navegador quando a seção é
+    # aberta; depois da primeira abertura o modelo e as figuras ficam em cache.
+    expansor = st.expander(
+        "Ver os agrupamentos",
+        key="expandir_agrupamentos",
+        on_change="rerun"
+    )
+    with expansor, medidor.secao("E: agrupamentos"):
+        if expansor.open:
+            aba_agrupamentos, aba_escolha = st.tabs(
+                ["Agrupamentos", "Escolha do número de agrupamentos (cotovelo e silhueta)"]
+            )
 
+            ###### Escolha do número de agrupamentos ######
+            k_escolhido = n_clusters_padrao
+            with aba_escolha:
+                try:
+                    varredura = medidor.medir("clusterização: varredura", obter_varredura, versao)
+                except FileNotFoundError:
+                    st.info("Nenhuma varredura de agrupamentos encontrada para esta versão dos dados. "
+                            "Gere com `python -m painel.clusterizacao`.")
+                else:
+                    resumo_varredura = clusterizacao.resumir_varredura(varredura)
+                    valores_k = list(resumo_varredura.index)
+
+                    def montar_fig_cotovelo():
+                        return figuras.cotovelo(resumo_varredura)
+
+                    fig_cotovelo = obter_figura("cotovelo", {"versao": versao}, montar_fig_cotovelo)
+                    st.plotly_chart(fig_cotovelo, use_container_width=True)
+
+                    k_escolhido = st.select_slider(
+                        "Número de agrupamentos",
+                        options=valores_k,
+                        value=n_clusters_padrao if n_clusters_padrao in valores_k else valores_k[0],
+                        key="k_agrupamentos"
+                    )
 
+            with aba_agrupamentos:
+                # Só usa ajustes já prontos: o modelo padrão ou um da varredura
+                if k_escolhido == n_clusters_padrao:
+                    resultado_clusters = medidor.medir("clusterização: modelo", obter_clusterizacao, versao)
+                else:
+                    resultado_clusters = medidor.medir(
+                        "clusterização: modelo", obter_clusterizacao_varredura, versao, k_escolhido
+                    )
+                n_clusters = resultado_clusters["hiperparametros"]["n_clusters"]
+                labels = resultado_clusters["labels"]
+                contagem = resultado_clusters["contagem"]
 
-    # Recuperar os meses originais
-    features_cluster['MES_IS'] = df['MES_IS'].values
+                ###### Resumo Geral Clusters ######
 
-# Contar quantas vezes cada mês aparece em cada cluster
-    contagem = features_cluster.groupby(['cluster', 'MES_IS']).size().reset_index(name='contagem')
+                cluster_summary = resultado_clusters["cluster_summary"]
 
-    # Mapear número do mês para nome com ordem correta
-    meses_ordenados = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", 
-                   "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+                # Descrições de cada cluster
+                descricoes_clusters = {
+                    # 0: "Surtos Intensos no Verão — Elevado número de casos, concentrados nos meses quentes e chuvosos. Indica episódios de surtos.",
+                    # 1: "Padrão Esperado de Verão — Volume significativo de casos, também ocorrendo no verão, mas dentro de um comportamento mais típico.",
+                    # 2: "Alta letalidade com Poucos Casos — Baixa incidência, porém com taxa de letalidade expressiva. Pode indicar falhas no diagnóstico precoce ou acesso a tratamento."
 
-# Mapeando número do mês para nome (opcional, para deixar bonito)
-    meses_dict = {
-    1: "Jan", 2: "Fev", 3: "Mar", 4: "Abr", 5: "Mai", 6: "Jun",
-    7: "Jul", 8: "Ago", 9: "Set", 10: "Out", 11: "Nov", 12: "Dez"
-    }
-    contagem['MES_IS'] = contagem['MES_IS'].map(meses_dict).astype(
-    pd.CategoricalDtype(categories=meses_ordenados, ordered=True)
-    )
+                    0: "Surtos Intensos no Verão — Número muito alto de casos, concentrados nos meses mais quentes e chuvosos. Indica surtos agudos.",
+                    1: "Padrão Esperado de Verão — Casos em volume elevado, também no verão, mas dentro de um padrão mais previsível e sazonal.",
+                    2: "Alta Letalidade com Poucos Casos — Baixa incidência, mas com letalidade marcante. Pode sugerir falhas no diagnóstico ou tratamento."
+                }
 
-    contagem = contagem.sort_values('MES_IS')
-    
-    
-# ------------------------------------------------------------------------------
-# QUINTA LINHA: CLusterização
-
-st.markdown("<h2 style='font-size: 36px; font-weight: bold; text-align: center; color: white;'>Padrões de ocorrência dos casos de febre amarela</h2>", unsafe_allow_html=True)
-
-###### Resumo Geral Clusters ######
-
-# Agrupar dados por cluster
-cluster_summary = df.groupby(features_cluster['cluster']).agg(
-    total_casos=('Casos_Total', 'sum'),
-    total_obitos=('Obitos_Total', 'sum')
-).reset_index()
-
-# Calcular taxa de letalidade por cluster
-cluster_summary['taxa_letalidade'] = (cluster_summary['total_obitos'] / cluster_summary['total_casos'] * 100).round(2)
-
-# Descrições de cada cluster
-descricoes_clusters = {
-    # 0: "Surtos Intensos no Verão — Elevado número de casos, concentrados nos meses quentes e chuvosos. Indica episódios de surtos.",
-    # 1: "Padrão Esperado de Verão — Volume significativo de casos, também ocorrendo no verão, mas dentro de um comportamento mais típico.",
-    # 2: "Alta letalidade com Poucos Casos — Baixa incidência, porém com taxa de letalidade expressiva. Pode indicar falhas no diagnóstico precoce ou acesso a tratamento."
-
-    0: "Surtos Intensos no Verão — Número muito alto de casos, concentrados nos meses mais quentes e chuvosos. Indica surtos agudos.",
-    1: "Padrão Esperado de Verão — Casos em volume elevado, também no verão, mas dentro de um padrão mais previsível e sazonal.",
-    2: "Alta Letalidade com Poucos Casos — Baixa incidência, mas com letalidade marcante. Pode sugerir falhas no diagnóstico ou tratamento."
-}
-
-# CSS personalizado para cartões
-kpi_style = """
-<style>
-    .cluster-card {
-        background-color: #F5F5F5;
-        border: 2px solid #003366;
-        border-radius: 15px;
-        padding: 20px;
-        margin: 15px 5px;
-        color: #003366;
-        text-align: center;
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
-    }
-    .cluster-title {
-        font-size: 24px;
-        font-weight: bold;
-        margin-bottom: 10px;
-        color: #003366;
-    }
-    .cluster-desc {
-        font-size: 16px;
-        margin-bottom: 20px;
-        color: #003366;
-    }
-    .kpi-container {
-        background-color: #003366;
-        color: white;
-        text-align: center;
-        padding: 15px;
-        border-radius: 10px;
-        font-size: 18px;
-        margin: 10px auto;
-    }
-</style>
-"""
-st.markdown(kpi_style, unsafe_allow_html=True)
-
-# Criar 3 colunas
-cols = st.columns(3)
-
-# Preencher cada coluna com o card do cluster
-for idx, row in cluster_summary.iterrows():
-    with cols[idx]:
-        cluster = int(row['cluster'])
-        total_casos = row['total_casos']
-        total_obitos = row['total_obitos']
-        letalidade = row['taxa_letalidade']
-
-        # HTML do card do cluster
-        cluster_html = f"""
-        <div class="cluster-card">
-            <div class="cluster-title">Agrupamento {cluster}</div>
-            <div class="cluster-desc">{descricoes_clusters[cluster]}</div>
-            <div class="kpi-container">
-                <strong>Casos Totais</strong><br>
-                {total_casos:,}
-            </div>
-            <div class="kpi-container">
-                <strong>Óbitos Totais</strong><br>
-                {total_obitos:,}
-            </div>
-            <div class="kpi-container">
-                <strong>Taxa de letalidade</strong><br>
-                {letalidade}%
-            </div>
-        </div>
-        """
-        st.markdown(cluster_html, unsafe_allow_html=True)
-st.markdown("""
-    <p style='color: rgba(255, 255, 255, 0.7); font-size: 16px; text-align: center;'>
-        Os agrupamentos forma gerados considerando <u>todos os dados disponíveis</u>, 
-        independentemente dos filtros de ano e estado aplicados acima.
-    </p>
-""", unsafe_allow_html=True)
+                # CSS personalizado para cartões
+                kpi_style = """
+                <style>
+                    .cluster-card {
+                        background-color: #F5F5F5;
+                        border: 2px solid #003366;
+                        border-radius: 15px;
+                        padding: 20px;
+                        margin: 15px 5px;
+                        color: #003366;
+                        text-align: center;
+                        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.1);
+                    }
+                    .cluster-title {
+                        font-size: 24px;
+                        font-weight: bold;
+                        margin-bottom: 10px;
+                        color: #003366;
+                    }
+                    .cluster-desc {
+                        font-size: 16px;
+                        margin-bottom: 20px;
+                        color: #003366;
+                    }
+                    .kpi-container {
+                        background-color: #003366;
+                        color: white;
+                        text-align: center;
+                        padding: 15px;
+                        border-radius: 10px;
+                        font-size: 18px;
+                        margin: 10px auto;
+                    }
+                </style>
+                """
+                st.markdown(kpi_style, unsafe_allow_html=True)
+
+                # Criar 3 colunas
+                cols = st.columns(3)
+
+                # As descrições foram escritas para o modelo padrão de 3 agrupamentos
+                if n_clusters != n_clusters_padrao:
+                    descricoes_clusters = {}
+
+                # Preencher cada coluna com o card do cluster
+                for idx, row in cluster_summary.iterrows():
+                    with cols[idx % len(cols)]:
+                        cluster = int(row['cluster'])
+                        total_casos = row['total_casos']
+                        total_obitos = row['total_obitos']
+                        letalidade = row['taxa_letalidade']
+
+                        # HTML do card do cluster
+                        cluster_html = f"""
+                        <div class="cluster-card">
+                            <div class="cluster-title">Agrupamento {cluster}</div>
+                            <div class="cluster-desc">{descricoes_clusters.get(cluster, "Perfil descrito pelas médias no gráfico de radar abaixo.")}</div>
+                            <div class="kpi-container">
+                                <strong>Casos Totais</strong><br>
+                                {total_casos:,}
+                            </div>
+                            <div class="kpi-container">
+                                <strong>Óbitos Totais</strong><br>
+                                {total_obitos:,}
+                            </div>
+                            <div class="kpi-container">
+                                <strong>Taxa de letalidade</strong><br>
+                                {letalidade}%
+                            </div>
+                        </div>
+                        """
+                        st.markdown(cluster_html, unsafe_allow_html=True)
+                st.markdown("""
+                    <p style='color: rgba(255, 255, 255, 0.7); font-size: 16px; text-align: center;'>
+                        Os agrupamentos forma gerados considerando <u>todos os dados disponíveis</u>, 
+                        independentemente dos filtros de ano e estado aplicados acima.
+                    </p>
+                """, unsafe_allow_html=True)
+
+
+                ###### Gráfico de radar e pizza clusterização ######
+                # Criar duas colunas
+                col1, col2 = st.columns(2)
+
+                with col1:
+                    # Gráfico de Radar
+
+                    # Médias padronizadas das variáveis em cada agrupamento
+                    def montar_fig_radar():
+                        return figuras.radar_agrupamentos(resultado_clusters)
+
+                    # Exibir título e gráfico
+                    st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Comparação entre agrupamentos por variáveis</h2>", unsafe_allow_html=True)
+                    fig_radar = obter_figura("radar", {"versao": versao, "k": n_clusters}, montar_fig_radar)
+                    st.plotly_chart(fig_radar, use_container_width=True)
+
+
+                with col2:
+                # Gráfico de Pizza - Distribuição de Casos entre os Clusters
+                    def montar_fig_pizza_clusters():
+                        return figuras.pizza_agrupamentos(calculos.casos_por_agrupamento(resultado_clusters))
+
+                    st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Distribuição de casos entre os agrupamentos</h2>", unsafe_allow_html=True)
+                    fig_pizza = obter_figura(
+                        "pizza_agrupamentos", {"versao": versao, "k": n_clusters}, montar_fig_pizza_clusters
+                    )
+                    st.plotly_chart(fig_pizza, use_container_width=True)
 
 
-###### Gráfico de radar e pizza clusterização ######
-# Criar duas colunas
-col1, col2 = st.columns(2)
-
-with col1:
-    # Gráfico de Radar
-
-    # Variáveis escolhidas para o gráfico
-    variaveis_escolhidas = [
-        "Casos_Total",
-        "Obitos_Total",
-        "PRECIPITAÇÃO TOTAL, HORÁRIO (mm)",
-        "PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO, HORARIA (mB)",
-        "RADIACAO GLOBAL (Kj/m²)",
-        "TEMPERATURA DO AR - BULBO SECO, HORARIA (°C)"
-    ]
-
-    # Mapeamento para nomes legíveis
-    nomes_legiveis = {
-        'Casos_Total': 'Casos',
-        'Obitos_Total': 'Óbitos',
-        'PRECIPITAÇÃO TOTAL, HORÁRIO (mm)': 'Precipitação (mm)',
-        'PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO, HORARIA (mB)': 'Pressão Atmosférica (mB)',
-        'RADIACAO GLOBAL (Kj/m²)': 'Radiação (Kj/m²)',
-        'TEMPERATURA DO AR - BULBO SECO, HORARIA (°C)': 'Temperatura (°C)'
-    }
-
-    # Cores dos clusters (iguais às do gráfico de pizza)
-    cores_clusters = {
-        0: "#0068c9",   # Azul
-        1: "#FF4B4B",   # Vermelhro
-        2: "#FCDB04"    # Amarelo
-    }
-
-    # Calcular médias das variáveis por cluster
-    medias_por_cluster = features_scaled.copy()
-    medias_por_cluster['cluster'] = labels
-    medias = medias_por_cluster.groupby('cluster')[variaveis_escolhidas].mean().reset_index()
-
-    # Aplicar nomes legíveis às variáveis
-    variaveis_legiveis = [nomes_legiveis[var] for var in variaveis_escolhidas]
-
-    # Construir gráfico radar com nomes legíveis e cores definidas
-    fig_radar = go.Figure()
-    for i in range(n_clusters):
-        fig_radar.add_trace(go.Scatterpolar(
-            r=medias.loc[i, variaveis_escolhidas].values,
-            theta=variaveis_legiveis,
-            fill='toself',
-            name=f'Agrupamento {i}',
-            line=dict(color=cores_clusters.get(i, '#CCCCCC'))  # cor padrão cinza caso o cluster não esteja no dict
-        ))
-
-    # Estilização do gráfico
-    fig_radar.update_layout(
-        polar=dict(
-            bgcolor="#F5F5F5",  # fundo escuro dentro do círculo
-            radialaxis=dict(visible=True, linecolor='white', gridcolor='gray', tickfont=dict(color='white'))
-        ),
-        paper_bgcolor="#0E1117",
-        plot_bgcolor="#0E1117",
-        font=dict(color="white"),
-        showlegend=True,
-        height=500
-    )
 
-    # Exibir título e gráfico
-    st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Comparação entre agrupamentos por variáveis</h2>", unsafe_allow_html=True)
-    st.plotly_chart(fig_radar, use_container_width=True)
-
-
-with col2:
-# Gráfico de Pizza - Distribuição de Casos entre os Clusters
-    casos_por_cluster = df.copy()
-    casos_por_cluster['cluster'] = labels
-    casos_agrupados = casos_por_cluster.groupby('cluster')['Casos_Total'].sum().reset_index()
-
-    # Criar nova coluna com nomes personalizados
-    casos_agrupados['agrupamento'] = casos_agrupados['cluster'].apply(lambda x: f"Agrupamento {x}")
-
-    fig_pizza = px.pie(
-        casos_agrupados,
-        names='agrupamento',
-        values='Casos_Total',
-        color='cluster',
-        color_discrete_map={
-            0: "#0068c9",  # Azul
-            1: "#83c9ff",  # Azul claro 
-            2: "#FCDB04",  # Amarelo
-        },
-        height=500
-    )
 
-    fig_pizza.update_traces(
-        hovertemplate="%{value} casos no %{label}",
-        textinfo='percent+label'
-    )
+                ##### Gráfico de barra: Frequencia de meses por cluster #####
+                def montar_fig_meses():
+                    return figuras.meses_agrupamentos(contagem)
+                st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Frequência dos meses por agrupamentos</h2>", unsafe_allow_html=True)
 
-    fig_pizza.update_layout(
-        paper_bgcolor="#0E1117",
-        plot_bgcolor="#0E1117",
-        font=dict(color="white"),
-        legend=dict(font=dict(color="white"))
-    )
+                fig = obter_figura("meses_agrupamentos", {"versao": versao, "k": n_clusters}, montar_fig_meses)
+                st.plotly_chart(fig, use_container_width=True)
+                st.markdown("""
+                    <p style='color: rgba(255, 255, 255, 0.7); font-size: 16px; text-align: center;'>
+                       Quantas vezes os casos de cada agrupamento ocorreram em cada mês, revelando padrões sazonais — como concentração no verão.
+                    </p>
+                """, unsafe_allow_html=True)
 
-    st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Distribuição de casos entre os agrupamentos</h2>", unsafe_allow_html=True)
-    st.plotly_chart(fig_pizza, use_container_width=True)
 
 
+secao_agrupamentos(versao)
 
 
-##### Gráfico de barra: Frequencia de meses por cluster #####
-fig = px.bar(
-        contagem,
-        x='MES_IS',  # Mês no eixo x
-        y='contagem',  # Frequência
-        color='cluster',  # Cor por cluster
-        barmode='group',  # barras lado a lado (ou use 'stack' para empilhar)
-        labels={'MES_IS': 'Mês', 'contagem': 'Frequência', 'cluster': 'Cluster'}
+# ------------------------------------------------------------------------------
+# DEPURAÇÃO: desempenho por seção (só com ?depurar=1)
+caminho_perfil = perfil.finalizar() if perfil is not None else None
+
+# Atualiza sozinho para mostrar também as seções reexecutadas pelos fragmentos
+@st.fragment(run_every="2s")
+def painel_desempenho(medidor, caminho_perfil):
+    st.markdown("### ⏱️ Desempenho por seção")
+    colunas = ["secao", "parede_ms", "cpu_ms", "alocado_kb", "pico_kb"]
+    st.dataframe(
+        [{coluna: registro.get(coluna) for coluna in colunas} for registro in medidor.ultimos()],
+        hide_index=True
     )
-st.markdown("<h2 style='font-size: 26px; font-weight: bold; text-align: center; color: white;'>Frequência dos meses por agrupamentos</h2>", unsafe_allow_html=True)
+    st.caption("Última execução de cada seção. Memória alocada segundo o tracemalloc, "
+               "medida só com PAINEL_LOG_DESEMPENHO definida.")
+    st.dataframe(
+        [{"cache": nome, **cache.estatisticas()}
+         for nome, cache in (("dados", cache_dados), ("figuras", cache_figuras))],
+        hide_index=True
+    )
+    st.download_button(
+        "Registros (JSON)", medidor.exportar_json(), file_name="desempenho.json",
+        mime="application/json", on_click="ignore"
+    )
+    if caminho_perfil:
+        with open(caminho_perfil, "rb") as arquivo:
+            st.download_button(
+                "Perfil do rerun (cProfile)", arquivo.read(),
+                file_name=os.path.basename(caminho_perfil), on_click="ignore"
+            )
+        st.caption("Flamegraph: `snakeviz arquivo.prof` ou `flameprof arquivo.prof > perfil.svg`.")
 
-st.plotly_chart(fig, use_container_width=True)
-st.markdown("""
-    <p style='color: rgba(255, 255, 255, 0.7); font-size: 16px; text-align: center;'>
-       Quantas vezes os casos de cada agrupamento ocorreram em cada mês, revelando padrões sazonais — como concentração no verão.
-    </p>
-""", unsafe_allow_html=True)
+if depurar:
+    with st.sidebar:
+        painel_desempenho(medidor, caminho_perfil)
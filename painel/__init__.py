@@ -0,0 +1 @@
+"""Camada de dados e cálculos do dashboard de febre amarela (final1.py)."""
@@ -0,0 +1,95 @@
+"""Aquecimento do painel antes do primeiro acesso.
+
+`aquecer_artefatos` gera (ou confere) em disco tudo o que o painel carrega:
+armazenamento colunar, cubo, camada de sazonalidade, modelos de previsão,
+geometria e o modelo padrão de agrupamentos.
+É a etapa de build/deploy, e sem ela o primeiro usuário paga pelo ajuste do
+KMeans e pelo download da geometria:
+
+    python -m painel.aquecimento
+
+`aquecer_app` executa o `final1.py` uma vez no próprio processo, sem
+navegador (`streamlit.testing.v1.AppTest`), com a seção de agrupamentos
+aberta. Os caches do painel são do processo (`CacheCompartilhado`, guardado
+em `st.cache_resource`), então dados, cubo, população, geometria, modelos,
+logo e as figuras da seleção padrão ficam prontos. Com --servir, o servidor
+do Streamlit sobe em seguida no mesmo processo e a primeira sessão já
+encontra tudo em memória (os argumentos depois de `--` vão para o
+`streamlit run`):
+
+    python -m painel.aquecimento --servir -- --server.port 8501
+
+`python -m painel.medir_partida` compara a partida e a primeira renderização
+com e sem o aquecimento.
+"""
+import argparse
+import sys
+import time
+
+from painel import clusterizacao, cubo, dados, geometria, populacao, previsao, sazonalidade
+from painel.medir_interacoes import CAMINHO_APP, ESTADO_SESSAO
+
+
+def _cronometrar(nome, funcao, relatorio):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    relatorio(f"{nome:<28} {time.perf_counter() - inicio:6.2f}s")
+    return resultado
+
+
+def aquecer_artefatos(relatorio=print):
+    """Gera os artefatos que faltam em `artefatos/` e devolve a versão dos dados."""
+    versao = _cronometrar("armazenamento colunar", dados.versao_dados, relatorio)
+    df = _cronometrar("dataset", dados.carregar_dados, relatorio)
+    cubo_dados = _cronometrar("cubo", lambda: cubo.carregar_ou_construir(versao, lambda: df), relatorio)
+    camada = _cronometrar("sazonalidade", lambda: sazonalidade.carregar_ou_construir(versao, cubo_dados),
+                          relatorio)
+    _cronometrar("previsão", lambda: previsao.carregar_ou_ajustar(camada, chave_dados=versao), relatorio)
+    _cronometrar("população", populacao.carregar_populacao, relatorio)
+    if _cronometrar("geometria", lambda: geometria.url_geometria("brasil"), relatorio) is None:
+        relatorio("Geometria indisponível (sem rede?): o painel sobe sem o mapa. "
+                  "Gere com `python -m painel.geometria --fonte brasil.geojson`.")
+    _cronometrar("agrupamentos",
+                 lambda: clusterizacao.carregar_ou_ajustar(df, chave_dados=versao), relatorio)
+    return versao
+
+
+def aquecer_app(caminho_app=CAMINHO_APP, relatorio=print):
+    """Executa o painel uma vez neste processo, preenchendo os caches do Streamlit."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(caminho_app, default_timeout=600)
+    for chave, valor in ESTADO_SESSAO.items():
+        app.session_state[chave] = valor
+    _cronometrar("execução do painel", app.run, relatorio)
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+
+
+def servir(caminho_app=CAMINHO_APP, argumentos=()):
+    """Sobe o servidor do Streamlit neste processo (não retorna)."""
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", caminho_app, *argumentos]
+    cli.main()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepara artefatos e caches antes do primeiro acesso.")
+    parser.add_argument("--servir", action="store_true",
+                        help="Aquece os caches e sobe o servidor neste processo")
+    parser.add_argument("argumentos", nargs=argparse.REMAINDER,
+                        help="Argumentos do `streamlit run` (depois de --)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.servir:
+        # A execução do painel já carrega (e gera, se faltarem) os artefatos
+        aquecer_app()
+    else:
+        aquecer_artefatos()
+    print(f"Aquecimento concluído em {time.perf_counter() - inicio:.1f}s")
+
+    if args.servir:
+        argumentos = args.argumentos[1:] if args.argumentos[:1] == ["--"] else args.argumentos
+        servir(argumentos=argumentos)
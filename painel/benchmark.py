@@ -0,0 +1,544 @@
+"""Benchmark do painel com datasets sintéticos em escala.
+
+Gera datasets com o mesmo esquema de `dataset_unificado_processado.csv`, de
+96 linhas (o tamanho atual) até 10^7, com mais estados, mais anos e mais
+"municípios" (várias linhas por estado e mês, somadas pelo cubo). Para cada
+escala, um processo novo, com artefatos próprios, mede:
+
+- o painel inteiro sem navegador (`streamlit.testing.v1.AppTest`): a primeira
+  execução (partida a frio, sem nenhum artefato nem cache), reruns completos
+  com os caches quentes e um rerun completo por tipo de interação;
+- cada etapa isolada: leitura do CSV, conversão e carga do formato colunar,
+  construção do cubo, filtros, junção da população, cada agregação, a
+  camada de sazonalidade e a comparação normalizada, o ajuste e a consulta
+  da previsão de casos, a correlação defasada, a clusterização (Elkan e
+  mini-batch) e a montagem de cada figura (com o tamanho do spec enviado ao
+  navegador).
+
+Cada medida guarda o tempo de parede, o tempo de CPU e o pico de memória do
+processo até ali. O resultado vai para um JSON; com --comparar, as medidas
+são confrontadas com um resultado anterior e o comando termina com erro se
+alguma etapa ficou mais lenta que a tolerância. Com --orcamento-memoria, o
+pico de memória alocada na carga, num rerun completo e na clusterização é confrontado
+com ORCAMENTO_MEMORIA (múltiplos do tamanho do dataset em memória):
+
+    python -m painel.benchmark --linhas 96 10000 100000 1000000 --saida benchmark.json
+    python -m painel.benchmark --linhas 96 10000 --comparar benchmark.json
+    python -m painel.benchmark --linhas 1000000 --sem-app --orcamento-memoria
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from painel import calculos, cubo, dados, populacao, previsao, sazonalidade
+from painel.config import DIRETORIO_ARTEFATOS, DIRETORIO_RAIZ
+
+ESCALAS_PADRAO = [96, 10_000, 100_000, 1_000_000]
+
+# Siglas usadas pelos datasets sintéticos, começando pelo Sudeste
+UFS = ["ES", "MG", "RJ", "SP", "AC", "AL", "AM", "AP", "BA", "CE", "DF", "GO", "MA", "MS",
+       "MT", "PA", "PB", "PE", "PI", "PR", "RN", "RO", "RR", "RS", "SC", "SE", "TO"]
+MAX_ANOS = 30
+ULTIMO_ANO = 2018
+
+# Etapas abaixo deste tempo não entram na comparação (ruído de medida)
+MINIMO_COMPARACAO_MS = 5.0
+TOLERANCIA = 0.25
+
+# Pico de memória alocada por etapa, em múltiplos do tamanho do dataset em
+# memória (--orcamento-memoria). Abaixo de MINIMO_LINHAS_ORCAMENTO os custos
+# fixos (figuras, buffers do scikit-learn) dominam e o orçamento não vale
+MINIMO_LINHAS_ORCAMENTO = 1_000_000
+ORCAMENTO_MEMORIA = {
+    "carga": 1.5,
+    "rerun": 0.25,
+    "clusterizacao": 3.0,
+    "clusterizacao_minibatch": 2.5,
+}
+
+
+# ------------------------------------------------------------------------------
+# Datasets sintéticos
+
+def dimensoes(n_linhas):
+    """(estados, anos, municípios) de um dataset com pelo menos `n_linhas` linhas.
+
+    As três dimensões crescem juntas (raiz cúbica da escala); 96 linhas
+    reproduzem o dataset atual: 4 estados x 2 anos x 12 meses.
+    """
+    fator = (n_linhas / 96) ** (1 / 3)
+    n_estados = min(len(UFS), max(4, round(4 * fator)))
+    n_anos = min(MAX_ANOS, max(2, round(2 * fator)))
+    municipios = max(1, math.ceil(n_linhas / (n_estados * n_anos * 12)))
+    return n_estados, n_anos, municipios
+
+
+def gerar_sintetico(n_linhas, semente=0, base=None):
+    """DataFrame com o esquema do CSV unificado (nomes originais) e `n_linhas` linhas.
+
+    Casos e óbitos seguem Poisson e as variáveis climáticas uma normal, com a
+    média e o desvio de cada mês no dataset `base` (o real, por padrão),
+    então a sazonalidade é preservada.
+    """
+    base = dados.ler_csv() if base is None else base
+    rng = np.random.default_rng(semente)
+    n_estados, n_anos, municipios = dimensoes(n_linhas)
+
+    # Grade estado x ano x mês x município, cortada em n_linhas
+    indice = np.arange(n_linhas, dtype="int64")
+    mes = (indice // municipios) % 12 + 1
+    ano = ULTIMO_ANO - n_anos + 1 + (indice // (municipios * 12)) % n_anos
+    estado = indice // (municipios * 12 * n_anos)
+
+    por_mes = base.groupby("MES_IS")
+    media = por_mes.mean(numeric_only=True).reindex(range(1, 13))
+    desvio = por_mes.std(numeric_only=True).reindex(range(1, 13)).fillna(0)
+
+    df = pd.DataFrame({
+        "ESTADO": pd.Categorical.from_codes(estado, UFS[:n_estados]),
+        "ANO_IS": ano.astype("int16"),
+        "MES_IS": mes.astype("int8"),
+    })
+    for col in ["Obitos_M", "Obitos_F", "Casos_M", "Casos_F"]:
+        df[col] = rng.poisson(media[col].to_numpy()[mes - 1]).astype("int32")
+    df["Obitos_Total"] = df["Obitos_M"] + df["Obitos_F"]
+    df["Casos_Total"] = df["Casos_M"] + df["Casos_F"]
+    # Com casos sorteados independentes dos óbitos a razão pode passar de 100%
+    df["Mortalidade"] = np.where(
+        df["Casos_Total"] > 0, 100 * df["Obitos_Total"] / df["Casos_Total"].clip(lower=1), 0
+    ).astype("float32")
+    for col in dados.COLUNAS_CLIMATICAS:
+        valores = rng.normal(media[col].to_numpy()[mes - 1], desvio[col].to_numpy()[mes - 1])
+        df[col] = np.maximum(valores, 0).astype("float32")
+
+    colunas_csv = {curto: original for original, curto in dados.COLUNAS_INMET.items()}
+    ordem = ["ESTADO", "ANO_IS", "MES_IS", *dados.COLUNAS_CASOS, "Mortalidade",
+             *dados.COLUNAS_CLIMATICAS]
+    return df[ordem].rename(columns=colunas_csv)
+
+
+def populacao_sintetica(df, semente=0):
+    """Tabela ESTADO, ANO_IS, POPULACAO cobrindo os estados e anos de `df`.
+
+    Estados e anos já presentes em `populacao_estados.csv` mantêm o valor real.
+    """
+    rng = np.random.default_rng(semente)
+    real = populacao.carregar_populacao()
+    pares = pd.MultiIndex.from_product(
+        [sorted(df["ESTADO"].astype(str).unique()), sorted(df["ANO_IS"].unique())],
+        names=["ESTADO", "ANO_IS"],
+    )
+    tabela = pd.Series(rng.integers(500_000, 20_000_000, len(pares)), index=pares, name="POPULACAO")
+    comuns = pares.intersection(real.index)
+    tabela.loc[comuns] = real.loc[comuns].to_numpy()
+    return tabela.reset_index()
+
+
+def escrever_csv(df, caminho):
+    """Grava o CSV com o pyarrow (bem mais rápido que o pandas em 10^7 linhas)."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    tabela = pa.Table.from_pandas(df.astype({"ESTADO": "string"}), preserve_index=False)
+    pa_csv.write_csv(tabela, caminho)
+
+
+# ------------------------------------------------------------------------------
+# Medidas dentro do processo de uma escala
+
+def pico_memoria_mb():
+    """Pico de memória residente do processo até agora (MiB)."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    return pico / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Cronometro:
+    """Executa funções registrando tempo de parede, CPU e pico de memória."""
+
+    def __init__(self):
+        self.etapas = []
+
+    def medir(self, nome, funcao):
+        cpu, relogio = time.process_time(), time.perf_counter()
+        resultado = funcao()
+        self.etapas.append({
+            "etapa": nome,
+            "parede_ms": 1000 * (time.perf_counter() - relogio),
+            "cpu_ms": 1000 * (time.process_time() - cpu),
+            "pico_memoria_mb": pico_memoria_mb(),
+        })
+        return resultado
+
+
+def medir_app(reruns):
+    """Partida a frio, reruns completos e um rerun completo por interação, via AppTest."""
+    from streamlit.testing.v1 import AppTest
+
+    from painel.medir_interacoes import (CAMINHO_APP, INTERACOES, aplicar_estado, buscar_widget,
+                                         medir_execucao, ultimo_ano)
+
+    def linha(nome, medidas):
+        return {
+            "etapa": nome,
+            "parede_ms": 1000 * statistics.median(m[1] for m in medidas),
+            "cpu_ms": 1000 * statistics.median(m[0] for m in medidas),
+            "pico_memoria_mb": pico_memoria_mb(),
+        }
+
+    app = AppTest.from_file(CAMINHO_APP, default_timeout=3600)
+    aplicar_estado(app)
+    etapas = [linha("app_partida_fria", [medir_execucao(app)])]
+    etapas.append(linha("app_rerun", [medir_execucao(app) for _ in range(reruns)]))
+
+    for nome, tipo, identificador, alternativo in INTERACOES:
+        identificador = identificador or ultimo_ano(app)
+        widget = buscar_widget(app, tipo, identificador)
+        if widget is None:
+            continue
+        original = widget.value
+        medidas = []
+        for _ in range(reruns):
+            for valor in (alternativo, original):
+                buscar_widget(app, tipo, identificador).set_value(valor)
+                medidas.append(medir_execucao(app))
+        etapas.append(linha(f"app_interacao[{nome}]", medidas))
+    return etapas
+
+
+def medir_memoria(n_init=None):
+    """Pico de memória alocada por etapa do orçamento, com tracemalloc.
+
+    O pico do tracemalloc cobre numpy, pandas e o próprio Python; na carga
+    soma-se o que ficou no pool do Arrow, que o tracemalloc não enxerga. O
+    "rerun" é o primeiro rerun de uma seleção no `final1.py`, com dados,
+    cubo, modelos e correlações já no cache e o cache de figuras vazio:
+    filtros, junção da população, totais e as figuras de todas as seções
+    (mapa, pizza, barras, previsão, clima, comparação sazonal, correlação e
+    agrupamentos), nas opções padrão dos widgets.
+    """
+    import tracemalloc
+
+    import pyarrow as pa
+
+    from painel import clusterizacao, correlacao, figuras, geometria
+
+    versao = dados.versao_dados()
+    df = dados.carregar_dados()
+    cubo_dados = cubo.carregar_ou_construir(versao, lambda: df)
+    tabela_populacao = populacao.carregar_populacao()
+    camada = sazonalidade.carregar_ou_construir(versao, cubo_dados)
+    previsoes = previsao.carregar_ou_ajustar(camada, chave_dados=versao, max_workers=1)
+    correlacoes = calculos.correlacoes_defasadas(cubo_dados)
+    resultado_clusters = clusterizacao.carregar_ou_ajustar(df, chave_dados=versao)
+    # Só a URL vai na figura; o arquivo não precisa existir
+    url_geometria = f"app/static/{os.path.basename(geometria.caminho_estatico('brasil'))}"
+    estados, anos = cubo_dados["estados"], cubo_dados["anos"]
+    hiperparametros = {"motor": "elkan", **({"n_init": n_init} if n_init else {})}
+    variavel = next(iter(calculos.OPCOES_CLIMATICAS))
+    coluna = calculos.OPCOES_CLIMATICAS[variavel]
+    componente = next(iter(calculos.COMPONENTES_COMPARACAO))
+    horizonte = previsao.HIPERPARAMETROS_PADRAO["horizonte"]
+
+    def rerun():
+        # Mesma sequência do final1.py (seções A a E), sem o Streamlit
+        fatias = calculos.filtrar(cubo_dados, estados, anos)
+        df_filtrado = calculos.tabela_filtrada(fatias, tabela_populacao)
+        df_metricas = calculos.metricas_por_estado(fatias, tabela_populacao)
+        df_estados = calculos.casos_por_estado(fatias)
+        calculos.totais(fatias)
+        df_previsao = calculos.previsao_mensal(previsoes, camada, estados, horizonte)
+        df_normalizado = calculos.comparacao_sazonal(
+            camada, coluna, estados, anos, componente=calculos.COMPONENTES_COMPARACAO[componente]
+        )
+        return [
+            figuras.mapa_metrica(df_metricas, next(iter(calculos.METRICAS_MAPA)), url_geometria),
+            figuras.pizza_estados(df_estados),
+            figuras.barras_estados(df_estados),
+            figuras.evolucao_casos(calculos.agregar_mensal(fatias), df_previsao),
+            figuras.dispersao_clima(df_filtrado, variavel),
+            figuras.evolucao_climatica(calculos.agregar_mensal(fatias, somas=(), medias=(coluna,)),
+                                       variavel),
+            figuras.comparacao_normalizada(df_normalizado, variavel, componente),
+            figuras.correlacao_defasada(correlacoes, correlacao.TODOS),
+            figuras.radar_agrupamentos(resultado_clusters),
+            figuras.pizza_agrupamentos(calculos.casos_por_agrupamento(resultado_clusters)),
+            figuras.meses_agrupamentos(resultado_clusters["contagem"]),
+        ]
+
+    etapas = {
+        "carga": dados.carregar_dados,
+        "rerun": rerun,
+        "clusterizacao": lambda: clusterizacao.ajustar_clusters(df, hiperparametros),
+        "clusterizacao_minibatch": lambda: clusterizacao.ajustar_clusters(df, {"motor": "minibatch"}),
+    }
+    # Aquecimento: os imports tardios não entram no pico das etapas
+    rerun()
+    clusterizacao.ajustar_clusters(df.head(1000), {"n_init": 1})
+    clusterizacao.ajustar_clusters(df.head(1000), {"motor": "minibatch"})
+
+    tamanho = int(df.memory_usage(deep=True).sum())
+    picos = {}
+    for nome, funcao in etapas.items():
+        gc.collect()
+        arrow = pa.total_allocated_bytes()
+        tracemalloc.start()
+        resultado = funcao()
+        pico = tracemalloc.get_traced_memory()[1] + max(0, pa.total_allocated_bytes() - arrow)
+        tracemalloc.stop()
+        del resultado
+        picos[nome] = {"pico_mb": pico / 2**20, "razao": pico / tamanho}
+    return {"tamanho_dataset_mb": tamanho / 2**20, "etapas": picos}
+
+
+def medir_etapas(reruns=3, app=True, n_init=None, memoria=False):
+    """Mede o painel e cada etapa sobre o dataset de PAINEL_CSV / PAINEL_ARTEFATOS."""
+    import plotly.io as pio
+
+    from painel import clusterizacao, figuras
+
+    etapas = medir_app(reruns) if app else []
+    cronometro = Cronometro()
+    medir = cronometro.medir
+
+    medir("leitura_csv", dados.ler_csv)
+    medir("conversao_colunar", dados.converter_csv)
+    df = medir("carga", dados.carregar_dados)
+    cubo_dados = medir("cubo", lambda: cubo.construir_cubo(df))
+    tabela_populacao = populacao.carregar_populacao()
+
+    estados, anos = cubo_dados["estados"], cubo_dados["anos"]
+    fatias = medir("filtro", lambda: calculos.filtrar(cubo_dados, estados, anos))
+    medir("filtro_recorte", lambda: calculos.filtrar(cubo_dados, estados[::2], anos[-1:], 3, 6))
+    df_filtrado = medir("agregacao_celulas", lambda: calculos.tabela_filtrada(fatias))
+    medir("juncao_populacao", lambda: populacao.populacao_por_linha(df_filtrado, tabela_populacao))
+    df_filtrado = calculos.tabela_filtrada(fatias, tabela_populacao)
+    df_estados = medir("agregacao_estados", lambda: calculos.casos_por_estado(fatias))
+    df_mensal = medir("agregacao_mensal",
+                      lambda: calculos.agregar_mensal(fatias, medias=("TEMPERATURA",)))
+    medir("totais", lambda: calculos.totais(fatias))
+    camada = medir("sazonalidade", lambda: sazonalidade.construir(cubo_dados))
+    df_normalizado = medir("comparacao_sazonal", lambda: calculos.comparacao_sazonal(
+        camada, "TEMPERATURA", estados, anos))
+    medir("comparacao_sazonal_recorte", lambda: calculos.comparacao_sazonal(
+        camada, "TEMPERATURA", estados[::2], anos[-1:], 3, 6, componente="sazonal"))
+
+    previsoes = medir("previsao_ajuste", lambda: previsao.ajustar(camada))
+    df_previsao = medir("previsao_consulta", lambda: calculos.previsao_mensal(previsoes, camada, estados))
+
+    correlacoes = medir("correlacao_defasada", lambda: calculos.correlacoes_defasadas(cubo_dados))
+
+    hiperparametros = {"motor": "elkan", **({"n_init": n_init} if n_init else {})}
+    resultado = medir("clusterizacao", lambda: clusterizacao.ajustar_clusters(df, hiperparametros))
+    medir("clusterizacao_minibatch", lambda: clusterizacao.ajustar_clusters(df, {"motor": "minibatch"}))
+
+    montagens = {
+        "pizza_estados": lambda: figuras.pizza_estados(df_estados),
+        "barras_estados": lambda: figuras.barras_estados(df_estados),
+        "evolucao_casos": lambda: figuras.evolucao_casos(df_mensal, df_previsao),
+        "dispersao": lambda: figuras.dispersao_clima(df_filtrado, "Temperatura"),
+        # Uma linha por município e mês: passa pelos modos WebGL e densidade
+        "dispersao_linhas": lambda: figuras.dispersao_clima(df, "Temperatura"),
+        "evolucao_climatica": lambda: figuras.evolucao_climatica(df_mensal, "Temperatura"),
+        "evolucao_normalizada": lambda: figuras.comparacao_normalizada(df_normalizado, "Temperatura"),
+        "correlacao_defasada": lambda: figuras.correlacao_defasada(correlacoes, correlacao.TODOS),
+        "radar": lambda: figuras.radar_agrupamentos(resultado),
+        "pizza_agrupamentos": lambda: figuras.pizza_agrupamentos(calculos.casos_por_agrupamento(resultado)),
+        "meses_agrupamentos": lambda: figuras.meses_agrupamentos(resultado["contagem"]),
+    }
+    tamanhos = {}
+    for nome, montar in montagens.items():
+        # Montagem + serialização, o que o Streamlit faz antes de enviar a figura
+        spec = medir(f"figura[{nome}]", lambda: pio.to_json(montar(), validate=False))
+        tamanhos[nome] = len(spec)
+
+    resultado = {
+        "linhas": len(df),
+        "estados": len(estados),
+        "anos": len(anos),
+        "celulas": len(df_filtrado),
+        "etapas": etapas + cronometro.etapas,
+        "bytes_figuras": tamanhos,
+        "pico_memoria_mb": pico_memoria_mb(),
+    }
+    if memoria:
+        # Depois dos tempos: o tracemalloc deixa as etapas mais lentas
+        del df, df_filtrado, fatias, cubo_dados
+        resultado["memoria"] = medir_memoria(n_init)
+    return resultado
+
+
+# ------------------------------------------------------------------------------
+# Orquestração: um processo por escala
+
+def ambiente():
+    import plotly
+    import sklearn
+    import streamlit
+
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "scikit-learn": sklearn.__version__,
+        "plotly": plotly.__version__,
+        "streamlit": streamlit.__version__,
+    }
+
+
+def _copiar_geometria(destino_artefatos):
+    """Copia os artefatos de geometria para não depender da rede em cada escala."""
+    origem = os.path.join(DIRETORIO_ARTEFATOS, "geometria")
+    if os.path.isdir(origem):
+        shutil.copytree(origem, os.path.join(destino_artefatos, "geometria"))
+
+
+def executar_escala(n_linhas, reruns=3, app=True, n_init=None, semente=0, base=None, memoria=False):
+    """Gera o dataset sintético e mede tudo num processo novo, com artefatos próprios."""
+    with tempfile.TemporaryDirectory(prefix="painel_benchmark_") as temporario:
+        inicio = time.perf_counter()
+        df = gerar_sintetico(n_linhas, semente, base)
+        caminho_csv = os.path.join(temporario, "dataset.csv")
+        caminho_populacao = os.path.join(temporario, "populacao.csv")
+        escrever_csv(df, caminho_csv)
+        populacao_sintetica(df, semente).to_csv(caminho_populacao, index=False)
+        geracao_s = time.perf_counter() - inicio
+        del df
+
+        artefatos = os.path.join(temporario, "artefatos")
+        _copiar_geometria(artefatos)
+        caminho_resultado = os.path.join(temporario, "resultado.json")
+        comando = [sys.executable, "-m", "painel.benchmark", "--escala-atual", caminho_resultado,
+                   "--reruns", str(reruns)]
+        if not app:
+            comando.append("--sem-app")
+        if n_init:
+            comando += ["--n-init", str(n_init)]
+        if memoria:
+            comando.append("--orcamento-memoria")
+        ambiente_processo = {**os.environ, "PAINEL_ARTEFATOS": artefatos,
+                             "PAINEL_CSV": caminho_csv, "PAINEL_POPULACAO": caminho_populacao}
+        # A saída do Streamlit (avisos do AppTest) só é mostrada se o processo falhar
+        processo = subprocess.run(comando, env=ambiente_processo, cwd=DIRETORIO_RAIZ,
+                                  capture_output=True, text=True)
+        if processo.returncode:
+            sys.stderr.write(processo.stderr)
+            processo.check_returncode()
+
+        with open(caminho_resultado, encoding="utf-8") as arquivo:
+            resultado = json.load(arquivo)
+    return {"escala": n_linhas, "municipios": dimensoes(n_linhas)[2], "geracao_s": geracao_s, **resultado}
+
+
+def executar(escalas=ESCALAS_PADRAO, reruns=3, app=True, n_init=None, semente=0, relatorio=print,
+             memoria=False):
+    """Resultados de todas as escalas, com a descrição do ambiente."""
+    base = dados.ler_csv()
+    resultados = []
+    for n_linhas in escalas:
+        resultado = executar_escala(n_linhas, reruns, app, n_init, semente, base, memoria)
+        resultados.append(resultado)
+        relatorio(f"\n{n_linhas:,} linhas ({resultado['estados']} estados, {resultado['anos']} anos, "
+                  f"{resultado['municipios']} municípios; pico {resultado['pico_memoria_mb']:.0f} MiB)")
+        for etapa in resultado["etapas"]:
+            relatorio(f"  {etapa['etapa']:<40} {etapa['parede_ms']:10.1f} ms  "
+                      f"CPU {etapa['cpu_ms']:10.1f} ms  {etapa['pico_memoria_mb']:7.0f} MiB")
+        if memoria:
+            relatorio(f"  memória (dataset {resultado['memoria']['tamanho_dataset_mb']:.1f} MiB)")
+            for nome, etapa in resultado["memoria"]["etapas"].items():
+                relatorio(f"  {nome:<40} pico {etapa['pico_mb']:8.1f} MiB  {etapa['razao']:5.2f}x")
+    return {"ambiente": ambiente(), "reruns": reruns, "resultados": resultados}
+
+
+def comparar(atual, anterior, tolerancia=TOLERANCIA):
+    """Etapas mais lentas que no resultado `anterior` além da tolerância relativa."""
+    referencia = {
+        (r["escala"], e["etapa"]): e["parede_ms"]
+        for r in anterior["resultados"] for e in r["etapas"]
+    }
+    regressoes = []
+    for r in atual["resultados"]:
+        for e in r["etapas"]:
+            antes = referencia.get((r["escala"], e["etapa"]))
+            if antes is None or max(antes, e["parede_ms"]) < MINIMO_COMPARACAO_MS:
+                continue
+            if e["parede_ms"] > antes * (1 + tolerancia):
+                regressoes.append({"escala": r["escala"], "etapa": e["etapa"],
+                                   "antes_ms": antes, "depois_ms": e["parede_ms"]})
+    return regressoes
+
+
+def verificar_orcamento(atual, orcamento=ORCAMENTO_MEMORIA):
+    """Etapas cujo pico de memória passou do orçamento (múltiplo do tamanho do dataset)."""
+    excessos = []
+    for r in atual["resultados"]:
+        if r["escala"] < MINIMO_LINHAS_ORCAMENTO:
+            continue
+        for nome, etapa in r.get("memoria", {}).get("etapas", {}).items():
+            if nome in orcamento and etapa["razao"] > orcamento[nome]:
+                excessos.append({"escala": r["escala"], "etapa": nome, "pico_mb": etapa["pico_mb"],
+                                 "razao": etapa["razao"], "limite": orcamento[nome]})
+    return excessos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do painel com datasets sintéticos.")
+    parser.add_argument("--linhas", type=int, nargs="+", default=ESCALAS_PADRAO,
+                        help="Número de linhas de cada escala")
+    parser.add_argument("--reruns", type=int, default=3, help="Repetições de cada rerun do painel")
+    parser.add_argument("--sem-app", action="store_true", help="Não executa o painel pelo AppTest")
+    parser.add_argument("--n-init", type=int, default=None,
+                        help="n_init do KMeans na etapa de clusterização (padrão: o do painel)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default="benchmark.json")
+    parser.add_argument("--comparar", help="Resultado anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument("--orcamento-memoria", action="store_true",
+                        help="Mede o pico de memória por etapa e falha se passar do orçamento")
+    parser.add_argument("--escala-atual", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.escala_atual:
+        # Processo filho de uma escala: dataset e artefatos vêm do ambiente
+        resultado = medir_etapas(args.reruns, not args.sem_app, args.n_init, args.orcamento_memoria)
+        with open(args.escala_atual, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo)
+        sys.exit()
+
+    resultados = executar(args.linhas, args.reruns, not args.sem_app, args.n_init, args.semente,
+                          memoria=args.orcamento_memoria)
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
+    print(f"\nResultados em {args.saida}")
+
+    falhas = []
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            regressoes = comparar(resultados, json.load(arquivo), args.tolerancia)
+        for r in regressoes:
+            print(f"REGRESSÃO {r['escala']:,} linhas, {r['etapa']}: "
+                  f"{r['antes_ms']:.1f} ms -> {r['depois_ms']:.1f} ms")
+        falhas += regressoes
+    if args.orcamento_memoria:
+        excessos = verificar_orcamento(resultados)
+        for e in excessos:
+            print(f"MEMÓRIA {e['escala']:,} linhas, {e['etapa']}: pico {e['pico_mb']:.1f} MiB "
+                  f"= {e['razao']:.2f}x o dataset (limite {e['limite']}x)")
+        falhas += excessos
+    if args.comparar or args.orcamento_memoria:
+        sys.exit(1 if falhas else 0)
@@ -0,0 +1,169 @@
+"""Cache do processo para dados, modelos e agregados, compartilhado entre sessões.
+
+Cada sessão do navegador é uma thread do mesmo processo do Streamlit. O que
+não depende da sessão (dataset, cubo, camada de sazonalidade, modelos,
+correlações, geometria) é calculado uma vez e servido a todas. O cache
+guarda cada resultado sob a chave (tipo, chave normalizada), com:
+
+- tempo de vida por item (o padrão do cache ou o passado em `obter`);
+- limite de itens e de bytes estimados, removendo os menos usados (LRU);
+- uma construção por chave: sessões que pedem a mesma chave ao mesmo tempo
+  esperam a primeira em vez de repetir o trabalho.
+
+O tamanho de cada item é estimado por `tamanho_objeto` (DataFrames e
+arrays pelo que ocupam em memória, dicionários e listas somando os itens).
+Os limites padrão vêm de PAINEL_CACHE_MB e PAINEL_CACHE_TTL (segundos).
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MAX_ITENS = 512
+MAX_BYTES = int(float(os.environ.get("PAINEL_CACHE_MB", 2048)) * 1024 * 1024)
+TTL_SEGUNDOS = float(os.environ.get("PAINEL_CACHE_TTL", 6 * 60 * 60))
+
+_AUSENTE = object()
+
+
+def normalizar_selecao(selecao):
+    """Chave estável para uma seleção: listas e conjuntos ordenados, dicionários por chave."""
+    if isinstance(selecao, dict):
+        return tuple((chave, normalizar_selecao(valor)) for chave, valor in sorted(selecao.items()))
+    if isinstance(selecao, (list, tuple, set, frozenset)):
+        itens = [normalizar_selecao(valor) for valor in selecao]
+        return tuple(itens if isinstance(selecao, tuple) else sorted(itens))
+    if hasattr(selecao, "item"):
+        # Escalares do NumPy (ex.: np.int16 vindo do cubo) viram tipos do Python
+        return selecao.item()
+    return selecao
+
+
+def tamanho_objeto(objeto, _vistos=None):
+    """Estimativa dos bytes ocupados por `objeto` e pelo que ele contém."""
+    vistos = set() if _vistos is None else _vistos
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+    if isinstance(objeto, (pd.DataFrame, pd.Series, pd.Index)):
+        uso = objeto.memory_usage(deep=True)
+        return int(uso.sum() if hasattr(uso, "sum") else uso)
+    if isinstance(objeto, np.ndarray):
+        # Views contam os próprios bytes: a origem pode ser um buffer do Arrow
+        # (carregar_dados usa split_blocks), que não é um ndarray
+        return objeto.nbytes
+    if isinstance(objeto, (str, bytes)):
+        return sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        return sys.getsizeof(objeto) + sum(
+            tamanho_objeto(chave, vistos) + tamanho_objeto(valor, vistos) for chave, valor in objeto.items()
+        )
+    if isinstance(objeto, (list, tuple, set, frozenset)):
+        return sys.getsizeof(objeto) + sum(tamanho_objeto(item, vistos) for item in objeto)
+    if hasattr(objeto, "__dict__"):
+        # Modelos do scikit-learn e afins: os atributos ajustados
+        return sys.getsizeof(objeto) + tamanho_objeto(vars(objeto), vistos)
+    return sys.getsizeof(objeto)
+
+
+class CacheCompartilhado:
+    """LRU do processo, limitado por itens, bytes e tempo de vida, seguro entre threads.
+
+    O lock geral protege só a tabela; cada construção roda fora dele, sob um
+    lock da própria chave, então chaves diferentes são construídas em
+    paralelo e a mesma chave, uma vez. Um item maior que `max_bytes` é
+    devolvido, mas fica sozinho no cache até a próxima inserção.
+    """
+
+    def __init__(self, max_itens=MAX_ITENS, max_bytes=MAX_BYTES, ttl_segundos=TTL_SEGUNDOS,
+                 relogio=time.monotonic, tamanho=tamanho_objeto):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.ttl_segundos = ttl_segundos
+        self._relogio = relogio
+        self._tamanho = tamanho
+        self._itens = OrderedDict()  # chave -> (valor, bytes, instante de expiração)
+        self._construcoes = {}  # chave -> lock da construção em andamento
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.esperas = 0
+        self.expiradas = 0
+        self.removidas = 0
+
+    def obter(self, tipo, chave, construir, ttl_segundos=None):
+        """Valor de `tipo` para a `chave`, chamando `construir()` na falta."""
+        chave = (tipo, normalizar_selecao(chave))
+        with self._lock:
+            valor = self._consultar(chave)
+            if valor is not _AUSENTE:
+                self.acertos += 1
+                return valor
+            self.faltas += 1
+            trava = self._construcoes.setdefault(chave, threading.Lock())
+
+        with trava:
+            with self._lock:
+                # Outra sessão pode ter construído enquanto esta esperava
+                valor = self._consultar(chave)
+                if valor is not _AUSENTE:
+                    self.esperas += 1
+                    return valor
+            try:
+                valor = construir()
+                self._inserir(chave, valor, self.ttl_segundos if ttl_segundos is None else ttl_segundos)
+            finally:
+                with self._lock:
+                    self._construcoes.pop(chave, None)
+        return valor
+
+    def _consultar(self, chave):
+        item = self._itens.get(chave)
+        if item is None:
+            return _AUSENTE
+        if self._relogio() > item[2]:
+            self._remover(chave)
+            self.expiradas += 1
+            return _AUSENTE
+        self._itens.move_to_end(chave)
+        return item[0]
+
+    def _inserir(self, chave, valor, ttl_segundos):
+        tamanho = self._tamanho(valor)
+        with self._lock:
+            if chave in self._itens:
+                self._remover(chave)
+            self._itens[chave] = (valor, tamanho, self._relogio() + ttl_segundos)
+            self._bytes += tamanho
+            while len(self._itens) > 1 and (len(self._itens) > self.max_itens
+                                            or self._bytes > self.max_bytes):
+                self._remover(next(iter(self._itens)))
+                self.removidas += 1
+
+    def _remover(self, chave):
+        _, tamanho, _ = self._itens.pop(chave)
+        self._bytes -= tamanho
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "itens": len(self._itens),
+                "bytes": self._bytes,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+                "esperas": self.esperas,
+                "expiradas": self.expiradas,
+                "removidas": self.removidas,
+            }
@@ -0,0 +1,42 @@
+"""Cache LRU das figuras Plotly já montadas, por seleção e tipo de figura.
+
+Montar uma figura com `plotly.express` (agregação, validação dos traços,
+layout) custa dezenas de milissegundos, e a mesma combinação de filtros se
+repete muito entre reruns e entre sessões. O cache guarda a `go.Figure`
+montada sob a chave (tipo da figura, seleção normalizada), com limite de
+itens, de bytes e tempo de vida, e conta acertos e faltas
+(`CacheCompartilhado`).
+
+A figura é validada uma vez, na montagem. Na leitura, `st.plotly_chart`
+só a converte para JSON: uma `go.Figure` pronta não é revalidada, ao
+contrário de um dicionário, que o Streamlit reconstrói como figura a cada
+renderização. As figuras são compartilhadas entre sessões e não devem ser
+alteradas depois de entrarem no cache.
+"""
+import time
+
+import plotly.io as pio
+
+from painel.cache_compartilhado import CacheCompartilhado
+
+MAX_ITENS = 256
+MAX_BYTES = 64 * 1024 * 1024
+TTL_SEGUNDOS = 60 * 60
+
+
+def tamanho_figura(figura):
+    """Bytes do JSON da figura (o que é enviado ao navegador)."""
+    return len(pio.to_json(figura, validate=False))
+
+
+class CacheFiguras(CacheCompartilhado):
+    """LRU de figuras montadas, limitado por itens, bytes e tempo de vida.
+
+    Uma instância é compartilhada por todas as sessões do processo; o
+    tamanho de cada item é o do JSON da figura. Duas sessões pedindo a mesma
+    figura ao mesmo tempo montam-na uma vez só (veja `CacheCompartilhado`).
+    """
+
+    def __init__(self, max_itens=MAX_ITENS, max_bytes=MAX_BYTES, ttl_segundos=TTL_SEGUNDOS,
+                 relogio=time.monotonic):
+        super().__init__(max_itens, max_bytes, ttl_segundos, relogio, tamanho=tamanho_figura)
@@ -0,0 +1,238 @@
+"""Cálculos do painel como funções puras, sem Streamlit.
+
+Cada função recebe dados já carregados (cubo, tabela de população, resultado
+da clusterização) e devolve DataFrames ou valores simples. O `final1.py`
+só chama estas funções e desenha o resultado; lotes, benchmarks e a
+exportação (`python -m painel.exportar`) usam as mesmas funções.
+"""
+import numpy as np
+import pandas as pd
+
+from painel import clusterizacao, correlacao, cubo, populacao, previsao, sazonalidade
+from painel.dados import COLUNAS_CLIMATICAS
+
+MESES = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun",
+         "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+
+# Nome exibido do fator climático -> coluna do dataset
+OPCOES_CLIMATICAS = {
+    "Temperatura": "TEMPERATURA",
+    "Precipitação": "PRECIPITACAO",
+    "Radiação": "RADIACAO",
+    "Pressão": "PRESSAO",
+}
+
+UNIDADES_CLIMATICAS = {
+    "Temperatura": "Temperatura média (°C)",
+    "Precipitação": "Precipitação total (mm)",
+    "Radiação": "Radiação global (Kj/m²)",
+    "Pressão": "Pressão atmosférica (mB)",
+}
+
+# Métrica exibida no mapa -> coluna de `metricas_por_estado`
+METRICAS_MAPA = {
+    "Incidência (por 100 mil hab.)": "incidencia",
+    "Letalidade (%)": "letalidade",
+    "Casos": "Casos_Total",
+}
+
+# Componente exibido na comparação normalizada -> chave da camada de sazonalidade
+COMPONENTES_COMPARACAO = {
+    "Série observada": "observado",
+    "Tendência": "tendencia",
+    "Sazonalidade": "sazonal",
+    "Resíduo": "residuo",
+}
+
+# Coluna climática do dataset -> nome exibido (todas as variáveis do INMET)
+NOMES_CLIMATICOS = {
+    "TEMPERATURA": "Temperatura",
+    "PONTO_ORVALHO": "Ponto de orvalho",
+    "UMIDADE": "Umidade",
+    "VENTO": "Vento",
+    "PRECIPITACAO": "Precipitação",
+    "RADIACAO": "Radiação",
+    "PRESSAO": "Pressão",
+}
+
+
+def selecao_completa(cubo_dados, estados=None, anos=None, mes_inicio=1, mes_fim=12):
+    """Seleção normalizada: nada escolhido = todos os estados/anos do cubo."""
+    return {
+        "estados": sorted(estados or cubo_dados["estados"]),
+        "anos": sorted(int(ano) for ano in (anos or cubo_dados["anos"])),
+        "meses": (int(mes_inicio), int(mes_fim)),
+    }
+
+
+def filtrar(cubo_dados, estados, anos, mes_inicio=1, mes_fim=12):
+    """Células do cubo no recorte pedido.
+
+    Devolve {"mensal": células (estado, ano, mês), "totais": células usadas
+    nos totais}. Com o ano inteiro selecionado os totais vêm do rollup
+    (estado, ano), que tem 12 vezes menos linhas.
+    """
+    mensal = cubo.selecionar(cubo_dados["estado_ano_mes"], estados, anos, mes_inicio, mes_fim)
+    if (mes_inicio, mes_fim) == (1, 12):
+        totais = cubo.selecionar(cubo_dados["estado_ano"], estados, anos)
+    else:
+        totais = mensal
+    return {"mensal": mensal, "totais": totais}
+
+
+def tabela_filtrada(fatias, tabela_populacao=None):
+    """Uma linha por (estado, ano, mês) do recorte, com as médias climáticas e a população."""
+    df = cubo.agregar(fatias["mensal"], cubo.CHAVES, ["Casos_Total", "Obitos_Total"], COLUNAS_CLIMATICAS)
+    if tabela_populacao is not None:
+        df = df.assign(POPULACAO=populacao.populacao_por_linha(df, tabela_populacao))
+    return df
+
+
+def totais(fatias):
+    """Casos, óbitos e taxa de letalidade (%) do recorte."""
+    soma = cubo.agregar(fatias["totais"], [], ["Casos_Total", "Obitos_Total"])
+    casos, obitos = int(soma["Casos_Total"]), int(soma["Obitos_Total"])
+    return {
+        "casos": casos,
+        "obitos": obitos,
+        "letalidade": obitos / casos * 100 if casos > 0 else 0,
+    }
+
+
+def casos_por_estado(fatias):
+    """Casos e óbitos por estado no recorte."""
+    return cubo.agregar(fatias["totais"], ["ESTADO"], ["Casos_Total", "Obitos_Total"])
+
+
+def metricas_por_estado(fatias, tabela_populacao):
+    """Casos, óbitos, incidência por 100 mil habitantes e letalidade (%) por estado no recorte.
+
+    A incidência usa a população média dos anos do recorte; estados sem
+    população na tabela ficam sem incidência, e sem casos, sem letalidade.
+    """
+    por_ano = cubo.agregar(fatias["totais"], ["ESTADO", "ANO_IS"], ["Casos_Total", "Obitos_Total"])
+    por_ano["POPULACAO"] = populacao.populacao_por_linha(por_ano, tabela_populacao)
+    df = por_ano.groupby("ESTADO", observed=True).agg(
+        Casos_Total=("Casos_Total", "sum"),
+        Obitos_Total=("Obitos_Total", "sum"),
+        POPULACAO=("POPULACAO", "mean"),
+    ).reset_index()
+    df["incidencia"] = df["Casos_Total"] / df["POPULACAO"] * 100_000
+    df["letalidade"] = (df["Obitos_Total"] / df["Casos_Total"] * 100).where(df["Casos_Total"] > 0)
+    return df
+
+
+def agregar_mensal(fatias, somas=("Casos_Total",), medias=()):
+    """Somas e médias climáticas por (ano, mês) no recorte."""
+    return cubo.agregar(fatias["mensal"], ["ANO_IS", "MES_IS"], somas, medias)
+
+
+def densidade_dispersao(x, y, faixas=60):
+    """Histograma 2D de (x, y), para dispersões com pontos demais para desenhar.
+
+    Pares com valor ausente são ignorados. Devolve as bordas das faixas em x e
+    em y, a contagem de pontos e a soma de y em cada célula (linhas = faixas
+    de y), com tamanho fixo qualquer que seja o número de pontos.
+    """
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    validos = np.isfinite(x) & np.isfinite(y)
+    x, y = x[validos], y[validos]
+    contagem, bordas_x, bordas_y = np.histogram2d(x, y, bins=faixas)
+    soma_y, _, _ = np.histogram2d(x, y, bins=[bordas_x, bordas_y], weights=y)
+    return {"bordas_x": bordas_x, "bordas_y": bordas_y,
+            "contagem": contagem.T, "soma_y": soma_y.T}
+
+
+def comparacao_sazonal(camada, coluna_climatica, estados, anos, mes_inicio=1, mes_fim=12,
+                       componente="observado"):
+    """Casos, óbitos e um fator climático normalizados, em formato longo, no eixo mensal.
+
+    As séries saem da camada de sazonalidade (`painel.sazonalidade`): casos e
+    óbitos somados nos estados, o fator climático a média das observações. A
+    normalização usa as estatísticas de cada série no período inteiro, então
+    a escala não muda com o recorte de anos e meses. O eixo vai do primeiro
+    ao último mês do recorte; os meses fora dele ficam sem valor.
+    """
+    series = sazonalidade.serie_selecao(camada, estados)
+    variaveis = ["Casos_Total", "Obitos_Total", coluna_climatica]
+    posicoes = [camada["variaveis"].index(v) for v in variaveis]
+
+    anos = sorted(int(ano) for ano in anos)
+    eixo = camada["periodos"]
+    no_eixo = (eixo >= anos[0] * 12 + mes_inicio - 1) & (eixo <= anos[-1] * 12 + mes_fim - 1)
+    periodos = eixo[no_eixo]
+    meses = periodos % 12 + 1
+    no_recorte = np.isin(periodos // 12, anos) & (meses >= mes_inicio) & (meses <= mes_fim)
+    valores = sazonalidade.normalizar(series, componente)[posicoes][:, no_eixo]
+
+    nomes = {"Casos_Total": "Casos", "Obitos_Total": "Óbitos",
+             **{coluna: nome for nome, coluna in OPCOES_CLIMATICAS.items()}}
+    return pd.DataFrame({
+        "ANO_IS": np.tile(periodos // 12, len(variaveis)),
+        "MES_IS": np.tile(meses, len(variaveis)),
+        "VERAO": np.tile(camada["verao"][no_eixo], len(variaveis)),
+        "Variável": np.repeat([nomes[v] for v in variaveis], len(periodos)),
+        "Valor": np.where(no_recorte, valores, np.nan).ravel(),
+    })
+
+
+def faixas_verao(df_long):
+    """Intervalos (primeiro, último) de meses de verão seguidos, como datas do eixo."""
+    meses = df_long.drop_duplicates(["ANO_IS", "MES_IS"])
+    datas = datas_mensais(meses).to_numpy()
+    verao = meses["VERAO"].to_numpy()
+    bordas = np.flatnonzero(np.diff(np.r_[False, verao, False]))
+    return [(datas[inicio], datas[fim - 1]) for inicio, fim in zip(bordas[::2], bordas[1::2])]
+
+
+def previsao_mensal(resultado, camada, estados, horizonte=None, mes_inicio=1, mes_fim=12):
+    """Casos previstos para os próximos meses nos `estados` somados, com o intervalo.
+
+    Usa os modelos já ajustados (`painel.previsao`); só os meses alvo entre
+    `mes_inicio` e `mes_fim` entram, como no resto do recorte.
+    """
+    df = previsao.prever(resultado, camada, estados, horizonte)
+    return df[df["MES_IS"].between(mes_inicio, mes_fim)].reset_index(drop=True)
+
+
+def correlacoes_defasadas(cubo_dados, defasagens=correlacao.DEFASAGENS):
+    """Pearson e Spearman de cada variável climática defasada contra os casos, por estado.
+
+    Usa o período completo do cubo (os filtros não se aplicam) e inclui a
+    série de todos os estados somados (`correlacao.TODOS`).
+    """
+    return correlacao.calcular(cubo_dados, list(NOMES_CLIMATICOS), defasagens)
+
+
+def ajustar_agrupamentos(df, k=None, varredura=None, chave_dados=None):
+    """Resultado da clusterização para `k` agrupamentos.
+
+    Usa o modelo padrão salvo (ou o ajusta) quando `k` é o padrão ou não foi
+    informado; para outros valores, o melhor ajuste da `varredura`.
+    """
+    k_padrao = clusterizacao.HIPERPARAMETROS_PADRAO["n_clusters"]
+    if k is None or k == k_padrao:
+        return clusterizacao.carregar_ou_ajustar(df, chave_dados=chave_dados)
+    if varredura is None:
+        return clusterizacao.ajustar_clusters(df, {"n_clusters": k})
+    return clusterizacao.resultado_da_varredura(df, varredura, k)
+
+
+def casos_por_agrupamento(resultado):
+    """Casos totais por agrupamento, com o rótulo exibido."""
+    casos = resultado["cluster_summary"][["cluster", "total_casos"]].rename(
+        columns={"total_casos": "Casos_Total"}
+    )
+    return casos.assign(agrupamento=casos["cluster"].map(lambda c: f"Agrupamento {c}"))
+
+
+def rotulos_data(df):
+    """Texto "Mês/Ano" de cada linha, usado nas dicas dos gráficos."""
+    meses = pd.Series(MESES, index=range(1, 13))
+    return df["MES_IS"].map(meses) + "/" + df["ANO_IS"].astype(str)
+
+
+def datas_mensais(df):
+    """Primeiro dia do mês de cada linha, para eixos de tempo contínuos."""
+    return pd.to_datetime(pd.DataFrame({"year": df["ANO_IS"], "month": df["MES_IS"], "day": 1}))
@@ -0,0 +1,208 @@
+"""Teste de carga: N sessões simultâneas clicando nos seletores do painel.
+
+Sobe o servidor do Streamlit num processo novo, como o `painel.medir_partida`,
+e conecta N sessões pelo websocket, cada uma numa thread deste processo, como
+N abas do navegador. Todas dividem os caches do servidor (dados, modelos e
+figuras), mas cada uma tem o próprio estado de sessão. Depois da primeira
+execução, cada sessão faz uma sequência de cliques sorteados nos anos, nos
+estados e no fator climático; cada clique envia o estado de todos os widgets
+e o fragmento do widget, como o navegador, e espera o fim da execução. Para
+cada N são medidas a latência dos reruns (p50 e p95, em tempo de parede) e a
+vazão do servidor (reruns por segundo):
+
+    python -m painel.carga_sessoes --sessoes 1 2 4 8 16 --cliques 20 --saida carga.json
+
+Antes das medidas, uma sessão de aquecimento preenche os caches; com
+`--modo aquecido` o servidor já sobe com eles prontos, como em produção.
+Uma sessão que falha é contada e relatada sem interromper as outras.
+"""
+import argparse
+import json
+import random
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from painel.calculos import OPCOES_CLIMATICAS
+from painel.config import DIRETORIO_RAIZ
+from painel.medir_partida import MODOS, OPCOES_SERVIDOR, esperar_servidor, porta_livre
+
+SESSOES_PADRAO = [1, 2, 4, 8, 16]
+
+
+@contextmanager
+def servidor(modo="streamlit"):
+    """Sobe o servidor do painel numa porta livre e devolve a porta."""
+    porta = porta_livre()
+    comando = [*MODOS[modo], *OPCOES_SERVIDOR, "--server.port", str(porta)]
+    processo = subprocess.Popen(comando, cwd=DIRETORIO_RAIZ,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        esperar_servidor(porta, processo)
+        yield porta
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+class Sessao:
+    """Uma sessão do navegador: a conexão, os widgets vistos e os valores enviados."""
+
+    def __init__(self, conexao, timeout=600):
+        self.conexao = conexao
+        self.timeout = timeout
+        self.widgets = {}  # id -> (tipo, rótulo, opções, fragmento)
+        self.valores = {}  # id -> valor enviado ao servidor
+
+    def executar(self, fragmento=""):
+        """Pede uma execução com o estado atual dos widgets; devolve os segundos até o fim."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        pedido = BackMsg()
+        pedido.rerun_script.fragment_id = fragmento
+        for widget_id, valor in self.valores.items():
+            estado = pedido.rerun_script.widget_states.widgets.add()
+            estado.id = widget_id
+            if isinstance(valor, bool):
+                estado.bool_value = valor
+            else:
+                estado.string_value = valor
+
+        inicio = time.perf_counter()
+        self.conexao.send(pedido.SerializeToString())
+        while True:
+            mensagem = ForwardMsg()
+            mensagem.ParseFromString(self.conexao.recv(timeout=self.timeout))
+            if mensagem.HasField("script_finished"):
+                return time.perf_counter() - inicio
+            if mensagem.HasField("delta") and mensagem.delta.HasField("new_element"):
+                self._registrar(mensagem.delta.new_element, mensagem.delta.fragment_id)
+
+    def _registrar(self, elemento, fragmento):
+        tipo = elemento.WhichOneof("type")
+        if tipo == "exception":
+            raise RuntimeError(f"{elemento.exception.type}: {elemento.exception.message}")
+        if tipo == "checkbox":
+            widget = elemento.checkbox
+            self.widgets[widget.id] = (tipo, widget.label, None, fragmento)
+            self.valores.setdefault(widget.id, widget.value if widget.set_value else widget.default)
+        elif tipo == "radio":
+            widget = elemento.radio
+            self.widgets[widget.id] = (tipo, widget.label, list(widget.options), fragmento)
+
+    def sortear_clique(self, rng):
+        """Troca o valor de um ano, estado ou fator climático; devolve o fragmento do widget."""
+        anos, estados, radios = [], [], []
+        for widget_id, (tipo, rotulo, _, _) in self.widgets.items():
+            if tipo == "checkbox" and rotulo.isdigit():
+                anos.append(widget_id)
+            elif tipo == "checkbox" and rotulo.isalpha() and rotulo.isupper():
+                estados.append(widget_id)
+            elif tipo == "radio" and widget_id.endswith("-fator_climatico_radio"):
+                radios.append(widget_id)
+
+        opcao = rng.choice([nome for nome, ids in (("ano", anos), ("estado", estados), ("clima", radios))
+                            if ids])
+        if opcao == "clima":
+            widget_id = radios[0]
+            self.valores[widget_id] = rng.choice(list(OPCOES_CLIMATICAS))
+        else:
+            widget_id = rng.choice(anos if opcao == "ano" else estados)
+            self.valores[widget_id] = not self.valores[widget_id]
+        return self.widgets[widget_id][3]
+
+
+def _sessao(porta, cliques, semente, barreira, medidas, erros, timeout=600):
+    from websockets.sync.client import connect
+
+    try:
+        with connect(f"ws://127.0.0.1:{porta}/_stcore/stream", subprotocols=["streamlit"],
+                     max_size=None, open_timeout=timeout) as conexao:
+            sessao = Sessao(conexao, timeout)
+            rng = random.Random(semente)
+            barreira.wait()
+            medidas["partida"].append(sessao.executar())
+            for _ in range(cliques):
+                fragmento = sessao.sortear_clique(rng)
+                medidas["rerun"].append(sessao.executar(fragmento))
+    except threading.BrokenBarrierError:
+        # Outra sessão falhou antes da largada; a falha dela já foi registrada
+        pass
+    except Exception as erro:  # noqa: BLE001 - a falha é relatada no resultado
+        erros.append(repr(erro))
+        barreira.abort()
+
+
+def medir_nivel(porta, n_sessoes, cliques=20, semente=0):
+    """Latências e vazão de `n_sessoes` sessões simultâneas com `cliques` cliques cada."""
+    medidas = {"partida": [], "rerun": []}
+    erros = []
+    barreira = threading.Barrier(n_sessoes)
+    threads = [
+        threading.Thread(target=_sessao, args=(porta, cliques, semente * 1000 + i,
+                                               barreira, medidas, erros))
+        for i in range(n_sessoes)
+    ]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    if not medidas["partida"]:
+        raise RuntimeError(erros[0] if erros else "nenhuma sessão executou")
+
+    # Sem cliques (ex.: aquecimento) só há a partida
+    reruns = 1000 * np.array(medidas["rerun"] or [np.nan])
+    return {
+        "sessoes": n_sessoes,
+        "falhas": len(erros),
+        "erro": erros[0] if erros else None,
+        "reruns": len(medidas["rerun"]) + len(medidas["partida"]),
+        "duracao_s": duracao,
+        "vazao_rps": (len(medidas["rerun"]) + len(medidas["partida"])) / duracao,
+        "partida_p50_ms": 1000 * float(np.median(medidas["partida"])),
+        "rerun_p50_ms": float(np.percentile(reruns, 50)),
+        "rerun_p95_ms": float(np.percentile(reruns, 95)),
+    }
+
+
+def medir(niveis=SESSOES_PADRAO, cliques=20, modo="streamlit", semente=0, relatorio=print):
+    """Um resultado por número de sessões, num só servidor, depois de uma sessão de aquecimento."""
+    with servidor(modo) as porta:
+        inicio = time.perf_counter()
+        medir_nivel(porta, 1, 0, semente)
+        relatorio(f"Aquecimento em {time.perf_counter() - inicio:.1f}s")
+
+        resultados = []
+        for n_sessoes in niveis:
+            resultado = medir_nivel(porta, n_sessoes, cliques, semente)
+            resultados.append(resultado)
+            relatorio(f"{n_sessoes:3d} sessões: rerun p50 {resultado['rerun_p50_ms']:8.1f} ms | "
+                      f"p95 {resultado['rerun_p95_ms']:8.1f} ms | "
+                      f"partida p50 {resultado['partida_p50_ms']:8.1f} ms | "
+                      f"vazão {resultado['vazao_rps']:6.2f} reruns/s")
+            if resultado["falhas"]:
+                relatorio(f"    {resultado['falhas']} sessões falharam: {resultado['erro']}")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do painel com sessões simultâneas.")
+    parser.add_argument("--modo", choices=list(MODOS), default="streamlit",
+                        help="Como o servidor sobe (ver painel.medir_partida)")
+    parser.add_argument("--sessoes", type=int, nargs="+", default=SESSOES_PADRAO,
+                        help="Números de sessões simultâneas medidos")
+    parser.add_argument("--cliques", type=int, default=20, help="Cliques por sessão")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    resultados = medir(args.sessoes, args.cliques, args.modo, args.semente)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
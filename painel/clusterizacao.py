@@ -0,0 +1,551 @@
+"""Clusterização dos meses (KMeans) com persistência do modelo em disco.
+
+O ajuste usa todos os dados, independente dos filtros do dashboard, então o
+resultado só muda quando o dataset ou os hiperparâmetros mudam. Por isso ele
+é salvo em `artefatos/modelos/` com uma chave formada pela versão dos dados
+(ou o hash do dataset) e pelos hiperparâmetros, e reaproveitado entre reruns,
+sessões e reinícios.
+
+Meses anexados depois do ajuste são atribuídos aos centróides existentes
+(`atualizar_com_lote`); o reajuste completo só é necessário quando a deriva
+dos dados novos passa de um limiar.
+
+Há dois motores de ajuste, escolhidos pelos hiperparâmetros ("motor"; sem a
+chave, Elkan) ou, quando nenhum hiperparâmetro é passado, pela variável de
+ambiente PAINEL_MOTOR_AGRUPAMENTOS:
+
+- "elkan" (padrão): `KMeans(n_init=100, algorithm="elkan")` sobre a matriz
+  inteira em float64. Exato, mas tempo e memória crescem com n_init x linhas.
+- "minibatch": `MiniBatchKMeans.partial_fit` sobre blocos embaralhados das
+  features em float32, com o StandardScaler também ajustado por blocos.
+  Feito para datasets grandes (municípios x meses); as tabelas do radar,
+  da pizza e dos meses saem iguais às do Elkan.
+
+A escolha do número de agrupamentos é feita por uma varredura offline sobre
+k e sementes, executada em paralelo e salva junto dos modelos:
+
+    python -m painel.clusterizacao --k-min 2 --k-max 10 --sementes 0 1 2
+
+Para comparar os dois motores (tempo, inércia e concordância dos rótulos)
+sobre o dataset atual:
+
+    python -m painel.clusterizacao --comparar-motores
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from painel.config import caminho_artefato, temporario_ao_lado
+from painel.dados import carregar_dados, versao_dados
+
+# Incrementar quando a montagem das features ou o formato salvo mudar
+VERSAO_MODELO = 2
+
+COLUNAS_FEATURES = [
+    "Casos_Total",
+    "Obitos_Total",
+    "PRECIPITACAO",
+    "PRESSAO",
+    "RADIACAO",
+    "TEMPERATURA",
+    "UMIDADE",
+]
+COLUNAS_SAZONAIS = ["sen", "cos"]
+NOMES_FEATURES = COLUNAS_FEATURES + COLUNAS_SAZONAIS
+
+HIPERPARAMETROS_PADRAO = {
+    "n_clusters": 3,
+    "n_init": 100,
+    "algorithm": "elkan",
+    "random_state": 0,
+}
+
+HIPERPARAMETROS_MINIBATCH = {
+    "motor": "minibatch",
+    "n_clusters": 3,
+    "batch_size": 4096,
+    "epocas": 10,
+    "amostra_inicial": 20_000,
+    "n_init": 10,
+    "random_state": 0,
+}
+
+# Motor do modelo padrão, usado só quando nenhum hiperparâmetro é passado
+MOTOR_PADRAO = os.environ.get("PAINEL_MOTOR_AGRUPAMENTOS", "elkan")
+
+MESES_ORDENADOS = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun",
+                   "Jul", "Ago", "Set", "Out", "Nov", "Dez"]
+
+
+def hash_dataset(df):
+    """Hash estável do conteúdo do DataFrame (valores, índice e colunas)."""
+    h = hashlib.sha256()
+    h.update(json.dumps([str(c) for c in df.columns]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()
+
+
+def chave_modelo(chave_dados, hiperparametros):
+    """Chave do artefato: dados + hiperparâmetros + versão do formato."""
+    h = hashlib.sha256()
+    h.update(chave_dados.encode())
+    h.update(json.dumps(hiperparametros, sort_keys=True).encode())
+    h.update(str(VERSAO_MODELO).encode())
+    return h.hexdigest()[:16]
+
+
+def completar_hiperparametros(hiperparametros=None):
+    """Hiperparâmetros completos do motor pedido.
+
+    Sem hiperparâmetros (None) vale o MOTOR_PADRAO; um dicionário sem a chave
+    "motor" é do Elkan, como os resultados já salvos. Os do Elkan não levam a
+    chave "motor": são os argumentos do `KMeans` e a chave dos modelos salvos
+    continua a mesma. Chaves que não são do motor escolhido são recusadas.
+    """
+    if hiperparametros is None:
+        hiperparametros = {"motor": MOTOR_PADRAO}
+    hiperparametros = dict(hiperparametros)
+    motor = hiperparametros.pop("motor", "elkan")
+    if motor == "minibatch":
+        padrao = {**HIPERPARAMETROS_MINIBATCH}
+    elif motor == "elkan":
+        padrao = {**HIPERPARAMETROS_PADRAO}
+    else:
+        raise ValueError(f"Motor de agrupamento desconhecido: {motor!r}")
+    desconhecidos = sorted(set(hiperparametros) - set(padrao))
+    if desconhecidos:
+        raise ValueError(f"Hiperparâmetros que não são do motor {motor!r}: {desconhecidos}")
+    return {**padrao, **hiperparametros}
+
+
+def montar_features(df, dtype="float64"):
+    """Matriz de features: variáveis numéricas + mês codificado em seno/cosseno.
+
+    A matriz (linhas x `NOMES_FEATURES`, ordem C) é alocada uma vez e
+    preenchida coluna a coluna a partir das colunas do `df`, sem DataFrames
+    intermediários. Ajuste em precisão dupla por padrão, mesmo com o dataset
+    armazenado em float32.
+    """
+    X = np.empty((len(df), len(NOMES_FEATURES)), dtype=dtype)
+    for i, coluna in enumerate(COLUNAS_FEATURES):
+        X[:, i] = df[coluna].to_numpy()
+
+    # Seno e cosseno dos 12 meses, consultados pelo mês de cada linha
+    angulos = np.radians(np.arange(13, dtype="float64") * 30)
+    for i, tabela in enumerate((np.sin(angulos), np.cos(angulos)), start=len(COLUNAS_FEATURES)):
+        tabela[np.abs(tabela) < 0.0001] = 0
+        X[:, i] = tabela[df["MES_IS"].to_numpy()]
+    return X
+
+
+def padronizar_features(df):
+    """Monta as features e padroniza as colunas numéricas (StandardScaler) no lugar."""
+    from sklearn.preprocessing import StandardScaler
+
+    X = montar_features(df)
+    numericas = X[:, :len(COLUNAS_FEATURES)]
+    scaler = StandardScaler().fit(numericas)
+    # O mesmo que `scaler.transform`, sem a cópia
+    numericas -= scaler.mean_
+    numericas /= scaler.scale_
+    return scaler, X
+
+
+def ajustar_clusters(df, hiperparametros=None):
+    """Ajusta scaler + KMeans e calcula as tabelas usadas pelos gráficos."""
+    from sklearn.cluster import KMeans
+
+    hiperparametros = completar_hiperparametros(hiperparametros)
+    if hiperparametros.get("motor") == "minibatch":
+        return ajustar_clusters_minibatch(df, hiperparametros)
+
+    scaler, X = padronizar_features(df)
+    # copy_x=False: o KMeans centraliza e restaura a própria matriz em vez de copiá-la
+    kmeans = KMeans(**hiperparametros, copy_x=False)
+    kmeans.fit(X)
+    labels = kmeans.labels_
+
+    return {
+        "hiperparametros": hiperparametros,
+        "scaler": scaler,
+        "kmeans": kmeans,
+        "labels": labels,
+        **resumir_clusters(df, X, labels),
+    }
+
+
+def _blocos(n, tamanho):
+    for inicio in range(0, n, tamanho):
+        yield slice(inicio, inicio + tamanho)
+
+
+def ajustar_clusters_minibatch(df, hiperparametros=None):
+    """Ajusta scaler + MiniBatchKMeans por blocos de `batch_size` linhas, em float32.
+
+    Os centróides iniciais vêm de um KMeans com `n_init` inicializações numa
+    amostra de `amostra_inicial` linhas; depois, cada época percorre as
+    linhas em ordem aleatória, um bloco por `partial_fit`. Rótulos e inércia
+    são calculados no fim, também por blocos. Devolve a mesma estrutura de
+    `ajustar_clusters`.
+    """
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.preprocessing import StandardScaler
+
+    hiperparametros = completar_hiperparametros({"motor": "minibatch", **(hiperparametros or {})})
+    tamanho = hiperparametros["batch_size"]
+
+    X = montar_features(df, dtype="float32")
+    numericas = slice(0, len(COLUNAS_FEATURES))
+
+    scaler = StandardScaler()
+    for bloco in _blocos(len(X), tamanho):
+        scaler.partial_fit(X[bloco, numericas])
+    for bloco in _blocos(len(X), tamanho):
+        X[bloco, numericas] = scaler.transform(X[bloco, numericas])
+
+    aleatorio = np.random.default_rng(hiperparametros["random_state"])
+    amostra = aleatorio.choice(len(X), min(len(X), hiperparametros["amostra_inicial"]), replace=False)
+    inicial = KMeans(n_clusters=hiperparametros["n_clusters"], n_init=hiperparametros["n_init"],
+                     random_state=hiperparametros["random_state"]).fit(X[np.sort(amostra)])
+
+    kmeans = MiniBatchKMeans(n_clusters=hiperparametros["n_clusters"], batch_size=tamanho,
+                             init=inicial.cluster_centers_, n_init=1,
+                             random_state=hiperparametros["random_state"])
+    for _ in range(hiperparametros["epocas"]):
+        ordem = aleatorio.permutation(len(X))
+        for bloco in _blocos(len(X), tamanho):
+            kmeans.partial_fit(X[ordem[bloco]])
+
+    labels = np.empty(len(X), dtype="int32")
+    inercia = 0.0
+    for bloco in _blocos(len(X), tamanho):
+        distancias = kmeans.transform(X[bloco])
+        labels[bloco] = distancias.argmin(axis=1)
+        inercia += float((distancias.min(axis=1).astype("float64") ** 2).sum())
+    # Como no KMeans, para a atualização incremental e a comparação de motores
+    kmeans.labels_, kmeans.inertia_ = labels, inercia
+
+    return {
+        "hiperparametros": hiperparametros,
+        "scaler": scaler,
+        "kmeans": kmeans,
+        "labels": labels,
+        **resumir_clusters(df, X, labels),
+    }
+
+
+def resumir_clusters(df, X, labels):
+    """Tabelas por cluster: totais/letalidade, médias padronizadas e meses.
+
+    `X` é a matriz de features padronizadas e `labels` o rótulo de cada linha,
+    compartilhados por todas as tabelas (nenhuma cópia do `df` para anexá-los).
+    """
+    # Agrupar dados por cluster
+    cluster_summary = df.groupby(labels).agg(
+        total_casos=("Casos_Total", "sum"),
+        total_obitos=("Obitos_Total", "sum"),
+    ).rename_axis("cluster").reset_index()
+
+    # Calcular taxa de letalidade por cluster
+    cluster_summary["taxa_letalidade"] = (
+        cluster_summary["total_obitos"] / cluster_summary["total_casos"] * 100
+    ).round(2)
+
+    # Médias das variáveis padronizadas por cluster (gráfico de radar)
+    numericas = pd.DataFrame(X[:, :len(COLUNAS_FEATURES)], columns=COLUNAS_FEATURES, copy=False)
+    medias = numericas.groupby(labels).mean()
+    medias = medias.rename_axis("cluster").reset_index()
+
+    # Quantas vezes cada mês aparece em cada cluster
+    contagem = (
+        pd.DataFrame({"cluster": labels, "MES_IS": df["MES_IS"].to_numpy()})
+        .groupby(["cluster", "MES_IS"]).size().reset_index(name="contagem")
+    )
+    contagem["MES_IS"] = contagem["MES_IS"].map(dict(enumerate(MESES_ORDENADOS, start=1))).astype(
+        pd.CategoricalDtype(categories=MESES_ORDENADOS, ordered=True)
+    )
+    contagem = contagem.sort_values("MES_IS")
+
+    return {"cluster_summary": cluster_summary, "medias": medias, "contagem": contagem}
+
+
+def caminho_modelo(chave):
+    return caminho_artefato("modelos", f"kmeans_{chave}.joblib")
+
+
+def salvar_resultado(resultado, chave_dados):
+    import joblib
+
+    caminho = caminho_modelo(chave_modelo(chave_dados, resultado["hiperparametros"]))
+    temporario = temporario_ao_lado(caminho)
+    joblib.dump(resultado, temporario)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def carregar_resultado(chave_dados, hiperparametros=None):
+    """Clusterização salva para (dados, hiperparâmetros), ou None; não lê o dataset."""
+    import joblib
+
+    caminho = caminho_modelo(chave_modelo(chave_dados, completar_hiperparametros(hiperparametros)))
+    return joblib.load(caminho) if os.path.exists(caminho) else None
+
+
+def carregar_ou_ajustar(df, hiperparametros=None, chave_dados=None):
+    """Devolve a clusterização salva para (dados, hiperparâmetros) ou ajusta uma nova.
+
+    `chave_dados` identifica o conteúdo de `df` (ex.: `dados.versao_dados()`);
+    sem ela é usado o hash do próprio DataFrame.
+    """
+    hiperparametros = completar_hiperparametros(hiperparametros)
+    chave_dados = chave_dados or hash_dataset(df)
+    resultado = carregar_resultado(chave_dados, hiperparametros)
+    if resultado is not None:
+        return resultado
+
+    resultado = ajustar_clusters(df, hiperparametros)
+    salvar_resultado(resultado, chave_dados)
+    return resultado
+
+
+# ------------------------------------------------------------------------------
+# Atualização incremental
+
+# Razão entre a distância quadrática média dos pontos novos ao centróide mais
+# próximo e a do conjunto de ajuste acima da qual o modelo é reajustado.
+LIMIAR_DERIVA = 2.0
+
+
+def atualizar_com_lote(resultado, lote):
+    """Atribui as linhas do `lote` aos centróides do modelo, sem reajustar.
+
+    Devolve (novo resultado, deriva). As tabelas por cluster são atualizadas
+    somando só a contribuição do lote.
+    """
+    kmeans = resultado["kmeans"]
+    k = kmeans.n_clusters
+
+    escaladas = montar_features(lote)
+    numericas = escaladas[:, :len(COLUNAS_FEATURES)]
+    numericas -= resultado["scaler"].mean_
+    numericas /= resultado["scaler"].scale_
+    distancias = kmeans.transform(escaladas)
+    labels_lote = distancias.argmin(axis=1)
+
+    # Base da deriva: distância quadrática média do conjunto de ajuste. Os
+    # `labels_` do modelo são os do ajuste; `resultado["labels"]` cresce a cada lote.
+    deriva = float((distancias.min(axis=1) ** 2).mean() / (kmeans.inertia_ / len(kmeans.labels_)))
+    n_antigo = np.bincount(resultado["labels"], minlength=k)
+
+    delta = resumir_clusters(lote, escaladas, labels_lote)
+    n_delta = np.bincount(labels_lote, minlength=k)
+    todos = pd.RangeIndex(k, name="cluster")
+
+    totais = (resultado["cluster_summary"].set_index("cluster")[["total_casos", "total_obitos"]]
+              .add(delta["cluster_summary"].set_index("cluster")[["total_casos", "total_obitos"]],
+                   fill_value=0)
+              .reindex(todos, fill_value=0).astype("int64"))
+    totais["taxa_letalidade"] = (totais["total_obitos"] / totais["total_casos"] * 100).round(2)
+
+    # Média ponderada pelo número de linhas de cada cluster
+    medias_antigas = resultado["medias"].set_index("cluster").reindex(todos, fill_value=0)
+    medias_delta = delta["medias"].set_index("cluster").reindex(todos, fill_value=0)
+    pesos = (n_antigo + n_delta).clip(min=1)[:, None]
+    medias = (medias_antigas * n_antigo[:, None] + medias_delta * n_delta[:, None]) / pesos
+
+    contagem = (pd.concat([resultado["contagem"], delta["contagem"]])
+                .groupby(["cluster", "MES_IS"], observed=True)["contagem"].sum()
+                .reset_index().sort_values("MES_IS"))
+
+    return {
+        **resultado,
+        "labels": np.concatenate([resultado["labels"], labels_lote]),
+        "cluster_summary": totais.reset_index(),
+        "medias": medias.reset_index(),
+        "contagem": contagem,
+    }, deriva
+
+
+# ------------------------------------------------------------------------------
+# Varredura do número de agrupamentos
+
+# Acima desse número de linhas a silhueta é estimada numa amostra, já que o
+# cálculo exato é quadrático no número de pontos.
+AMOSTRA_SILHUETA = 10_000
+
+
+def _ajustar_candidato(X, k, semente, n_init, algorithm):
+    """Ajusta um KMeans e calcula as métricas de qualidade (roda num worker)."""
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import davies_bouldin_score, silhouette_score
+
+    inicio = time.perf_counter()
+    kmeans = KMeans(n_clusters=k, n_init=n_init, algorithm=algorithm, random_state=semente)
+    labels = kmeans.fit_predict(X)
+    amostra = AMOSTRA_SILHUETA if len(X) > AMOSTRA_SILHUETA else None
+    return {
+        "k": k,
+        "semente": semente,
+        "inercia": float(kmeans.inertia_),
+        "silhueta": float(silhouette_score(X, labels, sample_size=amostra, random_state=semente)),
+        "davies_bouldin": float(davies_bouldin_score(X, labels)),
+        "tempo_s": time.perf_counter() - inicio,
+        "kmeans": kmeans,
+    }
+
+
+def varrer_k(df, valores_k=range(2, 11), sementes=(0, 1, 2),
+             n_init=HIPERPARAMETROS_PADRAO["n_init"],
+             algorithm=HIPERPARAMETROS_PADRAO["algorithm"], max_workers=None):
+    """Ajusta KMeans para cada (k, semente) em paralelo num pool de processos.
+
+    Devolve um dicionário com a tabela de métricas (uma linha por ajuste) e os
+    modelos ajustados. A matriz de features não é guardada:
+    `resultado_da_varredura` a refaz a partir do `df`.
+    """
+    _, X = padronizar_features(df)
+    tarefas = [(k, semente) for k in valores_k for semente in sementes]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futuros = [
+            pool.submit(_ajustar_candidato, X, k, semente, n_init, algorithm)
+            for k, semente in tarefas
+        ]
+        ajustes = [futuro.result() for futuro in futuros]
+
+    metricas = pd.DataFrame([
+        {chave: valor for chave, valor in ajuste.items() if chave != "kmeans"}
+        for ajuste in ajustes
+    ])
+    return {
+        "n_init": n_init,
+        "algorithm": algorithm,
+        "metricas": metricas,
+        "modelos": {(a["k"], a["semente"]): a["kmeans"] for a in ajustes},
+    }
+
+
+def resumir_varredura(varredura):
+    """Métricas por k (média e desvio entre as sementes), para o painel de cotovelo."""
+    return (
+        varredura["metricas"]
+        .groupby("k")[["inercia", "silhueta", "davies_bouldin"]]
+        .agg(["mean", "std"])
+    )
+
+
+def resultado_da_varredura(df, varredura, k):
+    """Clusterização para um k já ajustado na varredura (melhor semente por inércia).
+
+    Devolve a mesma estrutura de `ajustar_clusters`, sem nenhum ajuste novo.
+    """
+    metricas = varredura["metricas"]
+    candidatos = metricas[metricas["k"] == k]
+    if candidatos.empty:
+        raise KeyError(f"k={k} não está na varredura salva")
+    semente = int(candidatos.loc[candidatos["inercia"].idxmin(), "semente"])
+    kmeans = varredura["modelos"][(k, semente)]
+    scaler, X = padronizar_features(df)
+    labels = kmeans.labels_
+    return {
+        "hiperparametros": {"n_clusters": k, "n_init": varredura["n_init"],
+                            "algorithm": varredura["algorithm"], "random_state": semente},
+        "scaler": scaler,
+        "kmeans": kmeans,
+        "labels": labels,
+        **resumir_clusters(df, X, labels),
+    }
+
+
+# ------------------------------------------------------------------------------
+# Comparação dos motores
+
+def comparar_motores(df, hiperparametros_elkan=None, hiperparametros_minibatch=None):
+    """Tempo, pico de memória, inércia e concordância dos rótulos do Elkan e do mini-batch.
+
+    A inércia dos dois é medida nas mesmas features (as do Elkan, em float64)
+    com os rótulos de cada motor, e a concordância é o índice de Rand
+    ajustado entre os rótulos (1 = mesma partição).
+    """
+    import tracemalloc
+
+    import sklearn.cluster  # noqa: F401  (importado antes, fora da medida do primeiro motor)
+    from sklearn.metrics import adjusted_rand_score
+
+    linhas = []
+    resultados = {}
+    for motor, hiperparametros in (("elkan", hiperparametros_elkan),
+                                   ("minibatch", hiperparametros_minibatch)):
+        hiperparametros = {"motor": motor, **(hiperparametros or {})}
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        resultados[motor] = ajustar_clusters(df, hiperparametros)
+        tempo = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        linhas.append({"motor": motor, "tempo_s": tempo, "pico_memoria_mb": pico / 2**20})
+
+    _, X = padronizar_features(df)
+    for linha in linhas:
+        labels = resultados[linha["motor"]]["labels"]
+        contagens = np.bincount(labels).clip(min=1)
+        centros = np.stack([np.bincount(labels, weights=coluna) for coluna in X.T], axis=1)
+        centros /= contagens[:, None]
+        linha["inercia"] = float(((X - centros[labels]) ** 2).sum())
+        linha["ari_vs_elkan"] = adjusted_rand_score(resultados["elkan"]["labels"], labels)
+
+    tabela = pd.DataFrame(linhas).set_index("motor")
+    tabela["inercia_relativa"] = tabela["inercia"] / tabela.loc["elkan", "inercia"]
+    tabela["aceleracao"] = tabela.loc["elkan", "tempo_s"] / tabela["tempo_s"]
+    return tabela
+
+
+def caminho_varredura(chave_dados):
+    return caminho_artefato("modelos", f"varredura_{chave_dados[:16]}.joblib")
+
+
+def salvar_varredura(chave_dados, varredura):
+    import joblib
+
+    caminho = caminho_varredura(chave_dados)
+    temporario = temporario_ao_lado(caminho)
+    joblib.dump(varredura, temporario)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def carregar_varredura(chave_dados):
+    """Carrega a varredura salva para estes dados (FileNotFoundError se não existir)."""
+    import joblib
+
+    return joblib.load(caminho_varredura(chave_dados))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Varredura do número de agrupamentos (KMeans).")
+    parser.add_argument("--k-min", type=int, default=2)
+    parser.add_argument("--k-max", type=int, default=10)
+    parser.add_argument("--sementes", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--n-init", type=int, default=HIPERPARAMETROS_PADRAO["n_init"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--comparar-motores", action="store_true",
+                        help="Compara o Elkan e o mini-batch em vez de varrer k")
+    args = parser.parse_args()
+
+    df = carregar_dados()
+    if args.comparar_motores:
+        print(f"{len(df)} linhas")
+        print(comparar_motores(df, {"n_init": args.n_init}).round(4).to_string())
+    else:
+        inicio = time.perf_counter()
+        varredura = varrer_k(df, range(args.k_min, args.k_max + 1), args.sementes,
+                             n_init=args.n_init, max_workers=args.workers)
+        print(resumir_varredura(varredura).round(3).to_string())
+        print(f"{len(varredura['metricas'])} ajustes em {time.perf_counter() - inicio:.1f}s")
+        print(salvar_varredura(versao_dados(), varredura))
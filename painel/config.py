@@ -0,0 +1,35 @@
+"""Caminhos compartilhados pelos módulos do painel."""
+import os
+import tempfile
+
+# Raiz do repositório (onde ficam o dataset e o final1.py)
+DIRETORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Artefatos gerados (geometria, modelos, agregados). Pode ser trocado pela
+# variável de ambiente PAINEL_ARTEFATOS, útil em servidores com disco separado.
+DIRETORIO_ARTEFATOS = os.environ.get(
+    "PAINEL_ARTEFATOS", os.path.join(DIRETORIO_RAIZ, "artefatos")
+)
+
+
+def caminho_artefato(*partes):
+    """Monta um caminho dentro do diretório de artefatos, criando as pastas."""
+    caminho = os.path.join(DIRETORIO_ARTEFATOS, *partes)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    return caminho
+
+
+def temporario_ao_lado(destino):
+    """Arquivo temporário de nome único no diretório de `destino`.
+
+    Fica no mesmo disco, para o `os.replace` final ser atômico, e não colide
+    com outras sessões ou processos gravando o mesmo artefato.
+    """
+    descritor, temporario = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(destino)),
+        prefix=os.path.basename(destino) + ".", suffix=".tmp",
+    )
+    os.close(descritor)
+    # mkstemp cria com 0600; os artefatos (ex.: static/) são lidos por outros processos
+    os.chmod(temporario, 0o644)
+    return temporario
@@ -0,0 +1,129 @@
+"""Correlação defasada entre os fatores climáticos e os casos, por estado.
+
+A transmissão da febre amarela responde ao clima com semanas a meses de
+atraso. Para cada estado, variável climática e defasagem de 0 a 6 meses,
+correlaciona o clima do mês t - defasagem com os casos do mês t (Pearson e
+Spearman), além da série de todos os estados somados.
+
+Tudo sai de uma passagem vetorizada sobre o cubo: as séries mensais são os
+tensores estado x variável x mês de `cubo.series_mensais`, as defasagens são
+janelas deslizantes desse tensor, reunidas num único array (estado x
+variável x defasagem x mês), e as correlações são somas ao longo do eixo do
+tempo, só com os meses em que clima e casos existem. O Spearman é o Pearson
+dos postos, calculados de uma vez para todas as combinações. O custo cresce
+com estados x variáveis x defasagens x meses, e não com o número de linhas
+do dataset:
+
+    python -m painel.correlacao --saida correlacoes.csv
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from painel import cubo
+from painel.cubo import TODOS
+from painel.dados import COLUNAS_CLIMATICAS
+
+DEFASAGENS = range(7)
+
+# Menos pares que isso não dão uma correlação que valha mostrar
+MINIMO_PARES = 6
+
+
+def series_mensais(cubo_dados, variaveis=COLUNAS_CLIMATICAS, alvo="Casos_Total"):
+    """Séries mensais contínuas de clima e casos por estado, a partir do cubo.
+
+    Devolve um dicionário com `estados` (mais TODOS, na última posição),
+    `variaveis`, `periodo_inicial` (ano * 12 + mês - 1), `clima` com forma
+    (estados, variáveis, meses) e `casos` com forma (estados, meses). Meses
+    sem dados ficam NaN; na série TODOS o clima é a média de todas as
+    observações do mês e os casos são a soma dos estados.
+    """
+    series = cubo.series_mensais(cubo_dados, [alvo], variaveis)
+    observado = cubo.observar(series["somas"], series["contagens"], series["acumuladas"])
+    return {
+        "estados": series["estados"],
+        "variaveis": series["variaveis"][1:],
+        "periodo_inicial": int(series["periodos"][0]) if len(series["periodos"]) else 0,
+        "clima": observado[:, 1:],
+        "casos": observado[:, 0],
+    }
+
+
+def _pearson(x, y, validos):
+    """Pearson ao longo do último eixo, só nas posições `validos`."""
+    n = validos.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media_x = np.where(validos, x, 0.0).sum(axis=-1) / n
+        media_y = np.where(validos, y, 0.0).sum(axis=-1) / n
+        dx = np.where(validos, x - media_x[..., None], 0.0)
+        dy = np.where(validos, y - media_y[..., None], 0.0)
+        r = (dx * dy).sum(axis=-1) / np.sqrt((dx * dx).sum(axis=-1) * (dy * dy).sum(axis=-1))
+    return np.where(n >= MINIMO_PARES, r, np.nan), n
+
+
+def _postos(valores):
+    """Postos ao longo do último eixo (empates com o posto médio; NaN continua NaN)."""
+    planos = pd.DataFrame(valores.reshape(-1, valores.shape[-1]))
+    return planos.rank(axis=1, method="average").to_numpy().reshape(valores.shape)
+
+
+def correlacoes_defasadas(clima, casos, defasagens=DEFASAGENS):
+    """Pearson, Spearman e pares usados para clima (E, V, T) defasado x casos (E, T).
+
+    O resultado de cada medida tem forma (E, V, defasagens): a defasagem d
+    correlaciona clima[..., t - d] com casos[..., t].
+    """
+    defasagens = np.asarray(list(defasagens))
+    maior = int(defasagens.max())
+    n_meses = clima.shape[-1]
+    preenchido = np.concatenate([np.full(clima.shape[:-1] + (maior,), np.nan), clima], axis=-1)
+    # Janela k começa k meses depois do início do preenchimento: defasagem maior - k
+    janelas = sliding_window_view(preenchido, n_meses, axis=-1)
+    # As janelas são views; escolher as defasagens (indexação por lista) copia
+    x = janelas[..., maior - defasagens, :]
+    y = np.broadcast_to(casos[:, None, None, :], x.shape)
+    validos = np.isfinite(x) & np.isfinite(y)
+
+    pearson, pares = _pearson(x, y, validos)
+    spearman, _ = _pearson(_postos(np.where(validos, x, np.nan)),
+                           _postos(np.where(validos, y, np.nan)), validos)
+    return {"pearson": pearson, "spearman": spearman, "pares": pares}
+
+
+def calcular(cubo_dados, variaveis=COLUNAS_CLIMATICAS, defasagens=DEFASAGENS):
+    """Tabela longa (ESTADO, variavel, defasagem, pearson, spearman, pares)."""
+    series = series_mensais(cubo_dados, variaveis)
+    medidas = correlacoes_defasadas(series["clima"], series["casos"], defasagens)
+    estados, variaveis_, defasagens_ = np.meshgrid(
+        series["estados"], series["variaveis"], list(defasagens), indexing="ij"
+    )
+    return pd.DataFrame({
+        "ESTADO": estados.ravel(),
+        "variavel": variaveis_.ravel(),
+        "defasagem": defasagens_.ravel(),
+        "pearson": medidas["pearson"].ravel(),
+        "spearman": medidas["spearman"].ravel(),
+        "pares": medidas["pares"].ravel(),
+    })
+
+
+if __name__ == "__main__":
+    from painel import dados
+
+    parser = argparse.ArgumentParser(description="Correlação defasada entre clima e casos, por estado.")
+    parser.add_argument("--saida", help="Arquivo CSV com a tabela de correlações")
+    args = parser.parse_args()
+
+    versao = dados.versao_dados()
+    cubo_dados = cubo.carregar_ou_construir(versao, dados.carregar_dados)
+    inicio = time.perf_counter()
+    correlacoes = calcular(cubo_dados)
+    print(f"{len(correlacoes)} correlações em {1000 * (time.perf_counter() - inicio):.1f} ms")
+    if args.saida:
+        correlacoes.to_csv(args.saida, index=False)
+    else:
+        print(correlacoes[correlacoes["ESTADO"] == TODOS].to_string(index=False))
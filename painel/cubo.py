@@ -0,0 +1,267 @@
+"""Cubo pré-agregado (estado, ano, mês) que alimenta os gráficos do painel.
+
+O cubo guarda, por célula, as somas de casos e óbitos e, para cada variável
+climática, a soma e a contagem de observações (assim a média de qualquer
+recorte é soma / contagem). Também guarda o rollup (estado, ano), usado pelos
+totais. Cada gráfico responde fatiando o cubo, então o custo por interação
+depende do número de células e não do número de linhas do dataset.
+
+Para a filtragem, cada tabela do cubo é mantida ordenada por período (ano e
+mês) junto de um bitmap de linhas por estado: um recorte de anos/meses vira
+busca binária no eixo de períodos e a escolha de estados vira um OR dos
+bitmaps, só dentro do intervalo selecionado.
+
+O cubo é salvo em disco por versão do armazenamento de dados. Quando meses
+novos são anexados, `atualizar_cubo` agrega só o lote e soma as células
+afetadas, sem reler o histórico.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from painel.config import caminho_artefato, temporario_ao_lado
+from painel.dados import COLUNAS_CASOS, COLUNAS_CLIMATICAS
+
+CHAVES = ["ESTADO", "ANO_IS", "MES_IS"]
+
+# Rótulo da série com todos os estados somados
+TODOS = "Todos os estados"
+
+
+def agregar_celulas(df, somas=COLUNAS_CASOS, medias=COLUNAS_CLIMATICAS):
+    """Somas e contagens do dataset no grão (estado, ano, mês)."""
+    medias = [col for col in medias if col in df.columns]
+    # Somas climáticas em float64 para não acumular erro do armazenamento em float32
+    climaticas = df[medias].astype("float64")
+    base = pd.concat(
+        [
+            df.groupby(CHAVES, observed=True)[list(somas)].sum(),
+            climaticas.groupby([df[c] for c in CHAVES], observed=True).sum().add_suffix("_soma"),
+            climaticas.groupby([df[c] for c in CHAVES], observed=True).count().add_suffix("_n"),
+        ],
+        axis=1,
+    )
+    # Siglas como texto no índice, para combinar cubos com categorias diferentes
+    base.index = base.index.set_levels(base.index.levels[0].astype(str), level="ESTADO")
+    return base.sort_index()
+
+
+def construir_cubo(df, somas=COLUNAS_CASOS, medias=COLUNAS_CLIMATICAS):
+    """Agrega o dataset no grão (estado, ano, mês) e no rollup (estado, ano)."""
+    return montar_cubo(agregar_celulas(df, somas, medias))
+
+
+def montar_cubo(base):
+    """Rollup (estado, ano), índices de filtragem e opções dos seletores."""
+    estado_ano = base.groupby(level=["ESTADO", "ANO_IS"], observed=True).sum()
+    return {
+        "estado_ano_mes": indexar(base),
+        "estado_ano": indexar(estado_ano),
+        "estados": sorted(base.index.get_level_values("ESTADO").unique().astype(str)),
+        "anos": sorted(int(a) for a in base.index.get_level_values("ANO_IS").unique()),
+    }
+
+
+def _periodos(indice):
+    """Ano * 12 + mês - 1 de cada linha; sem o nível MES_IS, o primeiro mês do ano."""
+    anos = indice.get_level_values("ANO_IS").to_numpy(dtype="int64")
+    if "MES_IS" in indice.names:
+        meses = indice.get_level_values("MES_IS").to_numpy(dtype="int64")
+    else:
+        meses = np.ones_like(anos)
+    return anos * 12 + (meses - 1)
+
+
+def indexar(tabela):
+    """Ordena a tabela por período e monta um bitmap de linhas por estado.
+
+    Tabelas sem o nível MES_IS (rollups anuais) usam o primeiro mês do ano
+    como período de cada linha.
+    """
+    periodos = _periodos(tabela.index)
+    ordem = np.argsort(periodos, kind="stable")
+    tabela = tabela.iloc[ordem]
+    estados = tabela.index.get_level_values("ESTADO").astype(str).to_numpy()
+    return {
+        "tabela": tabela,
+        "periodos": periodos[ordem],
+        "bitmaps": {estado: estados == estado for estado in np.unique(estados)},
+    }
+
+
+def selecionar(indice, estados, anos, mes_inicio=1, mes_fim=12):
+    """Linhas do índice nos `estados` e `anos` pedidos, entre `mes_inicio` e `mes_fim`.
+
+    Cada ano vira um intervalo contíguo do eixo de períodos, encontrado por
+    busca binária; os bitmaps dos estados só são lidos dentro desses intervalos.
+    """
+    periodos = indice["periodos"]
+    partes = []
+    for ano in sorted({int(a) for a in anos}):
+        inicio = np.searchsorted(periodos, ano * 12 + mes_inicio - 1, side="left")
+        fim = np.searchsorted(periodos, ano * 12 + mes_fim - 1, side="right")
+        if inicio < fim:
+            partes.append(np.arange(inicio, fim))
+    posicoes = np.concatenate(partes) if partes else np.empty(0, dtype="int64")
+
+    mascara = np.zeros(len(posicoes), dtype=bool)
+    for estado in estados:
+        bitmap = indice["bitmaps"].get(estado)
+        if bitmap is not None:
+            mascara |= bitmap[posicoes]
+    return indice["tabela"].iloc[posicoes[mascara]]
+
+
+def agregar(tabela, por, somas=(), medias=()):
+    """Soma as células de `tabela` pelos níveis `por` e calcula as médias climáticas.
+
+    Com `por` vazio devolve os totais do recorte como uma Series.
+    """
+    colunas = list(somas) + [f"{c}_soma" for c in medias] + [f"{c}_n" for c in medias]
+    if por:
+        grupos = tabela[colunas].groupby(level=list(por), observed=True).sum()
+    else:
+        grupos = tabela[colunas].sum().to_frame().T
+
+    resultado = grupos[list(somas)].copy()
+    for col in medias:
+        resultado[col] = grupos[f"{col}_soma"] / grupos[f"{col}_n"]
+
+    if not por:
+        return resultado.iloc[0]
+    return resultado.reset_index()
+
+
+def series_mensais(cubo_dados, somadas, medias=COLUNAS_CLIMATICAS):
+    """Somas e contagens mensais por estado e variável, a partir do cubo.
+
+    Devolve um dicionário com `estados` (mais TODOS, na última posição),
+    `variaveis` (as `somadas` e depois as `medias` presentes no cubo),
+    `acumuladas` (True nas variáveis somadas), `periodos` (ano * 12 + mês - 1,
+    sem buracos entre anos) e os tensores `somas` e `contagens` com forma
+    (estados, variáveis, meses). Nas variáveis somadas a contagem é o número
+    de estados com o mês no cubo.
+    """
+    indice = cubo_dados["estado_ano_mes"]
+    tabela, periodos = indice["tabela"], indice["periodos"]
+    estados = list(cubo_dados["estados"])
+    medias = [v for v in medias if f"{v}_soma" in tabela.columns]
+    variaveis = list(somadas) + medias
+
+    periodo_inicial = int(periodos.min()) if len(periodos) else 0
+    n_meses = int(periodos.max()) - periodo_inicial + 1 if len(periodos) else 0
+    linhas = pd.Index(estados).get_indexer(tabela.index.get_level_values("ESTADO").astype(str))
+    colunas = periodos - periodo_inicial
+
+    # Cada (estado, período) aparece uma vez no cubo: atribuição direta
+    forma = (len(estados) + 1, len(variaveis), n_meses)
+    somas, contagens = np.zeros(forma), np.zeros(forma)
+    somas[linhas, :, colunas] = np.hstack([
+        tabela[list(somadas)].to_numpy(dtype="float64"),
+        tabela[[f"{v}_soma" for v in medias]].to_numpy(dtype="float64"),
+    ])
+    contagens[linhas, :, colunas] = np.hstack([
+        np.ones((len(tabela), len(somadas))),
+        tabela[[f"{v}_n" for v in medias]].to_numpy(dtype="float64"),
+    ])
+    somas[-1], contagens[-1] = somas[:-1].sum(axis=0), contagens[:-1].sum(axis=0)
+    return {
+        "estados": estados + [TODOS],
+        "variaveis": variaveis,
+        "acumuladas": np.array([v in somadas for v in variaveis]),
+        "periodos": periodo_inicial + np.arange(n_meses),
+        "somas": somas,
+        "contagens": contagens,
+    }
+
+
+def observar(somas, contagens, acumuladas):
+    """Série observada: a soma nas variáveis acumuladas, a média nas demais (NaN sem dados)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        medias = somas / contagens
+    totais = np.where(contagens > 0, somas, np.nan)
+    return np.where(acumuladas[:, None], totais, medias)
+
+
+def _somar_celulas(indice, delta):
+    """Novo índice com as linhas de `delta` somadas às de `indice`.
+
+    As células já existentes são somadas na posição delas; as novas são
+    inseridas no eixo de períodos por busca binária e estendem os bitmaps,
+    sem reordenar a tabela nem recomparar os estados.
+    """
+    tabela, periodos = indice["tabela"], indice["periodos"]
+    delta = delta.astype(tabela.dtypes.to_dict())
+    posicoes = tabela.index.get_indexer(delta.index)
+    existentes = posicoes >= 0
+
+    atualizada = tabela.copy()
+    for coluna in tabela.columns:
+        valores = atualizada[coluna].to_numpy(copy=True)
+        valores[posicoes[existentes]] += delta[coluna].to_numpy()[existentes]
+        atualizada[coluna] = valores
+    if existentes.all():
+        return {**indice, "tabela": atualizada}
+
+    novas = delta[~existentes]
+    periodos_novos = _periodos(novas.index)
+    ordem = np.argsort(periodos_novos, kind="stable")
+    novas, periodos_novos = novas.iloc[ordem], periodos_novos[ordem]
+    insercao = np.searchsorted(periodos, periodos_novos, side="right")
+    posicoes_finais = np.insert(np.arange(len(tabela)), insercao, len(tabela) + np.arange(len(novas)))
+
+    estados_novos = novas.index.get_level_values("ESTADO").astype(str).to_numpy()
+    vazio = np.zeros(len(tabela), dtype=bool)
+    bitmaps = {
+        estado: np.insert(indice["bitmaps"].get(estado, vazio), insercao, estados_novos == estado)
+        for estado in sorted(set(indice["bitmaps"]) | set(estados_novos))
+    }
+    return {
+        "tabela": pd.concat([atualizada, novas]).iloc[posicoes_finais],
+        "periodos": np.insert(periodos, insercao, periodos_novos),
+        "bitmaps": bitmaps,
+    }
+
+
+def atualizar_cubo(cubo, lote):
+    """Novo cubo com as linhas do `lote` somadas às células existentes.
+
+    Só o lote é agregado, e só as células e o rollup que ele toca são
+    atualizados; o cubo recebido não é alterado.
+    """
+    delta = agregar_celulas(lote).reindex(columns=cubo["estado_ano_mes"]["tabela"].columns,
+                                          fill_value=0)
+    delta_ano = delta.groupby(level=["ESTADO", "ANO_IS"], observed=True).sum()
+    return {
+        "estado_ano_mes": _somar_celulas(cubo["estado_ano_mes"], delta),
+        "estado_ano": _somar_celulas(cubo["estado_ano"], delta_ano),
+        "estados": sorted(set(cubo["estados"]) | set(delta.index.get_level_values("ESTADO"))),
+        "anos": sorted(set(cubo["anos"]) | {int(a) for a in delta.index.get_level_values("ANO_IS")}),
+    }
+
+
+def caminho_cubo(versao):
+    return caminho_artefato("agregados", f"cubo_{versao}.joblib")
+
+
+def salvar_cubo(cubo, versao):
+    import joblib
+
+    caminho = caminho_cubo(versao)
+    temporario = temporario_ao_lado(caminho)
+    joblib.dump(cubo, temporario)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def carregar_ou_construir(versao, carregar_df):
+    """Cubo salvo para a `versao` dos dados ou um novo, construído de `carregar_df()`."""
+    import joblib
+
+    caminho = caminho_cubo(versao)
+    if os.path.exists(caminho):
+        return joblib.load(caminho)
+    cubo = construir_cubo(carregar_df())
+    salvar_cubo(cubo, versao)
+    return cubo
@@ -0,0 +1,229 @@
+"""Armazenamento colunar e tipado do dataset unificado.
+
+O CSV `dataset_unificado_processado.csv` é convertido uma vez para um arquivo
+Arrow IPC (Feather v2, sem compressão) com tipos compactos e nomes curtos de
+colunas. A leitura usa memory-map, então carregar só as colunas que uma seção
+precisa não exige reprocessar o arquivo inteiro:
+
+    python -m painel.dados                 # converte o CSV padrão
+    python -m painel.dados --csv outro.csv
+
+Meses novos são anexados como arquivos Arrow adicionais ("partes"), sem
+reescrever o histórico. Um manifesto guarda as partes, o estado do CSV na
+última sincronização e a marca d'água (último período carregado por estado).
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import threading
+
+import pandas as pd
+
+from painel.config import DIRETORIO_RAIZ, caminho_artefato, temporario_ao_lado
+
+# Pode ser trocado pela variável de ambiente PAINEL_CSV (ex.: datasets
+# sintéticos do benchmark)
+CAMINHO_CSV = os.environ.get(
+    "PAINEL_CSV", os.path.join(DIRETORIO_RAIZ, "dataset_unificado_processado.csv")
+)
+
+# Incrementar quando nomes ou tipos das colunas mudarem
+VERSAO_DADOS = 1
+
+# Nomes originais das colunas do INMET -> nomes curtos usados no painel
+COLUNAS_INMET = {
+    "PRECIPITAÇÃO TOTAL, HORÁRIO (mm)": "PRECIPITACAO",
+    "PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO, HORARIA (mB)": "PRESSAO",
+    "RADIACAO GLOBAL (Kj/m²)": "RADIACAO",
+    "TEMPERATURA DO AR - BULBO SECO, HORARIA (°C)": "TEMPERATURA",
+    "TEMPERATURA DO PONTO DE ORVALHO (°C)": "PONTO_ORVALHO",
+    "UMIDADE RELATIVA DO AR, HORARIA (%)": "UMIDADE",
+    "VENTO, VELOCIDADE HORARIA (m/s)": "VENTO",
+}
+COLUNAS_CLIMATICAS = list(COLUNAS_INMET.values())
+
+# Serializa conversões e anexações: sessões simultâneas compartilham o diretório
+_TRAVA_ESCRITA = threading.RLock()
+
+COLUNAS_CASOS = ["Obitos_Total", "Obitos_M", "Obitos_F", "Casos_Total", "Casos_M", "Casos_F"]
+
+TIPOS = {
+    "ESTADO": "category",
+    "ANO_IS": "int16",
+    "MES_IS": "int8",
+    **{col: "int32" for col in COLUNAS_CASOS},
+    "Mortalidade": "float32",
+    **{col: "float32" for col in COLUNAS_CLIMATICAS},
+}
+
+
+def caminho_colunar():
+    return caminho_artefato("dados", f"dataset_v{VERSAO_DADOS}.arrow")
+
+
+def caminho_manifesto():
+    return caminho_artefato("dados", f"manifesto_v{VERSAO_DADOS}.json")
+
+
+def periodos(df):
+    """Período de cada linha como inteiro contínuo (ano * 12 + mês - 1)."""
+    return df["ANO_IS"].to_numpy(dtype="int64") * 12 + df["MES_IS"].to_numpy(dtype="int64") - 1
+
+
+def calcular_marca_dagua(df):
+    """Último período presente para cada estado."""
+    ultimos = pd.Series(periodos(df)).groupby(df["ESTADO"].astype(str).to_numpy()).max()
+    return {estado: int(periodo) for estado, periodo in ultimos.items()}
+
+
+def _estado_csv(caminho_csv):
+    info = os.stat(caminho_csv)
+    return {"csv_mtime_ns": info.st_mtime_ns, "csv_tamanho": info.st_size}
+
+
+def ler_manifesto():
+    try:
+        with open(caminho_manifesto(), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except FileNotFoundError:
+        return None
+
+
+def _gravar_manifesto(manifesto):
+    caminho = caminho_manifesto()
+    temporario = temporario_ao_lado(caminho)
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, indent=2)
+    os.replace(temporario, caminho)
+
+
+def ler_csv(caminho_csv=CAMINHO_CSV):
+    """Lê o CSV unificado já com nomes curtos e tipos compactos."""
+    df = pd.read_csv(caminho_csv).rename(columns=COLUNAS_INMET)
+    return df.astype({col: tipo for col, tipo in TIPOS.items() if col in df.columns})
+
+
+def converter_csv(caminho_csv=CAMINHO_CSV, destino=None):
+    """Converte o CSV para o arquivo colunar (Arrow IPC sem compressão)."""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    destino = destino or caminho_colunar()
+    with _TRAVA_ESCRITA:
+        df = ler_csv(caminho_csv)
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        temporario = temporario_ao_lado(destino)
+        try:
+            # Sem compressão para permitir leitura zero-copy via memory-map
+            feather.write_feather(tabela, temporario, compression="uncompressed")
+            os.replace(temporario, destino)
+        except BaseException:
+            os.remove(temporario)
+            raise
+
+        # A conversão completa substitui as partes anexadas anteriormente
+        for parte in glob.glob(os.path.join(os.path.dirname(destino), "parte_*.arrow")):
+            os.remove(parte)
+        _gravar_manifesto({
+            **_estado_csv(caminho_csv),
+            "partes": [os.path.basename(destino)],
+            "marca_dagua": calcular_marca_dagua(df),
+        })
+    return destino
+
+
+def garantir_armazenamento(caminho_csv=CAMINHO_CSV):
+    """Manifesto atual, convertendo o CSV se ele mudou desde a última sincronização."""
+    def desatualizado(manifesto):
+        return manifesto is None or any(
+            manifesto[k] != v for k, v in _estado_csv(caminho_csv).items()
+        )
+
+    manifesto = ler_manifesto()
+    if desatualizado(manifesto):
+        with _TRAVA_ESCRITA:
+            # Outra sessão pode ter convertido enquanto esta esperava a trava
+            manifesto = ler_manifesto()
+            if desatualizado(manifesto):
+                converter_csv(caminho_csv)
+                manifesto = ler_manifesto()
+    return manifesto
+
+
+def versao_dados(caminho_csv=CAMINHO_CSV):
+    """Identificador curto do conteúdo atual do armazenamento (muda a cada anexação)."""
+    manifesto = garantir_armazenamento(caminho_csv)
+    return hashlib.sha256(json.dumps(manifesto, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def carregar_dados(colunas=None, caminho_csv=CAMINHO_CSV):
+    """Carrega o dataset (ou só as `colunas` pedidas) a partir do armazenamento colunar.
+
+    O arquivo base é (re)gerado automaticamente se não existir ou se o CSV
+    tiver mudado por fora; as partes anexadas são lidas em sequência.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    manifesto = garantir_armazenamento(caminho_csv)
+    diretorio = os.path.dirname(caminho_colunar())
+    tabelas = [
+        feather.read_table(os.path.join(diretorio, parte), columns=colunas, memory_map=True)
+        for parte in manifesto["partes"]
+    ]
+    tabela = tabelas[0] if len(tabelas) == 1 else pa.concat_tables(tabelas)
+    # Um bloco por coluna: as colunas numéricas viram views (somente leitura)
+    # dos buffers do Arrow, sem a cópia da consolidação em blocos do pandas
+    return tabela.to_pandas(split_blocks=True)
+
+
+def anexar(lote, caminho_csv=CAMINHO_CSV):
+    """Anexa ao armazenamento as linhas do `lote` posteriores à marca d'água.
+
+    Grava só o lote: uma nova parte Arrow, as linhas no fim do CSV e o
+    manifesto atualizado. Linhas de períodos já carregados para o estado são
+    ignoradas. Devolve as linhas efetivamente anexadas.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    with _TRAVA_ESCRITA:
+        manifesto = garantir_armazenamento(caminho_csv)
+        diretorio = os.path.dirname(caminho_colunar())
+        esquema = feather.read_table(os.path.join(diretorio, manifesto["partes"][0]),
+                                     memory_map=True).schema
+        faltando = [col for col in esquema.names if col not in lote.columns]
+        if faltando:
+            raise ValueError(f"Colunas ausentes no lote: {faltando}")
+
+        marca = manifesto["marca_dagua"]
+        limite = lote["ESTADO"].astype(str).map(marca).fillna(-1).to_numpy()
+        # Mesma ordem de colunas do armazenamento, sem colunas extras
+        lote = lote.loc[periodos(lote) > limite, esquema.names].reset_index(drop=True)
+        if lote.empty:
+            return lote
+
+        tabela = pa.Table.from_pandas(lote, preserve_index=False).cast(esquema)
+        parte = f"parte_{len(manifesto['partes']):05d}.arrow"
+        feather.write_feather(tabela, os.path.join(diretorio, parte), compression="uncompressed")
+
+        # O CSV continua sendo a cópia completa e legível do dataset
+        nomes_longos = {curto: longo for longo, curto in COLUNAS_INMET.items()}
+        lote.rename(columns=nomes_longos).to_csv(caminho_csv, mode="a", header=False, index=False)
+
+        _gravar_manifesto({
+            **_estado_csv(caminho_csv),
+            "partes": manifesto["partes"] + [parte],
+            "marca_dagua": {**marca, **calcular_marca_dagua(lote)},
+        })
+    return lote
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converte o dataset unificado para o formato colunar.")
+    parser.add_argument("--csv", default=CAMINHO_CSV)
+    args = parser.parse_args()
+    destino = converter_csv(args.csv)
+    print(destino, f"{os.path.getsize(destino) / 1024:.1f} KiB")
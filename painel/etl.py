@@ -0,0 +1,256 @@
+"""ETL dos dados brutos para o dataset unificado (estado, ano, mês).
+
+Entradas:
+
+- arquivos horários das estações automáticas do INMET (um CSV por estação e
+  ano, separador `;`, vírgula decimal, latin-1, 8 linhas de metadados antes
+  do cabeçalho e -9999 para valores ausentes);
+- registros de casos humanos de febre amarela do Ministério da Saúde (uma
+  linha por caso, com UF_LPI, SEXO, ANO_IS, MES_IS e OBITO).
+
+Cada arquivo é lido em blocos de tamanho fixo e reduzido a somas e contagens
+por (estado, ano, mês), então a memória não depende do tamanho dos arquivos.
+Os arquivos são processados em paralelo num pool de processos e os parciais
+são somados no final. As médias climáticas são médias das observações
+horárias de todas as estações do estado no mês, como no dataset original.
+
+    python -m painel.etl --inmet dados_inmet/ --casos fa_casoshumanos.csv --saida novo.csv
+"""
+import argparse
+import glob
+import os
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from painel.config import temporario_ao_lado
+from painel.dados import CAMINHO_CSV, COLUNAS_CASOS, COLUNAS_CLIMATICAS, COLUNAS_INMET
+
+CHAVES = ["ESTADO", "ANO_IS", "MES_IS"]
+TAMANHO_BLOCO = 200_000
+
+# Início do nome (sem acentos, maiúsculo) das colunas do INMET -> nome curto.
+# Os cabeçalhos mudam um pouco entre anos ("Kj/m²" x "KJ/m²", "Data" x
+# "DATA (YYYY-MM-DD)"), por isso a comparação é por prefixo.
+PREFIXOS_INMET = {
+    "PRECIPITACAO TOTAL": "PRECIPITACAO",
+    "PRESSAO ATMOSFERICA AO NIVEL DA ESTACAO": "PRESSAO",
+    "RADIACAO GLOBAL": "RADIACAO",
+    "TEMPERATURA DO AR - BULBO SECO": "TEMPERATURA",
+    "TEMPERATURA DO PONTO DE ORVALHO": "PONTO_ORVALHO",
+    "UMIDADE RELATIVA DO AR, HORARIA": "UMIDADE",
+    "VENTO, VELOCIDADE HORARIA": "VENTO",
+}
+LINHAS_METADADOS_INMET = 8
+AUSENTE_INMET = -9999
+
+# Colunas do arquivo de casos humanos
+COLUNAS_REGISTRO_CASOS = {
+    "uf": "UF_LPI",
+    "sexo": "SEXO",
+    "ano": "ANO_IS",
+    "mes": "MES_IS",
+    "obito": "OBITO",
+}
+VALORES_OBITO = {"SIM", "S", "1"}
+
+
+def _normalizar(texto):
+    sem_acentos = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return sem_acentos.strip().upper()
+
+
+def ler_metadados_inmet(caminho, encoding="latin-1"):
+    """Metadados do cabeçalho da estação (REGIAO, UF, ESTACAO, ...)."""
+    metadados = {}
+    with open(caminho, encoding=encoding) as arquivo:
+        for _ in range(LINHAS_METADADOS_INMET):
+            chave, _, valor = arquivo.readline().partition(";")
+            metadados[_normalizar(chave).rstrip(":")] = valor.strip().strip(";")
+    return metadados
+
+
+def mapear_colunas_inmet(cabecalho):
+    """Nome original de cada coluna usada -> nome curto (DATA + variáveis)."""
+    mapa = {}
+    for coluna in cabecalho:
+        normalizada = _normalizar(coluna)
+        if normalizada.startswith("DATA"):
+            mapa.setdefault(coluna, "DATA")
+            continue
+        for prefixo, curto in PREFIXOS_INMET.items():
+            if normalizada.startswith(prefixo) and curto not in mapa.values():
+                mapa[coluna] = curto
+    return mapa
+
+
+def processar_estacao(caminho, tamanho_bloco=TAMANHO_BLOCO):
+    """Somas e contagens mensais de um arquivo horário do INMET.
+
+    Devolve (parcial, linhas lidas); o parcial é indexado por (ESTADO,
+    ANO_IS, MES_IS) e tem colunas `<variavel>_soma` e `<variavel>_n`.
+    """
+    estado = ler_metadados_inmet(caminho)["UF"]
+    cabecalho = pd.read_csv(caminho, sep=";", encoding="latin-1",
+                            skiprows=LINHAS_METADADOS_INMET, nrows=0).columns
+    mapa = mapear_colunas_inmet(cabecalho)
+    variaveis = [curto for curto in mapa.values() if curto != "DATA"]
+
+    blocos = pd.read_csv(
+        caminho, sep=";", decimal=",", encoding="latin-1",
+        skiprows=LINHAS_METADADOS_INMET, usecols=list(mapa),
+        dtype={coluna: "string" for coluna, curto in mapa.items() if curto == "DATA"},
+        chunksize=tamanho_bloco,
+    )
+    parciais = []
+    linhas = 0
+    for bloco in blocos:
+        bloco = bloco.rename(columns=mapa)
+        linhas += len(bloco)
+        # Datas "AAAA-MM-DD" ou "AAAA/MM/DD": ano e mês saem por posição.
+        # Alguns arquivos terminam com linhas sem data, que são descartadas.
+        datas = bloco.pop("DATA")
+        validas = datas.str.match(r"\d{4}\D\d{2}").fillna(False).to_numpy(dtype=bool)
+        bloco, datas = bloco[validas], datas[validas]
+        chaves = [
+            datas.str.slice(0, 4).astype("int16").rename("ANO_IS"),
+            datas.str.slice(5, 7).astype("int8").rename("MES_IS"),
+        ]
+        valores = bloco[variaveis].astype("float64").where(lambda v: v != AUSENTE_INMET)
+        grupos = valores.groupby(chaves)
+        parciais.append(pd.concat([grupos.sum().add_suffix("_soma"),
+                                   grupos.count().add_suffix("_n")], axis=1))
+
+    parcial = pd.concat(parciais).groupby(level=["ANO_IS", "MES_IS"]).sum()
+    parcial = pd.concat({estado: parcial}, names=["ESTADO"])
+    return parcial, linhas
+
+
+def processar_casos(caminho, tamanho_bloco=TAMANHO_BLOCO, sep=";", encoding="latin-1"):
+    """Casos e óbitos (total, M, F) por (ESTADO, ANO_IS, MES_IS) de um arquivo de registros."""
+    colunas = COLUNAS_REGISTRO_CASOS
+    blocos = pd.read_csv(caminho, sep=sep, encoding=encoding, usecols=list(colunas.values()),
+                         dtype="string", chunksize=tamanho_bloco)
+    parciais = []
+    linhas = 0
+    for bloco in blocos:
+        linhas += len(bloco)
+        bloco = bloco.dropna(subset=[colunas["uf"], colunas["ano"], colunas["mes"]])
+        sexo = bloco[colunas["sexo"]].str.strip().str.upper().str[:1]
+        obito = bloco[colunas["obito"]].str.strip().str.upper().isin(VALORES_OBITO).to_numpy()
+        contagens = pd.DataFrame({
+            "ESTADO": bloco[colunas["uf"]].str.strip().str.upper(),
+            "ANO_IS": bloco[colunas["ano"]].astype("int16"),
+            "MES_IS": bloco[colunas["mes"]].astype("int8"),
+            "Casos_Total": 1,
+            "Casos_M": (sexo == "M").to_numpy(dtype="int64"),
+            "Casos_F": (sexo == "F").to_numpy(dtype="int64"),
+            "Obitos_Total": obito.astype("int64"),
+            "Obitos_M": (obito & (sexo == "M").to_numpy(dtype=bool)).astype("int64"),
+            "Obitos_F": (obito & (sexo == "F").to_numpy(dtype=bool)).astype("int64"),
+        })
+        parciais.append(contagens.groupby(CHAVES).sum())
+
+    return pd.concat(parciais).groupby(level=CHAVES).sum(), linhas
+
+
+def _processar(tarefa):
+    tipo, caminho, tamanho_bloco = tarefa
+    inicio = time.perf_counter()
+    if tipo == "inmet":
+        parcial, linhas = processar_estacao(caminho, tamanho_bloco)
+    else:
+        parcial, linhas = processar_casos(caminho, tamanho_bloco)
+    return tipo, caminho, parcial, linhas, time.perf_counter() - inicio
+
+
+def unificar(parciais_clima, parciais_casos, estados=None):
+    """Junta os parciais no schema de `dataset_unificado_processado.csv`."""
+    clima = pd.concat(parciais_clima).groupby(level=CHAVES).sum()
+    medias = pd.DataFrame({
+        var: clima[f"{var}_soma"] / clima[f"{var}_n"].replace(0, np.nan)
+        for var in COLUNAS_CLIMATICAS if f"{var}_soma" in clima.columns
+    })
+
+    if parciais_casos:
+        casos = pd.concat(parciais_casos).groupby(level=CHAVES).sum()
+    else:
+        casos = pd.DataFrame(columns=COLUNAS_CASOS, index=medias.index[:0])
+
+    # A grade é a dos meses com dados climáticos; meses sem casos ficam com zero
+    unificado = medias.join(casos[COLUNAS_CASOS], how="left")
+    unificado[COLUNAS_CASOS] = unificado[COLUNAS_CASOS].fillna(0).astype("int64")
+    unificado["Mortalidade"] = (
+        unificado["Obitos_Total"] / unificado["Casos_Total"].replace(0, np.nan) * 100
+    ).fillna(0)
+
+    unificado = unificado.reset_index()
+    if estados:
+        unificado = unificado[unificado["ESTADO"].isin(estados)]
+    nomes_longos = {curto: longo for longo, curto in COLUNAS_INMET.items()}
+    colunas = CHAVES + COLUNAS_CASOS + ["Mortalidade"] + [c for c in COLUNAS_CLIMATICAS if c in unificado]
+    return (unificado[colunas].sort_values(CHAVES).rename(columns=nomes_longos)
+            .reset_index(drop=True))
+
+
+def executar(arquivos_inmet, arquivos_casos, destino, estados=None,
+             max_workers=None, tamanho_bloco=TAMANHO_BLOCO, relatorio=print):
+    """Roda o ETL completo e grava o dataset unificado em `destino`.
+
+    Não há destino padrão: o dataset do painel só é substituído quando pedido
+    explicitamente.
+    """
+    tarefas = ([("inmet", c, tamanho_bloco) for c in arquivos_inmet]
+               + [("casos", c, tamanho_bloco) for c in arquivos_casos])
+    # Arquivos maiores primeiro, para equilibrar a carga entre os workers
+    tarefas.sort(key=lambda t: os.path.getsize(t[1]), reverse=True)
+
+    inicio = time.perf_counter()
+    parciais = {"inmet": [], "casos": []}
+    linhas = {"inmet": 0, "casos": 0}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for tipo, caminho, parcial, n, duracao in pool.map(_processar, tarefas):
+            parciais[tipo].append(parcial)
+            linhas[tipo] += n
+            relatorio(f"{os.path.basename(caminho)}: {n:,} linhas em {duracao:.2f}s "
+                      f"({n / max(duracao, 1e-9):,.0f} linhas/s)")
+
+    if not parciais["inmet"]:
+        raise ValueError("Nenhum arquivo do INMET informado")
+    unificado = unificar(parciais["inmet"], parciais["casos"], estados)
+
+    temporario = temporario_ao_lado(destino)
+    unificado.to_csv(temporario, index=False)
+    os.replace(temporario, destino)
+    if os.path.abspath(destino) == os.path.abspath(CAMINHO_CSV):
+        relatorio("Dataset do painel substituído: o armazenamento colunar é reconvertido no próximo acesso.")
+
+    duracao = time.perf_counter() - inicio
+    total = linhas["inmet"] + linhas["casos"]
+    relatorio(f"Total: {total:,} linhas ({linhas['inmet']:,} horárias, {linhas['casos']:,} casos) "
+              f"em {duracao:.2f}s = {total / max(duracao, 1e-9):,.0f} linhas/s")
+    relatorio(f"{len(unificado)} linhas (estado, ano, mês) gravadas em {destino}")
+    return unificado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera o dataset unificado a partir dos dados brutos.")
+    parser.add_argument("--inmet", required=True,
+                        help="Diretório com os CSVs horários do INMET (busca recursiva)")
+    parser.add_argument("--casos", action="append", default=[],
+                        help="Arquivo de registros de casos humanos (pode repetir)")
+    parser.add_argument("--saida", required=True,
+                        help=f"CSV de saída (use {os.path.basename(CAMINHO_CSV)} para substituir o do painel)")
+    parser.add_argument("--estados", nargs="+", help="Manter só estes estados (ex.: ES MG RJ SP)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO, help="Linhas por bloco de leitura")
+    args = parser.parse_args()
+
+    arquivos = sorted(
+        caminho for caminho in glob.glob(os.path.join(args.inmet, "**", "*"), recursive=True)
+        if caminho.lower().endswith(".csv")
+    )
+    executar(arquivos, args.casos, args.saida, args.estados, args.workers, args.bloco)
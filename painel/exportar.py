@@ -0,0 +1,153 @@
+"""Todas as saídas do painel para uma seleção, sem Streamlit.
+
+Usa os mesmos cálculos (`painel.calculos`) e figuras (`painel.figuras`) do
+`final1.py` e grava na pasta de saída as tabelas em CSV, os totais em JSON e
+cada figura como JSON do Plotly (o mesmo spec que o painel envia ao navegador):
+
+    python -m painel.exportar --estados ES MG --anos 2017 2018 --meses Mar Jun \\
+        --fator Precipitação --k 3 --saida saida/
+
+Sem --estados/--anos, usa todos; sem --meses, o ano inteiro.
+"""
+import argparse
+import json
+import os
+import time
+
+import plotly.io as pio
+
+from painel import (calculos, clusterizacao, correlacao, cubo, dados, figuras, geometria, populacao,
+                    previsao, sazonalidade)
+
+
+def gerar_saidas(df, cubo_dados, tabela_populacao, estados=None, anos=None, mes_inicio=1,
+                 mes_fim=12, fator="Temperatura", k=None, geojson=None, varredura=None,
+                 chave_dados=None):
+    """Tabelas, totais e figuras de uma seleção, como o painel as mostra.
+
+    Devolve (tabelas, totais, figuras): dicionários nome -> DataFrame e
+    nome -> `go.Figure`. Sem `geojson` o mapa é omitido; sem `varredura`,
+    o gráfico de cotovelo. O mapa mostra a primeira métrica de
+    `calculos.METRICAS_MAPA` e embute a geometria, para abrir fora do painel.
+    """
+    selecao = calculos.selecao_completa(cubo_dados, estados, anos, mes_inicio, mes_fim)
+    fatias = calculos.filtrar(cubo_dados, selecao["estados"], selecao["anos"], mes_inicio, mes_fim)
+    coluna = calculos.OPCOES_CLIMATICAS[fator]
+
+    df_filtrado = calculos.tabela_filtrada(fatias, tabela_populacao)
+    df_estados = calculos.casos_por_estado(fatias)
+    df_metricas = calculos.metricas_por_estado(fatias, tabela_populacao)
+    df_mensal = calculos.agregar_mensal(fatias, medias=(coluna,))
+    camada = sazonalidade.construir(cubo_dados)
+    df_normalizado = calculos.comparacao_sazonal(camada, coluna, selecao["estados"], selecao["anos"],
+                                                 mes_inicio, mes_fim)
+    previsoes = previsao.carregar_ou_ajustar(camada, chave_dados=chave_dados, max_workers=1)
+    df_previsao = calculos.previsao_mensal(previsoes, camada, selecao["estados"], None,
+                                           mes_inicio, mes_fim)
+    resultado = calculos.ajustar_agrupamentos(df, k, varredura, chave_dados=chave_dados)
+    casos_agrupados = calculos.casos_por_agrupamento(resultado)
+    correlacoes = calculos.correlacoes_defasadas(cubo_dados)
+
+    tabelas = {
+        "filtrado": df_filtrado,
+        "estados": df_estados,
+        "metricas_estados": df_metricas,
+        "mensal": df_mensal,
+        "normalizado": df_normalizado,
+        "previsao": df_previsao,
+        "correlacoes": correlacoes,
+        "agrupamentos": resultado["cluster_summary"],
+        "meses_agrupamentos": resultado["contagem"],
+    }
+
+    saidas_figuras = {}
+    if geojson is not None:
+        saidas_figuras["mapa"] = figuras.mapa_metrica(df_metricas, next(iter(calculos.METRICAS_MAPA)), geojson)
+    saidas_figuras.update({
+        "pizza_estados": figuras.pizza_estados(df_estados),
+        "barras_estados": figuras.barras_estados(df_estados),
+        "evolucao_casos": figuras.evolucao_casos(df_mensal, df_previsao),
+        "dispersao": figuras.dispersao_clima(df_filtrado, fator),
+        "evolucao_climatica": figuras.evolucao_climatica(df_mensal, fator),
+        "evolucao_normalizada": figuras.comparacao_normalizada(df_normalizado, fator),
+        "correlacao_defasada": figuras.correlacao_defasada(correlacoes, correlacao.TODOS),
+        "radar": figuras.radar_agrupamentos(resultado),
+        "pizza_agrupamentos": figuras.pizza_agrupamentos(casos_agrupados),
+        "meses_agrupamentos": figuras.meses_agrupamentos(resultado["contagem"]),
+    })
+    if varredura is not None:
+        saidas_figuras["cotovelo"] = figuras.cotovelo(clusterizacao.resumir_varredura(varredura))
+
+    totais = {**selecao, **calculos.totais(fatias), "fator": fator,
+              "k": resultado["hiperparametros"]["n_clusters"]}
+    return tabelas, totais, saidas_figuras
+
+
+def gravar_saidas(tabelas, totais, saidas_figuras, diretorio):
+    """Grava as saídas em `diretorio` e devolve os caminhos criados."""
+    os.makedirs(diretorio, exist_ok=True)
+    caminhos = []
+    for nome, tabela in tabelas.items():
+        caminho = os.path.join(diretorio, f"{nome}.csv")
+        tabela.to_csv(caminho, index=False)
+        caminhos.append(caminho)
+
+    caminho = os.path.join(diretorio, "totais.json")
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(totais, arquivo, indent=2, ensure_ascii=False)
+    caminhos.append(caminho)
+
+    for nome, figura in saidas_figuras.items():
+        caminho = os.path.join(diretorio, f"figura_{nome}.json")
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            arquivo.write(pio.to_json(figura, validate=False))
+        caminhos.append(caminho)
+    return caminhos
+
+
+def exportar(diretorio, estados=None, anos=None, mes_inicio=1, mes_fim=12,
+             fator="Temperatura", k=None):
+    """Carrega os artefatos (como o painel) e grava as saídas da seleção."""
+    versao = dados.versao_dados()
+    df = dados.carregar_dados()
+    cubo_dados = cubo.carregar_ou_construir(versao, lambda: df)
+
+    try:
+        geojson = geometria.carregar_geometria("brasil")
+    except (OSError, ValueError) as erro:
+        # Sem o artefato nem acesso à rede: exporta o resto sem o mapa
+        print(f"Mapa omitido ({erro}). Gere com `python -m painel.geometria`.")
+        geojson = None
+
+    try:
+        varredura = clusterizacao.carregar_varredura(versao)
+    except FileNotFoundError:
+        varredura = None
+
+    tabelas, totais, saidas_figuras = gerar_saidas(
+        df, cubo_dados, populacao.carregar_populacao(), estados, anos, mes_inicio, mes_fim,
+        fator, k, geojson=geojson, varredura=varredura, chave_dados=versao
+    )
+    return gravar_saidas(tabelas, totais, saidas_figuras, diretorio)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta tabelas e figuras do painel para uma seleção.")
+    parser.add_argument("--estados", nargs="+", help="Siglas dos estados (padrão: todos)")
+    parser.add_argument("--anos", type=int, nargs="+", help="Anos (padrão: todos)")
+    parser.add_argument("--meses", nargs=2, choices=calculos.MESES, default=["Jan", "Dez"],
+                        metavar=("INICIO", "FIM"), help="Intervalo de meses, ex.: Mar Jun")
+    parser.add_argument("--fator", choices=list(calculos.OPCOES_CLIMATICAS), default="Temperatura")
+    parser.add_argument("--k", type=int, default=None, help="Número de agrupamentos")
+    parser.add_argument("--saida", default="saida")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    caminhos = exportar(
+        args.saida, args.estados, args.anos,
+        calculos.MESES.index(args.meses[0]) + 1, calculos.MESES.index(args.meses[1]) + 1,
+        args.fator, args.k
+    )
+    for caminho in caminhos:
+        print(caminho)
+    print(f"{len(caminhos)} arquivos em {time.perf_counter() - inicio:.1f}s")
@@ -0,0 +1,458 @@
+"""Figuras do painel, montadas a partir dos DataFrames de `painel.calculos`.
+
+Cada função devolve uma `go.Figure` pronta (o "spec" que o Streamlit envia ao
+navegador e que `python -m painel.exportar` grava em JSON), sem depender do
+Streamlit.
+
+`plotly.express` e `make_subplots` são importados dentro das funções: a
+importação custa cerca de 0,3 s e só é paga quando uma figura é montada de
+fato (na falta do cache de figuras), e não na partida do servidor.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from painel.calculos import (COMPONENTES_COMPARACAO, MESES, METRICAS_MAPA, NOMES_CLIMATICOS,
+                             OPCOES_CLIMATICAS, UNIDADES_CLIMATICAS, datas_mensais,
+                             densidade_dispersao, faixas_verao, rotulos_data)
+from painel.geometria import REGIOES
+from painel.previsao import NIVEL_INTERVALO
+
+FUNDO = "#0E1117"
+
+# Dispersão clima x casos: acima de LIMIAR_WEBGL pontos o navegador desenha
+# com WebGL; acima de LIMIAR_DENSIDADE os pontos viram um histograma 2D
+# calculado no servidor (FAIXAS_DENSIDADE x FAIXAS_DENSIDADE células), e o
+# tamanho da figura deixa de crescer com o número de linhas.
+LIMIAR_WEBGL = 1_000
+LIMIAR_DENSIDADE = 10_000
+FAIXAS_DENSIDADE = 60
+
+# Sudeste com as cores de sempre; as outras 23 UFs, em ordem alfabética, com a
+# paleta Light24 do Plotly sem o amarelo próximo ao de MG. Nenhuma cor se repete.
+_CORES_SUDESTE = {
+    "ES": "#003366",
+    "MG": "#FCDB04",
+    "RJ": "#0068c9",
+    "SP": "#83c9ff",
+}
+_PALETA_OUTROS_ESTADOS = [
+    "#FD3216", "#00FE35", "#6A76FC", "#FED4C4", "#FE00CE", "#0DF9FF", "#FF9616", "#479B55",
+    "#EEA6FB", "#DC587D", "#D626FF", "#6E899C", "#00B5F7", "#B68E00", "#C9FBE5", "#FF0092",
+    "#22FFA7", "#E3EE9E", "#86CE00", "#BC7196", "#7E7DCD", "#FC6955", "#E48F72",
+]
+CORES_ESTADOS = {
+    **_CORES_SUDESTE,
+    **dict(zip([uf for uf in REGIOES["brasil"] if uf not in _CORES_SUDESTE], _PALETA_OUTROS_ESTADOS)),
+}
+
+# Cores dos agrupamentos no radar e na pizza
+CORES_RADAR = {0: "#0068c9", 1: "#FF4B4B", 2: "#FCDB04"}
+CORES_PIZZA_AGRUPAMENTOS = {0: "#0068c9", 1: "#83c9ff", 2: "#FCDB04"}
+
+# Variáveis do radar e seus nomes legíveis
+VARIAVEIS_RADAR = {
+    "Casos_Total": "Casos",
+    "Obitos_Total": "Óbitos",
+    "PRECIPITACAO": "Precipitação (mm)",
+    "PRESSAO": "Pressão Atmosférica (mB)",
+    "RADIACAO": "Radiação (Kj/m²)",
+    "TEMPERATURA": "Temperatura (°C)",
+}
+
+# Previsão de casos no gráfico de evolução mensal
+COR_PREVISAO = "#FF4B4B"
+COR_INTERVALO = "rgba(255, 75, 75, 0.2)"
+
+CORES_COMPARACAO = {
+    "Casos": "#0068c9",
+    "Óbitos": "#83c9ff",
+    **{nome: "#FCDB04" for nome in OPCOES_CLIMATICAS},
+}
+
+
+def _tema_escuro(fig, **layout):
+    fig.update_layout(
+        paper_bgcolor=FUNDO,
+        plot_bgcolor=FUNDO,
+        font=dict(color="white"),
+        legend=dict(font=dict(color="white")),
+        **layout
+    )
+    return fig
+
+
+def _eixo_meses(fig):
+    fig.update_xaxes(tickvals=list(range(1, 13)), ticktext=MESES)
+    return fig
+
+
+def mapa_metrica(df_metricas, metrica, geojson, estados=REGIOES["brasil"]):
+    """Estados coloridos pela `metrica` (nome exibido em `METRICAS_MAPA`) no recorte.
+
+    `df_metricas` vem de `calculos.metricas_por_estado`. `geojson` é a
+    geometria ou a URL dela: com a URL a figura não carrega os contornos, que
+    o navegador baixa uma vez. Estados fora do recorte ou sem a métrica
+    ficam em cinza.
+    """
+    coluna = METRICAS_MAPA[metrica]
+    valores = df_metricas.set_index("ESTADO").reindex(estados)
+    com_dados = valores[valores[coluna].notna()]
+    sem_dados = valores.index[valores[coluna].isna()]
+
+    fig = go.Figure()
+    fig.add_trace(go.Choropleth(
+        geojson=geojson,
+        featureidkey="id",
+        locations=list(sem_dados),
+        z=np.zeros(len(sem_dados)),
+        colorscale=[[0, "#696969"], [1, "#696969"]],
+        showscale=False,
+        marker_line_color=FUNDO,
+        hovertemplate="%{location}: sem dados no recorte<extra></extra>",
+    ))
+    fig.add_trace(go.Choropleth(
+        geojson=geojson,
+        featureidkey="id",
+        locations=list(com_dados.index),
+        z=com_dados[coluna].to_numpy(dtype="float64"),
+        customdata=com_dados[["Casos_Total", "Obitos_Total", "incidencia", "letalidade"]].to_numpy(dtype="float64"),
+        colorscale="YlOrRd",
+        marker_line_color=FUNDO,
+        colorbar=dict(title=metrica, thickness=12),
+        hovertemplate=(
+            "<b>%{location}</b><br>"
+            "Casos = %{customdata[0]:,.0f}<br>"
+            "Óbitos = %{customdata[1]:,.0f}<br>"
+            "Incidência = %{customdata[2]:.2f} por 100 mil hab.<br>"
+            "Letalidade = %{customdata[3]:.1f}%<extra></extra>"
+        ),
+    ))
+    fig.update_geos(fitbounds="locations", visible=False)
+    fig.update_layout(
+        width=600,
+        height=350,
+        dragmode=False,
+        geo=dict(bgcolor=FUNDO),
+        paper_bgcolor=FUNDO,
+        plot_bgcolor=FUNDO,
+        font=dict(color="white"),
+        margin={"r": 0, "t": 30, "l": 0, "b": 0},
+        modebar_remove=["zoom", "pan", "zoomInGeo", "zoomOutGeo", "resetGeo"]
+    )
+    return fig
+
+
+def pizza_estados(df_estados):
+    """Proporção de casos por estado."""
+    import plotly.express as px
+
+    fig = px.pie(
+        df_estados,
+        values="Casos_Total",
+        names="ESTADO",
+        color="ESTADO",
+        color_discrete_map=CORES_ESTADOS
+    )
+    fig.update_traces(hovertemplate="%{value} casos em %{label}")
+    return _tema_escuro(fig)
+
+
+def barras_estados(df_estados):
+    """Casos e óbitos por estado, lado a lado."""
+    import plotly.express as px
+
+    fig = px.bar(
+        df_estados,
+        x="ESTADO",
+        y=["Casos_Total", "Obitos_Total"],
+        barmode="group",
+        labels={"value": "Número de Casos e de Mortes", "variable": "Tipo"}
+    )
+    fig.for_each_trace(lambda t: t.update(
+        name=t.name.replace("Casos_Total", "Casos").replace("Obitos_Total", "Óbitos")
+    ))
+    fig.update_traces(hovertemplate="%{y} %{data.name} em %{x}")
+    return _tema_escuro(fig)
+
+
+def evolucao_casos(df_mensal, df_previsao=None):
+    """Casos por mês, uma linha por ano, e a previsão dos próximos meses com o intervalo."""
+    import plotly.express as px
+
+    fig = px.line(
+        df_mensal,
+        x="MES_IS",
+        y="Casos_Total",
+        color="ANO_IS",
+        labels={"MES_IS": "Mês", "Casos_Total": "Número de casos por mês"},
+    )
+    _eixo_meses(fig)
+    fig.update_traces(hovertemplate="%{y} casos em %{x}/%{data.name}<extra></extra>")
+
+    # Previsão: linha tracejada por ano previsto, com o intervalo como faixa preenchida
+    if df_previsao is not None:
+        for ano, df_ano in df_previsao.groupby("ANO_IS"):
+            grupo = f"previsao_{ano}"
+            fig.add_trace(go.Scatter(
+                x=df_ano["MES_IS"], y=df_ano["superior"], mode="lines", line=dict(width=0),
+                legendgroup=grupo, showlegend=False, hoverinfo="skip",
+            ))
+            fig.add_trace(go.Scatter(
+                x=df_ano["MES_IS"], y=df_ano["inferior"], mode="lines", line=dict(width=0),
+                fill="tonexty", fillcolor=COR_INTERVALO, legendgroup=grupo,
+                name=f"{ano}: intervalo de {NIVEL_INTERVALO:.0%}", hoverinfo="skip",
+            ))
+            fig.add_trace(go.Scatter(
+                x=df_ano["MES_IS"], y=df_ano["previsto"], mode="lines+markers",
+                line=dict(color=COR_PREVISAO, dash="dash"), legendgroup=grupo,
+                name=f"{ano} (previsão)",
+                customdata=df_ano[["inferior", "superior"]].to_numpy(),
+                hovertemplate=(f"%{{y:.0f}} casos previstos em %{{x}}/{ano} "
+                               "(%{customdata[0]:.0f} a %{customdata[1]:.0f})<extra></extra>"),
+            ))
+    return _tema_escuro(fig)
+
+
+def dispersao_clima(df_filtrado, fator, limiar_webgl=LIMIAR_WEBGL,
+                    limiar_densidade=LIMIAR_DENSIDADE):
+    """Casos por (estado, mês) contra o fator climático `fator` (nome exibido).
+
+    Pontos em SVG até `limiar_webgl`, em WebGL até `limiar_densidade` e,
+    acima disso, o histograma 2D de `densidade_clima`.
+    """
+    import plotly.express as px
+
+    if len(df_filtrado) > limiar_densidade:
+        return densidade_clima(df_filtrado, fator)
+
+    coluna = OPCOES_CLIMATICAS[fator]
+    fig = px.scatter(
+        df_filtrado,
+        x=coluna,
+        y="Casos_Total",
+        labels={coluna: UNIDADES_CLIMATICAS[fator], "Casos_Total": "Casos Totais"},
+        render_mode="webgl" if len(df_filtrado) > limiar_webgl else "svg",
+    )
+    fig.update_traces(
+        hovertemplate=(
+            "Estado = %{customdata[0]}<br>"
+            "Data = %{customdata[1]}<br>"
+            "%{xaxis.title.text} = %{x:.2f}<br>"
+            "Casos Totais = %{y:.2f}<extra></extra>"
+        ),
+        customdata=df_filtrado[["ESTADO"]].assign(Data_Formatada=rotulos_data(df_filtrado))
+    )
+    return _tema_escuro(fig)
+
+
+def densidade_clima(df_filtrado, fator, faixas=FAIXAS_DENSIDADE):
+    """Dispersão agregada: quantos registros (estado, mês) caem em cada célula.
+
+    A cor segue o log10 da contagem (poucas células concentram quase todos os
+    registros); a dica mostra a faixa, a contagem e os casos somados da célula.
+    """
+    coluna = OPCOES_CLIMATICAS[fator]
+    densidade = densidade_dispersao(df_filtrado[coluna], df_filtrado["Casos_Total"], faixas)
+    bordas_x, bordas_y = densidade["bordas_x"], densidade["bordas_y"]
+    contagem = densidade["contagem"]
+
+    cor = np.full(contagem.shape, np.nan, dtype="float32")
+    np.log10(contagem, out=cor, where=contagem > 0)
+    maximo = int(contagem.max()) if contagem.size else 1
+    potencias = [10 ** i for i in range(len(str(maximo)))]
+
+    fig = go.Figure(go.Heatmap(
+        x=((bordas_x[:-1] + bordas_x[1:]) / 2).astype("float32"),
+        y=((bordas_y[:-1] + bordas_y[1:]) / 2).astype("float32"),
+        z=cor,
+        customdata=np.stack([contagem, densidade["soma_y"]], axis=-1).astype("float32"),
+        colorscale="Viridis",
+        hoverongaps=False,
+        colorbar=dict(title="Registros", tickvals=np.log10(potencias), ticktext=potencias),
+        hovertemplate=(
+            f"%{{xaxis.title.text}} = %{{x:.2f}} ± {(bordas_x[1] - bordas_x[0]) / 2:.2f}<br>"
+            f"Casos Totais = %{{y:.1f}} ± {(bordas_y[1] - bordas_y[0]) / 2:.1f}<br>"
+            "%{customdata[0]:,} registros (estado × mês)<br>"
+            "%{customdata[1]:,.0f} casos<extra></extra>"
+        ),
+    ))
+    fig.update_layout(xaxis_title=UNIDADES_CLIMATICAS[fator], yaxis_title="Casos Totais")
+    return _tema_escuro(fig)
+
+
+def correlacao_defasada(correlacoes, estado, metodo="spearman"):
+    """Correlação de cada variável climática, defasada de 0 a n meses, com os casos de `estado`.
+
+    `correlacoes` é a tabela de `calculos.correlacoes_defasadas` e `metodo`,
+    "pearson" ou "spearman".
+    """
+    tabela = correlacoes[correlacoes["ESTADO"] == estado]
+    variaveis = list(pd.unique(tabela["variavel"]))
+    grade = tabela.pivot(index="variavel", columns="defasagem", values=metodo).reindex(variaveis)
+    pares = tabela.pivot(index="variavel", columns="defasagem", values="pares").reindex(variaveis)
+
+    fig = go.Figure(go.Heatmap(
+        x=list(grade.columns),
+        y=[NOMES_CLIMATICOS.get(v, v) for v in variaveis],
+        z=grade.to_numpy(),
+        customdata=pares.to_numpy(),
+        zmin=-1,
+        zmax=1,
+        colorscale="RdBu_r",
+        texttemplate="%{z:.2f}",
+        hoverongaps=False,
+        colorbar=dict(title="r"),
+        hovertemplate=(
+            "%{y} de %{x} meses antes<br>"
+            "r = %{z:.2f} (%{customdata} meses com dados)<extra></extra>"
+        ),
+    ))
+    fig.update_xaxes(title="Defasagem (meses entre o clima e os casos)", tickvals=list(grade.columns))
+    fig.update_yaxes(autorange="reversed")
+    return _tema_escuro(fig)
+
+
+def evolucao_climatica(df_mensal, fator):
+    """Média mensal do fator climático, uma linha por ano."""
+    import plotly.express as px
+
+    df = df_mensal.rename(columns={OPCOES_CLIMATICAS[fator]: fator})
+    fig = px.line(
+        df,
+        x="MES_IS",
+        y=fator,
+        color="ANO_IS",
+        labels={"MES_IS": "Mês", fator: UNIDADES_CLIMATICAS[fator], "ANO_IS": "Ano"},
+    )
+    _eixo_meses(fig)
+    fig.update_traces(hovertemplate="%{y:.2f} em %{x}/%{data.name}<extra></extra>")
+    return _tema_escuro(fig)
+
+
+def comparacao_normalizada(df_long, fator, componente="Série observada"):
+    """Casos, óbitos e fator climático normalizados no eixo mensal, com os verões destacados."""
+    import plotly.express as px
+
+    df = df_long.assign(DATA=datas_mensais(df_long), ROTULO=rotulos_data(df_long))
+    if componente == next(iter(COMPONENTES_COMPARACAO)):
+        eixo_y = f" Fator climático {fator} normalizado"
+    else:
+        eixo_y = f"{componente} (normalizada)"
+    fig = px.line(
+        df,
+        x="DATA",
+        y="Valor",
+        color="Variável",
+        markers=True,
+        custom_data=["ROTULO"],
+        labels={"DATA": "Tempo", "Valor": eixo_y},
+        color_discrete_map=CORES_COMPARACAO
+    )
+    fig.update_traces(hovertemplate="%{y:.2f} em %{customdata[0]}<extra>%{fullData.name}</extra>")
+
+    # Meses de verão (Dez, Jan, Fev) seguidos viram uma faixa, de meio mês antes a meio mês depois
+    meio_mes = pd.Timedelta(days=15)
+    for inicio, fim in faixas_verao(df_long):
+        fig.add_vrect(x0=inicio - meio_mes, x1=fim + meio_mes,
+                      fillcolor="#FFFF99", opacity=0.3, layer="below", line_width=0)
+
+    # Um rótulo por mês enquanto cabem; em séries longas, os ticks automáticos do eixo de datas
+    meses = df.drop_duplicates("DATA")
+    if len(meses) <= 36:
+        ticktext = meses["MES_IS"].map(lambda mes: MESES[mes - 1])
+        if meses["ANO_IS"].nunique() > 1:
+            ticktext = ticktext + " " + meses["ANO_IS"].astype(str)
+        fig.update_xaxes(tickvals=meses["DATA"], ticktext=list(ticktext))
+    else:
+        fig.update_xaxes(tickformat="%m/%Y")
+
+    fig.add_annotation(
+        xref="paper", yref="paper",
+        x=0.02, y=1.15,
+        text="Áreas amarelas: meses de verão (Dez, Jan, Fev)",
+        showarrow=False,
+        font=dict(size=16)
+    )
+    return _tema_escuro(fig)
+
+
+def cotovelo(resumo_varredura):
+    """Inércia, silhueta e Davies–Bouldin por k (média e desvio entre sementes)."""
+    from plotly.subplots import make_subplots
+
+    valores_k = list(resumo_varredura.index)
+    fig = make_subplots(rows=1, cols=2,
+                        subplot_titles=("Inércia (cotovelo)", "Silhueta e Davies–Bouldin"))
+    for col, metrica, nome, cor in [
+        (1, "inercia", "Inércia", "#0068c9"),
+        (2, "silhueta", "Silhueta (maior é melhor)", "#FCDB04"),
+        (2, "davies_bouldin", "Davies–Bouldin (menor é melhor)", "#83c9ff"),
+    ]:
+        fig.add_trace(go.Scatter(
+            x=valores_k,
+            y=resumo_varredura[(metrica, "mean")],
+            error_y=dict(array=resumo_varredura[(metrica, "std")].fillna(0)),
+            mode="lines+markers",
+            name=nome,
+            line=dict(color=cor)
+        ), row=1, col=col)
+    fig.update_xaxes(title_text="Número de agrupamentos (k)", tickvals=valores_k)
+    return _tema_escuro(fig)
+
+
+def radar_agrupamentos(resultado):
+    """Médias padronizadas das variáveis em cada agrupamento."""
+    medias = resultado["medias"]
+    variaveis = list(VARIAVEIS_RADAR)
+    fig = go.Figure()
+    for i in range(resultado["hiperparametros"]["n_clusters"]):
+        fig.add_trace(go.Scatterpolar(
+            r=medias.loc[i, variaveis].values,
+            theta=list(VARIAVEIS_RADAR.values()),
+            fill="toself",
+            name=f"Agrupamento {i}",
+            line=dict(color=CORES_RADAR.get(i, "#CCCCCC"))
+        ))
+    fig.update_layout(
+        polar=dict(
+            bgcolor="#F5F5F5",
+            radialaxis=dict(visible=True, linecolor="white", gridcolor="gray", tickfont=dict(color="white"))
+        ),
+        paper_bgcolor=FUNDO,
+        plot_bgcolor=FUNDO,
+        font=dict(color="white"),
+        showlegend=True,
+        height=500
+    )
+    return fig
+
+
+def pizza_agrupamentos(casos_agrupados):
+    """Distribuição dos casos entre os agrupamentos."""
+    import plotly.express as px
+
+    fig = px.pie(
+        casos_agrupados,
+        names="agrupamento",
+        values="Casos_Total",
+        color="cluster",
+        color_discrete_map=CORES_PIZZA_AGRUPAMENTOS,
+        height=500
+    )
+    fig.update_traces(hovertemplate="%{value} casos no %{label}", textinfo="percent+label")
+    return _tema_escuro(fig)
+
+
+def meses_agrupamentos(contagem):
+    """Quantas vezes cada mês aparece em cada agrupamento."""
+    import plotly.express as px
+
+    return px.bar(
+        contagem,
+        x="MES_IS",
+        y="contagem",
+        color="cluster",
+        barmode="group",
+        labels={"MES_IS": "Mês", "contagem": "Frequência", "cluster": "Cluster"}
+    )
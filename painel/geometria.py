@@ -0,0 +1,274 @@
+"""Armazenamento local da geometria dos estados brasileiros.
+
+O GeoJSON completo do Brasil é baixado uma única vez, filtrado para a região
+desejada, reduzido às propriedades usadas pelo mapa e salvo como artefato
+versionado em disco. Depois disso o dashboard funciona sem acesso à rede.
+
+Os contornos são simplificados (Douglas-Peucker) e as coordenadas
+arredondadas na construção do artefato: num mapa do Brasil inteiro, detalhes
+menores que ~1 km não aparecem e só aumentam o arquivo. O painel não embute
+a geometria nas figuras: o artefato é publicado em `static/` (servido pelo
+Streamlit com `server.enableStaticServing`) e a figura leva só a URL, que o
+navegador baixa uma vez e o Plotly reaproveita entre figuras e reruns. Sem o
+artefato e sem rede, `url_geometria` devolve None e o painel fica sem o mapa.
+
+Para gerar (ou regerar) os artefatos:
+
+    python -m painel.geometria                      # baixa do GitHub
+    python -m painel.geometria --fonte brasil.geojson  # usa um arquivo local
+"""
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+
+from painel.config import DIRETORIO_RAIZ, caminho_artefato, temporario_ao_lado
+
+URL_GEOJSON = "https://raw.githubusercontent.com/codeforamerica/click_that_hood/master/public/data/brazil-states.geojson"
+
+# Incrementar sempre que o formato do artefato mudar, para não reaproveitar
+# arquivos antigos gerados com outra estrutura.
+VERSAO_GEOMETRIA = 2
+
+# Desvio máximo dos contornos simplificados e casas decimais das coordenadas,
+# em graus (0,01° ≈ 1 km, menos de um pixel no mapa do Brasil)
+TOLERANCIA_SIMPLIFICACAO = 0.01
+CASAS_DECIMAIS = 3
+
+# Pasta servida pelo Streamlit em app/static/ (server.enableStaticServing)
+DIRETORIO_ESTATICO = os.path.join(DIRETORIO_RAIZ, "static")
+
+# Mapeia nomes completos para siglas
+SIGLAS_ESTADOS = {
+    "Acre": "AC",
+    "Alagoas": "AL",
+    "Amapá": "AP",
+    "Amazonas": "AM",
+    "Bahia": "BA",
+    "Ceará": "CE",
+    "Distrito Federal": "DF",
+    "Espírito Santo": "ES",
+    "Goiás": "GO",
+    "Maranhão": "MA",
+    "Mato Grosso": "MT",
+    "Mato Grosso do Sul": "MS",
+    "Minas Gerais": "MG",
+    "Pará": "PA",
+    "Paraíba": "PB",
+    "Paraná": "PR",
+    "Pernambuco": "PE",
+    "Piauí": "PI",
+    "Rio de Janeiro": "RJ",
+    "Rio Grande do Norte": "RN",
+    "Rio Grande do Sul": "RS",
+    "Rondônia": "RO",
+    "Roraima": "RR",
+    "Santa Catarina": "SC",
+    "São Paulo": "SP",
+    "Sergipe": "SE",
+    "Tocantins": "TO",
+}
+
+REGIOES = {
+    "sudeste": ["ES", "MG", "RJ", "SP"],
+    "brasil": sorted(SIGLAS_ESTADOS.values()),
+}
+
+
+def caminho_geometria(regiao="sudeste"):
+    """Caminho do artefato de geometria de uma região."""
+    return caminho_artefato("geometria", f"{regiao}_v{VERSAO_GEOMETRIA}.geojson")
+
+
+def caminho_estatico(regiao="brasil"):
+    """Cópia do artefato servida ao navegador."""
+    return os.path.join(DIRETORIO_ESTATICO, os.path.basename(caminho_geometria(regiao)))
+
+
+def baixar_geojson(url=URL_GEOJSON):
+    """Baixa o GeoJSON bruto do Brasil (só usado na construção do artefato)."""
+    import requests
+
+    resposta = requests.get(url, timeout=30)
+    resposta.raise_for_status()
+    return resposta.json()
+
+
+def ler_geojson(fonte):
+    """Lê o GeoJSON bruto de um arquivo local ou de uma URL."""
+    if fonte.startswith(("http://", "https://")):
+        return baixar_geojson(fonte)
+    with open(fonte, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def _douglas_peucker(pontos, tolerancia):
+    """Máscara dos pontos mantidos de uma linha (array n x 2) pelo Douglas-Peucker."""
+    manter = np.zeros(len(pontos), dtype=bool)
+    manter[[0, -1]] = True
+    pendentes = [(0, len(pontos) - 1)]
+    while pendentes:
+        inicio, fim = pendentes.pop()
+        if fim - inicio < 2:
+            continue
+        a, b = pontos[inicio], pontos[fim]
+        trecho = pontos[inicio + 1:fim]
+        direcao = b - a
+        comprimento = np.hypot(*direcao)
+        if comprimento == 0:
+            # Anel fechado: distância ao ponto inicial
+            distancias = np.hypot(*(trecho - a).T)
+        else:
+            distancias = np.abs(direcao[0] * (trecho[:, 1] - a[1])
+                                - direcao[1] * (trecho[:, 0] - a[0])) / comprimento
+        maior = int(np.argmax(distancias))
+        if distancias[maior] > tolerancia:
+            meio = inicio + 1 + maior
+            manter[meio] = True
+            pendentes += [(inicio, meio), (meio, fim)]
+    return manter
+
+
+def simplificar_anel(anel, tolerancia=TOLERANCIA_SIMPLIFICACAO, casas=CASAS_DECIMAIS):
+    """Anel simplificado e arredondado, ou None se ele degenerar (menos de 4 pontos)."""
+    pontos = np.asarray(anel, dtype="float64")[:, :2]
+    pontos = np.round(pontos[_douglas_peucker(pontos, tolerancia)], casas)
+    # O arredondamento pode juntar pontos vizinhos
+    repetidos = np.r_[False, (pontos[1:] == pontos[:-1]).all(axis=1)]
+    pontos = pontos[~repetidos]
+    if len(pontos) < 4:
+        return None
+    return pontos.tolist()
+
+
+def simplificar_geometria(geometria, tolerancia=TOLERANCIA_SIMPLIFICACAO, casas=CASAS_DECIMAIS):
+    """Polygon/MultiPolygon com os anéis simplificados.
+
+    Ilhas e buracos que degeneram são descartados; se nenhum polígono
+    sobrar, o contorno original é mantido só com o arredondamento.
+    """
+    poligonos = geometria["coordinates"]
+    if geometria["type"] == "Polygon":
+        poligonos = [poligonos]
+
+    simplificados = []
+    for aneis in poligonos:
+        externo = simplificar_anel(aneis[0], tolerancia, casas)
+        if externo is None:
+            continue
+        buracos = [simplificar_anel(anel, tolerancia, casas) for anel in aneis[1:]]
+        simplificados.append([externo] + [b for b in buracos if b is not None])
+
+    if not simplificados:
+        simplificados = [[simplificar_anel(anel, 0, casas) or anel for anel in aneis]
+                         for aneis in poligonos]
+    if len(simplificados) == 1:
+        return {"type": "Polygon", "coordinates": simplificados[0]}
+    return {"type": "MultiPolygon", "coordinates": simplificados}
+
+
+def construir_geometria(geojson_bruto, siglas, tolerancia=TOLERANCIA_SIMPLIFICACAO,
+                        casas=CASAS_DECIMAIS):
+    """Filtra os estados pedidos e usa a sigla como `id` de cada feature.
+
+    Mantém apenas o nome e a sigla nas propriedades, que é o que o mapa usa,
+    e simplifica os contornos.
+    """
+    siglas = set(siglas)
+    features = []
+    for feature in geojson_bruto["features"]:
+        nome = feature["properties"]["name"]
+        sigla = SIGLAS_ESTADOS.get(nome)
+        if sigla not in siglas:
+            continue
+        features.append({
+            "type": "Feature",
+            "id": sigla,
+            "properties": {"name": nome, "sigla": sigla},
+            "geometry": simplificar_geometria(feature["geometry"], tolerancia, casas),
+        })
+
+    faltando = siglas - {f["id"] for f in features}
+    if faltando:
+        raise ValueError(f"Estados ausentes no GeoJSON de origem: {sorted(faltando)}")
+
+    return {
+        "type": "FeatureCollection",
+        "versao": VERSAO_GEOMETRIA,
+        "features": sorted(features, key=lambda f: f["id"]),
+    }
+
+
+def salvar_geometria(geometria, caminho):
+    """Grava o artefato de forma atômica (arquivo temporário + rename)."""
+    temporario = temporario_ao_lado(caminho)
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(geometria, arquivo, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporario, caminho)
+
+
+def publicar_geometria(regiao="brasil"):
+    """Copia o artefato para `static/`, de onde o navegador o baixa."""
+    destino = caminho_estatico(regiao)
+    os.makedirs(DIRETORIO_ESTATICO, exist_ok=True)
+    temporario = temporario_ao_lado(destino)
+    shutil.copyfile(caminho_geometria(regiao), temporario)
+    os.replace(temporario, destino)
+    return destino
+
+
+def gerar_artefatos(fonte=URL_GEOJSON, regioes=None):
+    """Constrói, salva e publica os artefatos de todas as regiões a partir de uma fonte."""
+    geojson_bruto = ler_geojson(fonte)
+    caminhos = []
+    for regiao in regioes or REGIOES:
+        caminho = caminho_geometria(regiao)
+        salvar_geometria(construir_geometria(geojson_bruto, REGIOES[regiao]), caminho)
+        caminhos += [caminho, publicar_geometria(regiao)]
+    return caminhos
+
+
+def carregar_geometria(regiao="brasil", fonte=URL_GEOJSON):
+    """Carrega a geometria da região a partir do artefato local.
+
+    Se o artefato ainda não existir, ele é construído a partir de `fonte`
+    (só nesse primeiro uso é necessário acesso à rede).
+    """
+    caminho = caminho_geometria(regiao)
+    if not os.path.exists(caminho):
+        gerar_artefatos(fonte, regioes=[regiao])
+    with open(caminho, encoding="utf-8") as arquivo:
+        geometria = json.load(arquivo)
+    if geometria.get("versao") != VERSAO_GEOMETRIA:
+        raise ValueError(f"Artefato de geometria desatualizado: {caminho}")
+    return geometria
+
+
+def url_geometria(regiao="brasil", fonte=URL_GEOJSON):
+    """URL (relativa à página) da geometria servida pelo Streamlit.
+
+    Garante que o artefato exista e esteja publicado em `static/`. Se ele
+    não existir e não puder ser construído (ex.: sem acesso à rede), devolve
+    None e o painel mostra um aviso no lugar do mapa.
+    """
+    if not os.path.exists(caminho_geometria(regiao)):
+        try:
+            gerar_artefatos(fonte, regioes=[regiao])
+        except (OSError, ValueError):
+            # requests.RequestException é um OSError; JSON inválido, ValueError
+            return None
+    if not os.path.exists(caminho_estatico(regiao)):
+        publicar_geometria(regiao)
+    return f"app/static/{os.path.basename(caminho_estatico(regiao))}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera os artefatos de geometria dos estados.")
+    parser.add_argument("--fonte", default=URL_GEOJSON, help="URL ou arquivo GeoJSON do Brasil")
+    parser.add_argument("--regiao", action="append", choices=sorted(REGIOES),
+                        help="Região a gerar (padrão: todas)")
+    args = parser.parse_args()
+    for caminho in gerar_artefatos(args.fonte, args.regiao):
+        print(caminho)
@@ -0,0 +1,82 @@
+"""Anexação incremental de meses novos ao dataset e aos artefatos derivados.
+
+Um lote (CSV no mesmo formato de `dataset_unificado_processado.csv`, por
+exemplo gerado por `python -m painel.etl --saida lote.csv`) é filtrado pela
+marca d'água de cada estado e então:
+
+- gravado como nova parte do armazenamento colunar e no fim do CSV;
+- somado às células afetadas do cubo (estado, ano, mês) e do rollup;
+- somado às séries mensais da camada de sazonalidade, com a média móvel
+  recalculada só nos meses cuja janela alcança o lote;
+- pontuado pelos modelos de previsão de casos, que passam a prever a partir
+  do último mês novo sem reajuste;
+- atribuído aos centróides do KMeans atual, com reajuste completo apenas
+  quando a deriva passa do limiar.
+
+Cubo, camada e modelos da versão anterior são lidos dos artefatos salvos; o
+histórico de linhas só é relido se algum deles ainda não existir ou se o
+KMeans precisar de reajuste. Fora isso, o custo depende do tamanho do lote:
+
+    python -m painel.incremental lote.csv
+"""
+import argparse
+import time
+
+from painel import clusterizacao, cubo, dados, previsao, sazonalidade
+
+
+def anexar_lote(lote, limiar_deriva=clusterizacao.LIMIAR_DERIVA, relatorio=print):
+    """Anexa `lote` (DataFrame com nomes curtos) e atualiza cubo e clusterização."""
+    inicio = time.perf_counter()
+
+    # Artefatos da versão atual; só são construídos do zero se ainda não existirem
+    versao_antiga = dados.versao_dados()
+    cubo_antigo = cubo.carregar_ou_construir(versao_antiga, dados.carregar_dados)
+    camada_antiga = sazonalidade.carregar_ou_construir(versao_antiga, cubo_antigo)
+    previsoes = previsao.carregar_ou_ajustar(camada_antiga, chave_dados=versao_antiga)
+    clusters_antigos = clusterizacao.carregar_resultado(versao_antiga)
+    if clusters_antigos is None:
+        clusters_antigos = clusterizacao.carregar_ou_ajustar(
+            dados.carregar_dados(clusterizacao.COLUNAS_FEATURES + ["MES_IS"]),
+            chave_dados=versao_antiga,
+        )
+
+    anexadas = dados.anexar(lote)
+    if anexadas.empty:
+        relatorio("Nenhuma linha posterior à marca d'água; nada a fazer.")
+        return anexadas
+    versao_nova = dados.versao_dados()
+
+    cubo_novo = cubo.atualizar_cubo(cubo_antigo, anexadas)
+    cubo.salvar_cubo(cubo_novo, versao_nova)
+    camada_nova = sazonalidade.atualizar(camada_antiga, anexadas, cubo_novo)
+    sazonalidade.salvar_camada(camada_nova, versao_nova)
+
+    # Previsões feitas antes do lote contra os meses novos; os modelos seguem os mesmos
+    previsoes = previsao.pontuar(previsoes, camada_nova)
+    previsao.salvar_resultado(previsoes, versao_nova)
+    if len(previsoes["placar"]):
+        placar = previsao.resumir_placar(previsoes["placar"])
+        relatorio("Previsões pontuadas nos meses novos:\n" + placar.round(2).to_string())
+
+    clusters_novos, deriva = clusterizacao.atualizar_com_lote(clusters_antigos, anexadas)
+    if deriva > limiar_deriva:
+        relatorio(f"Deriva {deriva:.2f} acima do limiar {limiar_deriva:.2f}: reajustando o KMeans.")
+        clusters_novos = clusterizacao.ajustar_clusters(
+            dados.carregar_dados(), clusters_antigos["hiperparametros"]
+        )
+    else:
+        relatorio(f"Deriva {deriva:.2f}: lote atribuído aos centróides existentes.")
+    clusterizacao.salvar_resultado(clusters_novos, versao_nova)
+
+    relatorio(f"{len(anexadas)} linhas anexadas (de {len(lote)} no lote) "
+              f"em {time.perf_counter() - inicio:.2f}s; versão dos dados {versao_nova}")
+    return anexadas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Anexa um lote de meses novos ao dataset.")
+    parser.add_argument("lote", help="CSV no formato do dataset unificado")
+    parser.add_argument("--limiar-deriva", type=float, default=clusterizacao.LIMIAR_DERIVA)
+    args = parser.parse_args()
+    anexar_lote(dados.ler_csv(args.lote), args.limiar_deriva)
@@ -0,0 +1,163 @@
+"""Tempo, CPU e memória por seção do painel, e perfis com cProfile.
+
+Cada linha do painel e cada etapa de cálculo roda dentro de
+`medidor.secao(nome)`, que registra tempo de parede, tempo de CPU da thread
+(cada sessão do Streamlit roda na sua) e, quando ligada, a memória alocada
+com `tracemalloc` (líquida e pico). Os registros ficam na sessão, aparecem no painel de
+depuração (`?depurar=1` na URL) e são emitidos como JSON, uma linha por
+seção, no logger `painel.desempenho`. Com a variável de ambiente
+PAINEL_LOG_DESEMPENHO apontando para um arquivo, todas as sessões são
+medidas e as linhas vão para esse arquivo.
+
+Sem depuração nem log, `medidor_inativo` não mede nada e não custa nada.
+
+`tracemalloc` é global ao processo: depois de ligado ele fica ligado, deixa
+todas as sessões mais lentas, e com várias sessões simultâneas a memória de
+uma seção inclui alocações das outras (e `reset_peak` de uma zera o pico das
+demais). Por isso a memória só é medida quando o operador define
+PAINEL_LOG_DESEMPENHO; um visitante com `?depurar=1` vê só tempo e CPU.
+
+`Perfil` grava um cProfile do rerun (`?perfil=1`) em `artefatos/perfis/`,
+que pode ser visto como flamegraph com `snakeviz arquivo.prof` ou
+`flameprof arquivo.prof > perfil.svg`.
+"""
+import cProfile
+import json
+import logging
+import os
+import time
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+from painel.config import caminho_artefato
+
+VARIAVEL_LOG = "PAINEL_LOG_DESEMPENHO"
+MAX_REGISTROS = 500
+
+logger = logging.getLogger("painel.desempenho")
+
+
+def log_ativo():
+    return bool(os.environ.get(VARIAVEL_LOG))
+
+
+def _configurar_log():
+    """Arquivo de PAINEL_LOG_DESEMPENHO com uma linha JSON por seção (uma vez por processo)."""
+    caminho = os.environ.get(VARIAVEL_LOG)
+    if not caminho or logger.handlers:
+        return
+    handler = logging.FileHandler(caminho, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+class Medidor:
+    """Registros de desempenho de uma sessão, com as seções aninhadas."""
+
+    def __init__(self, max_registros=MAX_REGISTROS, memoria=None):
+        self.sessao = uuid.uuid4().hex[:8]
+        self.registros = deque(maxlen=max_registros)
+        # Por padrão, só com PAINEL_LOG_DESEMPENHO (tracemalloc vale para o processo todo)
+        self.memoria = log_ativo() if memoria is None else memoria
+        self._abertas = []  # seções em andamento, da mais externa para a mais interna
+        _configurar_log()
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def secao(self, nome):
+        """Mede o bloco `with` como a seção `nome`."""
+        inicio = {
+            "secao": nome,
+            "pai": self._abertas[-1]["secao"] if self._abertas else None,
+            "instante": time.time(),
+            "parede": time.perf_counter(),
+            "cpu": time.thread_time(),
+        }
+        if self.memoria:
+            atual, pico = tracemalloc.get_traced_memory()
+            if self._abertas:
+                # O pico da seção externa até aqui é guardado antes de zerar
+                self._abertas[-1]["pico"] = max(self._abertas[-1]["pico"], pico)
+            tracemalloc.reset_peak()
+            inicio.update(memoria=atual, pico=atual)
+        self._abertas.append(inicio)
+        try:
+            yield
+        finally:
+            self._abertas.pop()
+            self._registrar(inicio)
+
+    def medir(self, nome, funcao, *args, **kwargs):
+        """Chama `funcao(*args, **kwargs)` dentro da seção `nome`."""
+        with self.secao(nome):
+            return funcao(*args, **kwargs)
+
+    def _registrar(self, inicio):
+        registro = {
+            "sessao": self.sessao,
+            "secao": inicio["secao"],
+            "pai": inicio["pai"],
+            "instante": inicio["instante"],
+            "parede_ms": 1000 * (time.perf_counter() - inicio["parede"]),
+            "cpu_ms": 1000 * (time.thread_time() - inicio["cpu"]),
+        }
+        if self.memoria:
+            atual, pico = tracemalloc.get_traced_memory()
+            pico = max(pico, inicio["pico"])
+            registro["alocado_kb"] = (atual - inicio["memoria"]) / 1024
+            registro["pico_kb"] = (pico - inicio["memoria"]) / 1024
+            if self._abertas:
+                self._abertas[-1]["pico"] = max(self._abertas[-1]["pico"], pico)
+        self.registros.append(registro)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(registro, ensure_ascii=False))
+
+    def ultimos(self):
+        """Registro mais recente de cada seção, na ordem em que rodaram."""
+        por_secao = {}
+        for registro in self.registros:
+            por_secao.pop(registro["secao"], None)
+            por_secao[registro["secao"]] = registro
+        return sorted(por_secao.values(), key=lambda r: r["instante"])
+
+    def exportar_json(self):
+        return json.dumps(list(self.registros), ensure_ascii=False, indent=2)
+
+
+class _MedidorInativo:
+    """Mesma interface do `Medidor`, sem medir nada."""
+
+    registros = ()
+
+    def secao(self, nome):
+        return nullcontext()
+
+    def medir(self, nome, funcao, *args, **kwargs):
+        return funcao(*args, **kwargs)
+
+
+medidor_inativo = _MedidorInativo()
+
+
+class Perfil:
+    """cProfile da thread atual, gravado em `artefatos/perfis/` ao finalizar."""
+
+    def __init__(self, nome="rerun"):
+        self.nome = nome
+        self.caminho = None
+        self._perfil = cProfile.Profile()
+
+    def iniciar(self):
+        self._perfil.enable()
+        return self
+
+    def finalizar(self):
+        self._perfil.disable()
+        instante = time.strftime("%Y%m%d_%H%M%S")
+        self.caminho = caminho_artefato("perfis", f"{self.nome}_{instante}.prof")
+        self._perfil.dump_stats(self.caminho)
+        return self.caminho
@@ -0,0 +1,178 @@
+"""Custo de servidor (CPU) por interação, com e sem reexecução parcial.
+
+O painel é dividido em fragmentos (`st.fragment`): um widget dentro de um
+fragmento reexecuta só aquela seção. Este script roda o painel sem navegador
+(`streamlit.testing.v1.AppTest`) e, para cada widget, mede o tempo de CPU do
+processo em dois modos:
+
+- "completo": o script inteiro reexecuta, como antes dos fragmentos;
+- "fragmento": só o fragmento que contém o widget reexecuta, como acontece
+  no navegador.
+
+Cada medida é a mediana de várias trocas de valor (ida e volta), com os
+caches já aquecidos:
+
+    python -m painel.medir_interacoes --repeticoes 10 --saida interacoes.json
+"""
+import argparse
+import dataclasses
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+from painel.config import DIRETORIO_RAIZ
+
+CAMINHO_APP = os.path.join(DIRETORIO_RAIZ, "final1.py")
+
+# (nome, tipo do widget no AppTest, chave ou rótulo, valor alternativo).
+# Rótulo None em "checkbox" de ano usa o último ano do painel.
+INTERACOES = [
+    ("Fator climático", "radio", "fator_climatico_radio", "Precipitação"),
+    ("Estado (SP)", "checkbox", "SP", False),
+    ("Ano", "checkbox", None, False),
+    ("Intervalo de meses", "select_slider", "intervalo_meses", ("Mar", "Jun")),
+    ("Meses de previsão", "select_slider", "horizonte_previsao", 3),
+    ("Componente sazonal", "radio", "componente_comparacao", "Sazonalidade"),
+    ("Correlação (estado)", "selectbox", "correlacao_estado", "MG"),
+    ("Correlação (método)", "radio", "correlacao_metodo", "Pearson"),
+    ("Número de agrupamentos", "select_slider", "k_agrupamentos", 4),
+]
+
+# Estado reaplicado antes de cada execução. O AppTest não envia o estado de
+# expansores, então a seção de agrupamentos (carregada só quando aberta) é
+# mantida aberta para que seus widgets também sejam medidos.
+ESTADO_SESSAO = {"expandir_agrupamentos": True}
+
+
+def buscar_widget(app, tipo, identificador):
+    for widget in getattr(app, tipo):
+        if identificador in (widget.key, widget.label):
+            return widget
+    return None
+
+
+def ultimo_ano(app):
+    anos = [w.label for w in app.checkbox if w.label.isdigit()]
+    return anos[-1] if anos else None
+
+
+def _fragmentos_por_widget(runner):
+    """id do widget -> id do fragmento que o desenhou, a partir das mensagens enviadas."""
+    mapa = {}
+    for mensagem in runner.forward_msgs():
+        if not (mensagem.HasField("delta") and mensagem.delta.HasField("new_element")):
+            continue
+        elemento = mensagem.delta.new_element
+        widget_id = getattr(getattr(elemento, elemento.WhichOneof("type")), "id", "")
+        if widget_id and mensagem.delta.fragment_id:
+            mapa[widget_id] = mensagem.delta.fragment_id
+    return mapa
+
+
+@contextmanager
+def _runners(fragmento=None):
+    """Registra os runners criados pelo AppTest e, se pedido, restringe o rerun a um fragmento.
+
+    O AppTest sempre pede um rerun completo; para simular o navegador, o
+    pedido inicial é descartado e o rerun leva a fila de fragmentos.
+    """
+    from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequests
+    from streamlit.testing.v1 import app_test
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    criados = []
+
+    class Runner(LocalScriptRunner):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            criados.append(self)
+            if fragmento:
+                self._requests = ScriptRequests()
+
+        def request_rerun(self, rerun_data):
+            if fragmento:
+                rerun_data = dataclasses.replace(rerun_data, fragment_id_queue=[fragmento])
+            return super().request_rerun(rerun_data)
+
+    original = app_test.LocalScriptRunner
+    app_test.LocalScriptRunner = Runner
+    try:
+        yield criados
+    finally:
+        app_test.LocalScriptRunner = original
+
+
+def aplicar_estado(app):
+    for chave, valor in ESTADO_SESSAO.items():
+        app.session_state[chave] = valor
+
+
+def medir_execucao(app, fragmento=None):
+    aplicar_estado(app)
+    with _runners(fragmento):
+        cpu, relogio = time.process_time(), time.perf_counter()
+        app.run()
+        cpu, relogio = time.process_time() - cpu, time.perf_counter() - relogio
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return cpu, relogio
+
+
+def medir(caminho_app=CAMINHO_APP, repeticoes=10, interacoes=INTERACOES, relatorio=print):
+    """Mediana de CPU e tempo de parede por interação, nos modos completo e fragmento."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(caminho_app, default_timeout=600)
+    aplicar_estado(app)
+    with _runners() as criados:
+        app.run()
+    fragmentos = _fragmentos_por_widget(criados[-1])
+
+    resultados = []
+    for nome, tipo, identificador, alternativo in interacoes:
+        identificador = identificador or ultimo_ano(app)
+        widget = buscar_widget(app, tipo, identificador)
+        if widget is None:
+            relatorio(f"{nome}: widget não encontrado, ignorado")
+            continue
+        original = widget.value
+        fragmento = fragmentos.get(widget.id)
+
+        medidas = {"completo": [], "fragmento": []}
+        for modo in medidas:
+            alvo = fragmento if modo == "fragmento" else None
+            # Uma troca de aquecimento para preencher os caches dos dois valores
+            for repeticao in range(repeticoes + 1):
+                for valor in (alternativo, original):
+                    buscar_widget(app, tipo, identificador).set_value(valor)
+                    cpu, relogio = medir_execucao(app, alvo)
+                    if repeticao:
+                        medidas[modo].append((cpu, relogio))
+            # Reexecução completa para o AppTest voltar a conhecer todos os widgets
+            medir_execucao(app)
+
+        linha = {"interacao": nome, "widget": identificador, "fragmento": fragmento}
+        for modo, valores in medidas.items():
+            linha[f"cpu_{modo}_ms"] = 1000 * statistics.median(v[0] for v in valores)
+            linha[f"parede_{modo}_ms"] = 1000 * statistics.median(v[1] for v in valores)
+        linha["reducao_cpu"] = 1 - linha["cpu_fragmento_ms"] / linha["cpu_completo_ms"]
+        resultados.append(linha)
+        relatorio(f"{nome:<24} CPU completo {linha['cpu_completo_ms']:7.1f} ms | "
+                  f"fragmento {linha['cpu_fragmento_ms']:7.1f} ms | "
+                  f"redução {100 * linha['reducao_cpu']:5.1f}%")
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede a CPU do servidor por interação do painel.")
+    parser.add_argument("--app", default=CAMINHO_APP)
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--saida", help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    resultados = medir(args.app, args.repeticoes)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
@@ -0,0 +1,131 @@
+"""Partida a frio e primeira renderização do painel, num servidor real.
+
+Sobe o servidor do Streamlit em um processo novo e mede:
+
+- partida: do início do processo até `/_stcore/health` responder;
+- primeira renderização: de uma sessão conectada pelo websocket (como o
+  navegador faz) até o fim da execução do script;
+- segunda sessão: a mesma medida com os caches do processo já preenchidos.
+
+Os modos comparam o servidor comum (`streamlit run final1.py`) com o
+aquecido (`python -m painel.aquecimento --servir`), que prepara os caches
+antes de aceitar conexões:
+
+    python -m painel.medir_partida --modos streamlit aquecido --repeticoes 3 --saida partida.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from painel.config import DIRETORIO_RAIZ
+
+CAMINHO_APP = os.path.join(DIRETORIO_RAIZ, "final1.py")
+
+OPCOES_SERVIDOR = ["--server.headless", "true", "--browser.gatherUsageStats", "false"]
+
+MODOS = {
+    "streamlit": [sys.executable, "-m", "streamlit", "run", CAMINHO_APP],
+    "aquecido": [sys.executable, "-m", "painel.aquecimento", "--servir", "--"],
+}
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def esperar_servidor(porta, processo, timeout=600):
+    """Espera o endpoint de saúde responder; devolve o instante em que respondeu."""
+    url = f"http://127.0.0.1:{porta}/_stcore/health"
+    limite = time.perf_counter() + timeout
+    while time.perf_counter() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"Servidor terminou com código {processo.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resposta:
+                if resposta.status == 200:
+                    return time.perf_counter()
+        except OSError:
+            time.sleep(0.02)
+    raise TimeoutError(f"Servidor não respondeu em {timeout}s")
+
+
+def renderizar(porta, query_string="", timeout=600):
+    """Abre uma sessão e executa o script uma vez, como o navegador.
+
+    Devolve (segundos até o fim da execução, mensagens recebidas, bytes recebidos).
+    """
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    from websockets.sync.client import connect
+
+    pedido = BackMsg()
+    pedido.rerun_script.query_string = query_string
+    mensagens = tamanho = 0
+    inicio = time.perf_counter()
+    with connect(f"ws://127.0.0.1:{porta}/_stcore/stream", subprotocols=["streamlit"],
+                 max_size=None, open_timeout=timeout) as conexao:
+        conexao.send(pedido.SerializeToString())
+        while True:
+            dados = conexao.recv(timeout=timeout)
+            mensagens += 1
+            tamanho += len(dados)
+            mensagem = ForwardMsg()
+            mensagem.ParseFromString(dados)
+            if mensagem.HasField("script_finished"):
+                return time.perf_counter() - inicio, mensagens, tamanho
+
+
+def medir_modo(modo, repeticoes=3, relatorio=print):
+    """Mediana da partida e das duas primeiras renderizações, cada repetição num processo novo."""
+    medidas = []
+    for _ in range(repeticoes):
+        porta = porta_livre()
+        comando = [*MODOS[modo], *OPCOES_SERVIDOR, "--server.port", str(porta)]
+        inicio = time.perf_counter()
+        processo = subprocess.Popen(comando, cwd=DIRETORIO_RAIZ,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            pronto = esperar_servidor(porta, processo)
+            primeira, mensagens, tamanho = renderizar(porta)
+            segunda, _, _ = renderizar(porta)
+        finally:
+            processo.terminate()
+            processo.wait()
+        medidas.append({
+            "partida_s": pronto - inicio,
+            "primeira_renderizacao_s": primeira,
+            "segunda_renderizacao_s": segunda,
+            "ate_primeira_tela_s": pronto - inicio + primeira,
+            "mensagens": mensagens,
+            "bytes": tamanho,
+        })
+
+    resultado = {"modo": modo, "repeticoes": repeticoes}
+    for chave in medidas[0]:
+        resultado[chave] = statistics.median(m[chave] for m in medidas)
+    relatorio(f"{modo:<10} partida {resultado['partida_s']:6.2f}s | "
+              f"1ª renderização {resultado['primeira_renderizacao_s']:6.2f}s | "
+              f"2ª {resultado['segunda_renderizacao_s']:6.2f}s | "
+              f"até a primeira tela {resultado['ate_primeira_tela_s']:6.2f}s")
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mede a partida e a primeira renderização do painel.")
+    parser.add_argument("--modos", nargs="+", choices=list(MODOS), default=list(MODOS))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="Arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    resultados = [medir_modo(modo, args.repeticoes) for modo in args.modos]
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultados, arquivo, indent=2, ensure_ascii=False)
@@ -0,0 +1,437 @@
+"""Pacote estático: as figuras de todas as seleções do painel, pré-calculadas.
+
+O espaço de seleções é pequeno e enumerável: subconjuntos não vazios dos
+estados x subconjuntos não vazios dos anos, com o ano inteiro (nada marcado
+equivale a tudo marcado, que já está na lista). Para cada combinação o build
+monta, em processos paralelos, as figuras que o painel mostraria:
+
+- grupo "recorte" (só as células do cubo e a população): o mapa em cada
+  métrica, pizza e barras por estado e, para cada fator climático, a
+  dispersão e a evolução climática;
+- grupo "series" (também as séries inteiras dos estados e os modelos de
+  previsão): a evolução de casos em cada horizonte e a comparação
+  normalizada em cada fator e componente.
+
+As figuras que não dependem da seleção formam dois grupos globais:
+"correlacao" (cada estado e método) e "agrupamentos" (radar, pizza e meses
+de cada k pronto, e o cotovelo). Cada figura é gravada como o JSON do Plotly
+em `artefatos/pacote/figuras/`, e o `manifesto.json` leva a chave de cada
+figura (tipo + seleção, como no cache de figuras do painel) ao arquivo.
+
+Cada grupo guarda a impressão digital das suas entradas (células, população,
+séries, modelos, geometria e o código do pacote `painel`). Um novo build só refaz
+os grupos cuja impressão mudou: anexar um ano novo refaz as combinações
+com esse ano e as séries, mas não os recortes dos anos antigos.
+
+    python -m painel.pacote --workers 4
+
+O painel serve a figura direto do arquivo quando o manifesto é da versão
+atual dos dados; um servidor de arquivos estáticos pode fazer o mesmo com
+`chave_figura`, servindo a pasta do pacote inteira: a geometria do mapa é
+copiada para `geometria/` dentro dela e as figuras do mapa a referenciam
+por um caminho relativo ao manifesto (o painel troca pela URL de `static/`). Recortes de meses ficam fora do pacote e são calculados na
+hora.
+"""
+import argparse
+import glob
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import plotly.io as pio
+
+from painel import calculos, figuras
+from painel.cache_compartilhado import normalizar_selecao
+from painel.config import DIRETORIO_RAIZ, caminho_artefato, temporario_ao_lado
+
+# Incrementar quando a lista de figuras ou o formato do manifesto mudar
+VERSAO_PACOTE = 2
+
+# Acima disso o pacote não compensa (2^estados x 2^anos cresce rápido demais)
+MAX_COMBINACOES = 4096
+
+GRUPOS_SELECAO = ("recorte", "series")
+GRUPOS_GLOBAIS = ("correlacao", "agrupamentos")
+METODOS_CORRELACAO = ("Spearman", "Pearson")
+
+# Código que entra na impressão digital de todos os grupos, com as versões do
+# Streamlit e do Plotly: o pacote `painel` inteiro, porque as figuras dependem
+# também de cubo, sazonalidade, previsão, população, correlação e geometria
+_DIRETORIO_PAINEL = os.path.join(DIRETORIO_RAIZ, "painel")
+
+
+def caminho_manifesto():
+    return caminho_artefato("pacote", "manifesto.json")
+
+
+def chave_figura(tipo, selecao):
+    """Chave de uma figura no manifesto: tipo + seleção normalizada, sem a versão dos dados."""
+    selecao = {nome: valor for nome, valor in selecao.items() if nome != "versao"}
+    return json.dumps([tipo, normalizar_selecao(selecao)], ensure_ascii=False)
+
+
+def _arquivo_figura(chave):
+    return os.path.join("figuras", hashlib.sha1(chave.encode()).hexdigest()[:20] + ".json")
+
+
+def nao_vazios(itens):
+    """Todos os subconjuntos não vazios de `itens`, na ordem original."""
+    itens = list(itens)
+    return [list(combinacao) for n in range(1, len(itens) + 1)
+            for combinacao in itertools.combinations(itens, n)]
+
+
+def combinacoes(estados, anos):
+    """(nome, grupo, seleção) de cada grupo do pacote."""
+    n_combinacoes = (2 ** len(estados) - 1) * (2 ** len(anos) - 1)
+    if n_combinacoes > MAX_COMBINACOES:
+        raise ValueError(f"{n_combinacoes} combinações de estados e anos; o pacote vai até {MAX_COMBINACOES}")
+    tarefas = [(grupo, grupo, None) for grupo in GRUPOS_GLOBAIS]
+    for estados_selecao in nao_vazios(estados):
+        for anos_selecao in nao_vazios(anos):
+            selecao = {"estados": estados_selecao, "anos": anos_selecao, "meses": (1, 12)}
+            nome = f"estados={'+'.join(estados_selecao)}|anos={'+'.join(map(str, anos_selecao))}"
+            tarefas += [(f"{nome}|{grupo}", grupo, selecao) for grupo in GRUPOS_SELECAO]
+    return tarefas
+
+
+# ------------------------------------------------------------------------------
+# Entradas de cada grupo
+
+def carregar_contexto(versao, url_geometria):
+    """Artefatos de que as figuras dependem, carregados como no painel.
+
+    A URL da geometria (relativa ao manifesto) é resolvida uma vez pelo
+    processo principal: se o artefato faltasse, cada trabalhador tentaria
+    baixá-lo ao mesmo tempo.
+    """
+    from painel import cubo, dados, populacao, previsao, sazonalidade
+
+    cubo_dados = cubo.carregar_ou_construir(versao, dados.carregar_dados)
+    camada = sazonalidade.carregar_ou_construir(versao, cubo_dados)
+    return {
+        "versao": versao,
+        "cubo": cubo_dados,
+        "populacao": populacao.carregar_populacao(),
+        "camada": camada,
+        "previsoes": previsao.carregar_ou_ajustar(camada, chave_dados=versao, max_workers=1),
+        "url_geometria": url_geometria,
+    }
+
+
+def publicar_geometria(diretorio):
+    """Copia a geometria do mapa para o pacote; devolve o caminho relativo ao manifesto.
+
+    Devolve None se a geometria não puder ser gerada (o pacote fica sem mapa).
+    """
+    from painel import geometria
+
+    if geometria.url_geometria("brasil") is None:
+        return None
+    origem = geometria.caminho_geometria("brasil")
+    destino = os.path.join(diretorio, "geometria", os.path.basename(origem))
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = temporario_ao_lado(destino)
+    shutil.copyfile(origem, temporario)
+    os.replace(temporario, destino)
+    # URL relativa, com "/" em qualquer sistema
+    return f"geometria/{os.path.basename(origem)}"
+
+
+def _digerir(*partes):
+    import joblib
+
+    return joblib.hash(partes)
+
+
+def _digerir_tabela(tabela):
+    """Digest dos valores de uma tabela (o pickle depende da disposição interna dos blocos)."""
+    return _digerir(list(tabela.columns), pd.util.hash_pandas_object(tabela).to_numpy())
+
+
+def impressoes_digitais(contexto, tarefas):
+    """Impressão digital das entradas de cada grupo, a partir de digests por estado e ano."""
+    import plotly
+    import streamlit
+
+    from painel import clusterizacao
+
+    # O tema das figuras vem do Streamlit e o formato do JSON, do Plotly
+    codigo = hashlib.sha1(f"{VERSAO_PACOTE} {streamlit.__version__} {plotly.__version__}".encode())
+    for modulo in sorted(glob.glob(os.path.join(_DIRETORIO_PAINEL, "*.py"))):
+        codigo.update(os.path.basename(modulo).encode())
+        with open(modulo, "rb") as arquivo:
+            codigo.update(arquivo.read())
+    codigo = codigo.hexdigest()
+
+    tabela = contexto["cubo"]["estado_ano_mes"]["tabela"]
+    celulas = {chave: _digerir_tabela(grupo) for chave, grupo in tabela.groupby(level=["ESTADO", "ANO_IS"])}
+    populacao = contexto["populacao"]
+    camada, previsoes = contexto["camada"], contexto["previsoes"]
+    series = {
+        estado: _digerir(camada["periodos"], camada["somas"][linha], camada["contagens"][linha],
+                         previsoes["modelos"].get(estado))
+        for linha, estado in enumerate(camada["estados"][:-1])
+    }
+    geral = {
+        "correlacao": _digerir(codigo, _digerir_tabela(tabela)),
+        "agrupamentos": _digerir(codigo, contexto["versao"], clusterizacao.VERSAO_MODELO,
+                                 _valores_k(contexto["versao"])),
+    }
+
+    impressoes = {}
+    for nome, grupo, selecao in tarefas:
+        if selecao is None:
+            impressoes[nome] = geral[grupo]
+            continue
+        pares = [(estado, ano) for estado in selecao["estados"] for ano in selecao["anos"]]
+        partes = [codigo, [celulas.get(par) for par in pares]]
+        if grupo == "recorte":
+            partes += [populacao.reindex(pares).tolist(), contexto["url_geometria"]]
+        else:
+            partes += [[series.get(estado) for estado in selecao["estados"]],
+                       previsoes["hiperparametros"], previsoes["treinado_ate"]]
+        impressoes[nome] = _digerir(*partes)
+    return impressoes
+
+
+def _valores_k(versao):
+    """k padrão e os da varredura salva (como no seletor do painel)."""
+    from painel import clusterizacao
+
+    try:
+        varredura = clusterizacao.carregar_varredura(versao)
+    except FileNotFoundError:
+        return [clusterizacao.HIPERPARAMETROS_PADRAO["n_clusters"]]
+    return sorted(int(k) for k in clusterizacao.resumir_varredura(varredura).index)
+
+
+# ------------------------------------------------------------------------------
+# Figuras de cada grupo: (tipo, seleção da chave, figura), como no final1.py
+
+def figuras_recorte(contexto, selecao):
+    fatias = calculos.filtrar(contexto["cubo"], selecao["estados"], selecao["anos"], *selecao["meses"])
+    df_filtrado = calculos.tabela_filtrada(fatias, contexto["populacao"])
+    df_metricas = calculos.metricas_por_estado(fatias, contexto["populacao"])
+    df_estados = calculos.casos_por_estado(fatias)
+    # Sem geometria o painel não desenha o mapa; o build segue sem ele
+    for metrica in calculos.METRICAS_MAPA if contexto["url_geometria"] is not None else ():
+        yield ("mapa", {**selecao, "metrica": metrica},
+               figuras.mapa_metrica(df_metricas, metrica, contexto["url_geometria"]))
+    yield "pizza_estados", selecao, figuras.pizza_estados(df_estados)
+    yield "barras_estados", selecao, figuras.barras_estados(df_estados)
+    for variavel, coluna in calculos.OPCOES_CLIMATICAS.items():
+        com_variavel = {**selecao, "variavel": variavel}
+        yield "dispersao", com_variavel, figuras.dispersao_clima(df_filtrado, variavel)
+        df_climatico = calculos.agregar_mensal(fatias, somas=(), medias=(coluna,))
+        yield "evolucao_climatica", com_variavel, figuras.evolucao_climatica(df_climatico, variavel)
+
+
+def figuras_series(contexto, selecao):
+    from painel import previsao
+
+    fatias = calculos.filtrar(contexto["cubo"], selecao["estados"], selecao["anos"], *selecao["meses"])
+    df_mensal = calculos.agregar_mensal(fatias)
+    for horizonte in range(1, previsao.HIPERPARAMETROS_PADRAO["horizonte"] + 1):
+        df_previsao = calculos.previsao_mensal(contexto["previsoes"], contexto["camada"],
+                                               selecao["estados"], horizonte, *selecao["meses"])
+        yield ("evolucao_casos", {**selecao, "horizonte": horizonte},
+               figuras.evolucao_casos(df_mensal, df_previsao))
+    for variavel, coluna in calculos.OPCOES_CLIMATICAS.items():
+        for componente, chave_componente in calculos.COMPONENTES_COMPARACAO.items():
+            df_long = calculos.comparacao_sazonal(contexto["camada"], coluna, selecao["estados"],
+                                                  selecao["anos"], *selecao["meses"],
+                                                  componente=chave_componente)
+            yield ("evolucao_normalizada", {**selecao, "variavel": variavel, "componente": componente},
+                   figuras.comparacao_normalizada(df_long, variavel, componente))
+
+
+def figuras_correlacao(contexto, selecao=None):
+    from painel.correlacao import TODOS
+
+    correlacoes = calculos.correlacoes_defasadas(contexto["cubo"])
+    for estado in [TODOS, *contexto["cubo"]["estados"]]:
+        for metodo in METODOS_CORRELACAO:
+            yield ("correlacao_defasada", {"estado": estado, "metodo": metodo},
+                   figuras.correlacao_defasada(correlacoes, estado, metodo.lower()))
+
+
+def figuras_agrupamentos(contexto, selecao=None):
+    from painel import clusterizacao, dados
+
+    versao = contexto["versao"]
+    df = dados.carregar_dados()
+    try:
+        varredura = clusterizacao.carregar_varredura(versao)
+    except FileNotFoundError:
+        varredura = None
+    else:
+        yield "cotovelo", {}, figuras.cotovelo(clusterizacao.resumir_varredura(varredura))
+
+    k_padrao = clusterizacao.HIPERPARAMETROS_PADRAO["n_clusters"]
+    for k in _valores_k(versao):
+        if k == k_padrao:
+            resultado = clusterizacao.carregar_ou_ajustar(df, chave_dados=versao)
+        else:
+            resultado = clusterizacao.resultado_da_varredura(df, varredura, k)
+        chave = {"k": resultado["hiperparametros"]["n_clusters"]}
+        yield "radar", chave, figuras.radar_agrupamentos(resultado)
+        yield ("pizza_agrupamentos", chave,
+               figuras.pizza_agrupamentos(calculos.casos_por_agrupamento(resultado)))
+        yield "meses_agrupamentos", chave, figuras.meses_agrupamentos(resultado["contagem"])
+
+
+MONTAGENS = {
+    "recorte": figuras_recorte,
+    "series": figuras_series,
+    "correlacao": figuras_correlacao,
+    "agrupamentos": figuras_agrupamentos,
+}
+
+
+# ------------------------------------------------------------------------------
+# Build
+
+_contexto = None
+
+
+def _usar_tema_streamlit():
+    """Deixa o template "streamlit" como padrão do Plotly, como no processo do painel.
+
+    Importar o `streamlit` registra e ativa o template; o módulo interno que
+    faz isso já mudou de lugar entre versões, por isso não é importado direto.
+    Sem o template, as figuras saem com o tema padrão do Plotly.
+    """
+    import warnings
+
+    import streamlit  # noqa: F401
+
+    if "streamlit" in pio.templates:
+        pio.templates.default = "streamlit"
+    else:
+        warnings.warn("Template 'streamlit' do Plotly não encontrado; figuras com o tema padrão")
+
+
+def _iniciar_trabalhador(versao, url_geometria):
+    global _contexto
+    _usar_tema_streamlit()
+    _contexto = carregar_contexto(versao, url_geometria)
+
+
+def _montar_grupo(grupo, selecao, diretorio):
+    """Grava as figuras de um grupo e devolve {chave: arquivo relativo}."""
+    arquivos = {}
+    for tipo, selecao_figura, figura in MONTAGENS[grupo](_contexto, selecao):
+        chave = chave_figura(tipo, selecao_figura)
+        arquivo = _arquivo_figura(chave)
+        caminho = os.path.join(diretorio, arquivo)
+        temporario = temporario_ao_lado(caminho)
+        with open(temporario, "w", encoding="utf-8") as saida:
+            saida.write(pio.to_json(figura, validate=False))
+        os.replace(temporario, caminho)
+        arquivos[chave] = arquivo
+    return arquivos
+
+
+def carregar_manifesto(versao=None):
+    """Manifesto do pacote (None se não existir ou, com `versao`, se for de outra versão dos dados)."""
+    caminho = caminho_manifesto()
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding="utf-8") as arquivo:
+        manifesto = json.load(arquivo)
+    if manifesto.get("versao_pacote") != VERSAO_PACOTE or (versao and manifesto["versao"] != versao):
+        return None
+    return manifesto
+
+
+def ler_figura(manifesto, tipo, selecao):
+    """JSON da figura no pacote, ou None se a seleção não estiver nele."""
+    if manifesto is None:
+        return None
+    arquivo = manifesto["figuras"].get(chave_figura(tipo, selecao))
+    if arquivo is None:
+        return None
+    try:
+        with open(os.path.join(os.path.dirname(caminho_manifesto()), arquivo), encoding="utf-8") as entrada:
+            return entrada.read()
+    except FileNotFoundError:
+        return None
+
+
+def construir(versao, max_workers=None, completo=False, relatorio=print):
+    """Monta (ou atualiza) o pacote da `versao` dos dados e grava o manifesto.
+
+    Só os grupos cuja impressão digital mudou desde o último build são
+    refeitos, a menos que `completo`. Com `max_workers=1` tudo roda neste
+    processo, em sequência.
+    """
+    diretorio = os.path.dirname(caminho_manifesto())
+    os.makedirs(os.path.join(diretorio, "figuras"), exist_ok=True)
+    contexto = carregar_contexto(versao, publicar_geometria(diretorio))
+    tarefas = combinacoes(contexto["cubo"]["estados"], contexto["cubo"]["anos"])
+    impressoes = impressoes_digitais(contexto, tarefas)
+    anterior = None if completo else carregar_manifesto()
+    grupos_anteriores = anterior["grupos"] if anterior else {}
+
+    grupos, pendentes = {}, []
+    for nome, grupo, selecao in tarefas:
+        antigo = grupos_anteriores.get(nome)
+        if antigo and antigo["entradas"] == impressoes[nome] and all(
+                os.path.exists(os.path.join(diretorio, arquivo)) for arquivo in antigo["figuras"].values()):
+            grupos[nome] = antigo
+        else:
+            pendentes.append((nome, grupo, selecao))
+    relatorio(f"{len(tarefas)} grupos, {len(pendentes)} a refazer")
+
+    if pendentes:
+        if max_workers == 1:
+            _iniciar_trabalhador(versao, contexto["url_geometria"])
+            feitos = [_montar_grupo(grupo, selecao, diretorio) for _, grupo, selecao in pendentes]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_iniciar_trabalhador,
+                                     initargs=(versao, contexto["url_geometria"])) as pool:
+                futuros = [pool.submit(_montar_grupo, grupo, selecao, diretorio)
+                           for _, grupo, selecao in pendentes]
+                feitos = [futuro.result() for futuro in futuros]
+        for (nome, _, _), arquivos in zip(pendentes, feitos):
+            grupos[nome] = {"entradas": impressoes[nome], "figuras": arquivos}
+
+    manifesto = {
+        "versao_pacote": VERSAO_PACOTE,
+        "versao": versao,
+        "geometria": contexto["url_geometria"],
+        "grupos": grupos,
+        "figuras": {chave: arquivo for grupo in grupos.values() for chave, arquivo in grupo["figuras"].items()},
+    }
+    temporario = temporario_ao_lado(caminho_manifesto())
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho_manifesto())
+
+    # Figuras de combinações que deixaram de existir
+    usados = set(manifesto["figuras"].values())
+    for nome in os.listdir(os.path.join(diretorio, "figuras")):
+        if os.path.join("figuras", nome) not in usados:
+            os.remove(os.path.join(diretorio, "figuras", nome))
+    return manifesto, len(pendentes)
+
+
+if __name__ == "__main__":
+    from painel import dados
+
+    parser = argparse.ArgumentParser(description="Pré-calcula as figuras de todas as seleções do painel.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processos paralelos (padrão: um por CPU; 1 roda neste processo)")
+    parser.add_argument("--completo", action="store_true", help="Refaz todos os grupos")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    manifesto, refeitos = construir(dados.versao_dados(), args.workers, args.completo)
+    print(f"{len(manifesto['figuras'])} figuras ({refeitos} grupos refeitos) em "
+          f"{time.perf_counter() - inicio:.1f}s: {caminho_manifesto()}")
@@ -0,0 +1,64 @@
+"""Tabela de população por estado e ano (fonte: IBGE).
+
+Os dados ficam em `populacao_estados.csv` (colunas ESTADO, ANO_IS, POPULACAO),
+que pode ser estendido com outros estados e anos sem mudar o código. A
+população é anexada ao dataset por busca indexada em (estado, ano), sem laço
+em Python por linha.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from painel.config import DIRETORIO_RAIZ
+
+# Pode ser trocado pela variável de ambiente PAINEL_POPULACAO
+CAMINHO_POPULACAO = os.environ.get(
+    "PAINEL_POPULACAO", os.path.join(DIRETORIO_RAIZ, "populacao_estados.csv")
+)
+
+
+def carregar_populacao(caminho=CAMINHO_POPULACAO):
+    """Série de população indexada por (ESTADO, ANO_IS), ordenada."""
+    tabela = pd.read_csv(caminho, dtype={"ESTADO": "string", "ANO_IS": "int16", "POPULACAO": "int64"})
+    populacao = tabela.set_index(["ESTADO", "ANO_IS"])["POPULACAO"].sort_index()
+    if not populacao.index.is_unique:
+        raise ValueError(f"Pares (ESTADO, ANO_IS) repetidos em {caminho}")
+    return populacao
+
+
+def grade_populacao(populacao, ano_min, ano_max):
+    """Tabela estado x ano cobrindo [ano_min, ano_max].
+
+    Anos sem estimativa usam o ano mais próximo disponível do mesmo estado;
+    no empate, o anterior.
+    """
+    anos_tabela = populacao.index.get_level_values("ANO_IS")
+    anos = range(min(ano_min, anos_tabela.min()), max(ano_max, anos_tabela.max()) + 1)
+    grade = populacao.unstack("ANO_IS").reindex(columns=anos)
+
+    # Ano da estimativa anterior e da seguinte de cada célula (NaN se não houver)
+    colunas = np.asarray(anos, dtype="float64")
+    ano_estimado = pd.DataFrame(np.where(grade.notna(), colunas, np.nan),
+                                index=grade.index, columns=grade.columns)
+    distancia_anterior = colunas - ano_estimado.ffill(axis=1).to_numpy()
+    distancia_seguinte = ano_estimado.bfill(axis=1).to_numpy() - colunas
+    usar_seguinte = np.isnan(distancia_anterior) | (distancia_seguinte < distancia_anterior)
+    return grade.ffill(axis=1).where(~usar_seguinte, grade.bfill(axis=1))
+
+
+def populacao_por_linha(df, populacao):
+    """População de cada linha de `df` (colunas ESTADO e ANO_IS), como array.
+
+    Estados ausentes da tabela recebem NaN.
+    """
+    anos = df["ANO_IS"].to_numpy()
+    if len(anos) == 0:
+        return anos.astype("float64")
+    grade = grade_populacao(populacao, int(anos.min()), int(anos.max()))
+    linhas = grade.index.get_indexer(df["ESTADO"].astype(str))
+    colunas = anos - grade.columns[0]
+    valores = grade.to_numpy(dtype="float64")
+    resultado = valores[linhas, colunas]
+    resultado[linhas < 0] = float("nan")
+    return resultado
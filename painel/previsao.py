@@ -0,0 +1,327 @@
+"""Previsão dos casos dos próximos meses por estado, a partir do clima defasado.
+
+Um modelo por estado e por horizonte (previsão direta de 1 a 6 meses à
+frente): uma regressão ridge de log(1 + casos) do mês alvo sobre o que já se
+sabe no mês de origem t:
+
+- cada variável climática em t, t-1 e t-2 (o clima de h a h+2 meses antes
+  do alvo, no horizonte h);
+- log(1 + casos) em t e t-1;
+- seno e cosseno do mês alvo.
+
+As séries vêm da camada de sazonalidade (`painel.sazonalidade`). O intervalo
+de previsão sai dos resíduos deixando-um-de-fora de cada modelo (fórmula
+fechada da ridge, sem reajustar): os quantis desses resíduos somados à
+previsão na escala log.
+
+Os estados são ajustados em paralelo num pool de processos e os modelos são
+salvos em `artefatos/modelos/` com uma chave formada pela versão dos dados e
+pelos hiperparâmetros. Servir uma previsão só monta as features do último mês
+e aplica os coeficientes. Quando meses novos são anexados
+(`python -m painel.incremental`), os modelos são mantidos: a origem da
+previsão avança e as previsões feitas para os meses novos são pontuadas
+contra o observado (`pontuar`), sem reajuste. Para reajustar:
+
+    python -m painel.previsao --workers 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from painel.config import caminho_artefato, temporario_ao_lado
+
+# Incrementar quando as features ou o formato salvo mudarem
+VERSAO_MODELO = 1
+
+HIPERPARAMETROS_PADRAO = {
+    "horizonte": 6,
+    "variaveis": ["PRECIPITACAO", "TEMPERATURA", "UMIDADE"],
+    "defasagens_clima": 3,
+    "defasagens_casos": 2,
+    "alphas": [0.1, 1.0, 10.0, 100.0, 1000.0],
+    # Menos meses de treino que isso e o estado fica sem modelo no horizonte
+    "minimo_amostras": 8,
+}
+
+# Cobertura do intervalo de previsão
+NIVEL_INTERVALO = 0.8
+
+
+def chave_previsao(chave_dados, hiperparametros):
+    """Chave do artefato: dados + hiperparâmetros + versão do formato."""
+    h = hashlib.sha256()
+    h.update(chave_dados.encode())
+    h.update(json.dumps(hiperparametros, sort_keys=True).encode())
+    h.update(str(VERSAO_MODELO).encode())
+    return h.hexdigest()[:16]
+
+
+def _defasar(valores, defasagem):
+    """Série deslocada `defasagem` meses para frente no último eixo (NaN no começo)."""
+    if defasagem == 0:
+        return valores
+    deslocada = np.full(valores.shape, np.nan)
+    deslocada[..., defasagem:] = valores[..., :-defasagem]
+    return deslocada
+
+
+def montar_features(casos, clima, periodos, horizonte, hiperparametros):
+    """Features de cada mês de origem t (linhas) para prever o mês t + `horizonte`.
+
+    `casos` tem forma (meses,) e `clima` (variáveis, meses), no eixo `periodos`.
+    """
+    log_casos = np.log1p(casos)
+    colunas = []
+    for defasagem in range(hiperparametros["defasagens_clima"]):
+        colunas.extend(_defasar(clima, defasagem))
+    for defasagem in range(hiperparametros["defasagens_casos"]):
+        colunas.append(_defasar(log_casos, defasagem))
+    angulo = 2 * np.pi * ((periodos + horizonte) % 12) / 12
+    colunas.extend([np.sin(angulo), np.cos(angulo)])
+    return np.column_stack(colunas)
+
+
+def _ajustar_horizonte(X, y, alphas):
+    """Ridge sobre as features padronizadas e os resíduos deixando-um-de-fora."""
+    from sklearn.linear_model import RidgeCV
+
+    media = X.mean(axis=0)
+    escala = X.std(axis=0)
+    escala[escala == 0] = 1.0
+    Xp = (X - media) / escala
+    ridge = RidgeCV(alphas=alphas).fit(Xp, y)
+
+    # Alavancas da ridge com intercepto (colunas já centradas): 1/n + x (X'X + aI)^-1 x'
+    sistema = Xp.T @ Xp + ridge.alpha_ * np.eye(Xp.shape[1])
+    alavancas = 1 / len(y) + np.einsum("ij,ji->i", Xp, np.linalg.solve(sistema, Xp.T))
+    return {
+        "media": media,
+        "escala": escala,
+        "coeficientes": ridge.coef_,
+        "intercepto": float(ridge.intercept_),
+        "alpha": float(ridge.alpha_),
+        "residuos": (y - ridge.predict(Xp)) / (1 - alavancas),
+        "amostras": len(y),
+    }
+
+
+def _ajustar_estado(casos, clima, periodos, hiperparametros):
+    """Modelos de todos os horizontes de um estado (roda num worker)."""
+    log_casos = np.log1p(casos)
+    modelos = {}
+    for horizonte in range(1, hiperparametros["horizonte"] + 1):
+        X = montar_features(casos, clima, periodos, horizonte, hiperparametros)[:-horizonte]
+        y = log_casos[horizonte:]
+        validas = np.isfinite(X).all(axis=1) & np.isfinite(y)
+        if validas.sum() < hiperparametros["minimo_amostras"]:
+            continue
+        modelos[horizonte] = _ajustar_horizonte(X[validas], y[validas], hiperparametros["alphas"])
+    return modelos
+
+
+def _series_estado(camada, estado, variaveis):
+    linha = camada["estados"].index(estado)
+    casos = camada["observado"][linha, camada["variaveis"].index("Casos_Total")]
+    clima = camada["observado"][linha, [camada["variaveis"].index(v) for v in variaveis]]
+    return casos, clima
+
+
+def ajustar(camada, hiperparametros=None, max_workers=None):
+    """Ajusta os modelos de todos os estados da camada, um estado por tarefa do pool.
+
+    Com `max_workers=1` os estados são ajustados neste processo, em sequência.
+    """
+    hiperparametros = {**HIPERPARAMETROS_PADRAO, **(hiperparametros or {})}
+    estados = camada["estados"][:-1]
+    periodos = camada["periodos"]
+    tarefas = [(*_series_estado(camada, estado, hiperparametros["variaveis"]), periodos, hiperparametros)
+               for estado in estados]
+
+    if max_workers == 1:
+        ajustes = [_ajustar_estado(*tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futuros = [pool.submit(_ajustar_estado, *tarefa) for tarefa in tarefas]
+            ajustes = [futuro.result() for futuro in futuros]
+
+    return {
+        "hiperparametros": hiperparametros,
+        "modelos": dict(zip(estados, ajustes)),
+        # Meses depois deste foram vistos só depois do ajuste e entram no placar
+        "treinado_ate": int(periodos[-1]) if len(periodos) else None,
+        "pontuado_ate": int(periodos[-1]) if len(periodos) else None,
+        "placar": pd.DataFrame(columns=["ESTADO", "origem", "horizonte", "previsto",
+                                        "inferior", "superior", "observado"]),
+    }
+
+
+def _aplicar(modelo, x, nivel):
+    """Previsão pontual e limites do intervalo, em casos, para as linhas de `x`."""
+    log_previsto = modelo["intercepto"] + ((x - modelo["media"]) / modelo["escala"]) @ modelo["coeficientes"]
+    quantis = np.quantile(modelo["residuos"], [(1 - nivel) / 2, (1 + nivel) / 2])
+    previsto = np.expm1(log_previsto).clip(min=0)
+    inferior = np.expm1(log_previsto + quantis[0]).clip(min=0)
+    superior = np.expm1(log_previsto + quantis[1]).clip(min=0)
+    return previsto, inferior, superior
+
+
+def prever_estados(resultado, camada, estados=None, nivel=NIVEL_INTERVALO):
+    """Previsão de cada estado a partir do último mês com as features completas.
+
+    Nenhum modelo é reajustado. Devolve uma linha por (estado, horizonte) com
+    o mês alvo, a previsão e os limites do intervalo.
+    """
+    hiperparametros = resultado["hiperparametros"]
+    periodos = camada["periodos"]
+    linhas = []
+    for estado in estados or list(resultado["modelos"]):
+        modelos = resultado["modelos"].get(estado, {})
+        if estado not in camada["estados"] or not modelos:
+            continue
+        casos, clima = _series_estado(camada, estado, hiperparametros["variaveis"])
+        for horizonte, modelo in modelos.items():
+            X = montar_features(casos, clima, periodos, horizonte, hiperparametros)
+            completas = np.flatnonzero(np.isfinite(X).all(axis=1))
+            if not len(completas):
+                continue
+            origem = completas[-1]
+            previsto, inferior, superior = _aplicar(modelo, X[origem:origem + 1], nivel)
+            alvo = int(periodos[origem]) + horizonte
+            linhas.append({"ESTADO": estado, "horizonte": horizonte,
+                           "ANO_IS": alvo // 12, "MES_IS": alvo % 12 + 1,
+                           "previsto": previsto[0], "inferior": inferior[0], "superior": superior[0]})
+    return pd.DataFrame(linhas, columns=["ESTADO", "horizonte", "ANO_IS", "MES_IS",
+                                         "previsto", "inferior", "superior"])
+
+
+def prever(resultado, camada, estados, horizonte=None, nivel=NIVEL_INTERVALO):
+    """Previsão mensal dos `estados` somados, até `horizonte` meses à frente.
+
+    Previsões e limites são somados entre os estados (os limites somados
+    supõem erros que andam juntos, então o intervalo da soma é conservador).
+    """
+    por_estado = prever_estados(resultado, camada, estados, nivel)
+    if horizonte is not None:
+        por_estado = por_estado[por_estado["horizonte"] <= horizonte]
+    return (por_estado.groupby(["ANO_IS", "MES_IS"], as_index=False)
+            [["previsto", "inferior", "superior"]].sum())
+
+
+def pontuar(resultado, camada, nivel=NIVEL_INTERVALO):
+    """Pontua as previsões para os meses da camada posteriores ao último pontuado.
+
+    Para cada estado e horizonte h, cada mês novo é previsto a partir do mês
+    h antes dele, com os modelos já ajustados, e comparado ao observado. Só
+    os meses novos são calculados; as linhas se somam ao placar salvo.
+    Devolve um novo resultado com o placar estendido.
+    """
+    hiperparametros = resultado["hiperparametros"]
+    periodos = camada["periodos"]
+    novos = periodos > resultado["pontuado_ate"]
+    if not novos.any():
+        return resultado
+
+    linhas = []
+    for estado, modelos in resultado["modelos"].items():
+        if estado not in camada["estados"]:
+            continue
+        casos, clima = _series_estado(camada, estado, hiperparametros["variaveis"])
+        for horizonte, modelo in modelos.items():
+            X = montar_features(casos, clima, periodos, horizonte, hiperparametros)
+            origens = np.flatnonzero(novos) - horizonte
+            origens = origens[origens >= 0]
+            origens = origens[np.isfinite(X[origens]).all(axis=1) & np.isfinite(casos[origens + horizonte])]
+            if not len(origens):
+                continue
+            previsto, inferior, superior = _aplicar(modelo, X[origens], nivel)
+            linhas.append(pd.DataFrame({
+                "ESTADO": estado, "origem": periodos[origens], "horizonte": horizonte,
+                "previsto": previsto, "inferior": inferior, "superior": superior,
+                "observado": casos[origens + horizonte],
+            }))
+
+    partes = [parte for parte in (resultado["placar"], *linhas) if len(parte)]
+    placar = pd.concat(partes, ignore_index=True) if partes else resultado["placar"]
+    return {**resultado, "placar": placar, "pontuado_ate": int(periodos[-1])}
+
+
+def resumir_placar(placar):
+    """Erro absoluto médio e cobertura do intervalo por horizonte."""
+    placar = placar.assign(
+        erro_absoluto=(placar["previsto"] - placar["observado"]).abs(),
+        coberto=(placar["observado"] >= placar["inferior"]) & (placar["observado"] <= placar["superior"]),
+    )
+    return placar.groupby("horizonte").agg(
+        previsoes=("erro_absoluto", "size"),
+        erro_absoluto_medio=("erro_absoluto", "mean"),
+        cobertura=("coberto", "mean"),
+    )
+
+
+def resumir_validacao(resultado):
+    """Mediana entre os estados de amostras, alpha e erro deixando-um-de-fora (escala log), por horizonte."""
+    linhas = [
+        {"ESTADO": estado, "horizonte": horizonte, "alpha": modelo["alpha"],
+         "amostras": modelo["amostras"],
+         "erro_log_medio": float(np.abs(modelo["residuos"]).mean())}
+        for estado, modelos in resultado["modelos"].items()
+        for horizonte, modelo in modelos.items()
+    ]
+    return pd.DataFrame(linhas).groupby("horizonte")[["amostras", "alpha", "erro_log_medio"]].median()
+
+
+def caminho_previsao(chave):
+    return caminho_artefato("modelos", f"previsao_{chave}.joblib")
+
+
+def salvar_resultado(resultado, chave_dados):
+    import joblib
+
+    caminho = caminho_previsao(chave_previsao(chave_dados, resultado["hiperparametros"]))
+    temporario = temporario_ao_lado(caminho)
+    joblib.dump(resultado, temporario)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def carregar_ou_ajustar(camada, hiperparametros=None, chave_dados=None, max_workers=None):
+    """Modelos salvos para (dados, hiperparâmetros) ou um ajuste novo, salvo em seguida.
+
+    `chave_dados` identifica os dados da camada (ex.: `dados.versao_dados()`);
+    sem ela é usado o hash das séries da camada.
+    """
+    import joblib
+
+    hiperparametros = {**HIPERPARAMETROS_PADRAO, **(hiperparametros or {})}
+    chave_dados = chave_dados or hashlib.sha256(camada["observado"].tobytes()).hexdigest()
+    caminho = caminho_previsao(chave_previsao(chave_dados, hiperparametros))
+    if os.path.exists(caminho):
+        return joblib.load(caminho)
+
+    resultado = ajustar(camada, hiperparametros, max_workers)
+    salvar_resultado(resultado, chave_dados)
+    return resultado
+
+
+if __name__ == "__main__":
+    from painel import cubo, dados, sazonalidade
+
+    parser = argparse.ArgumentParser(description="Ajusta os modelos de previsão de casos por estado.")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    versao = dados.versao_dados()
+    cubo_dados = cubo.carregar_ou_construir(versao, dados.carregar_dados)
+    camada = sazonalidade.carregar_ou_construir(versao, cubo_dados)
+    inicio = time.perf_counter()
+    resultado = ajustar(camada, max_workers=args.workers)
+    duracao = time.perf_counter() - inicio
+    print(resumir_validacao(resultado).round(3).to_string())
+    print(f"{len(resultado['modelos'])} estados ajustados em {duracao:.2f}s")
+    print(salvar_resultado(resultado, versao))
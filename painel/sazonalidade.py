@@ -0,0 +1,290 @@
+"""Camada de séries temporais pré-calculada: decomposição sazonal por estado.
+
+Para cada estado, e para todos os estados somados (`cubo.TODOS`), a camada
+guarda a série mensal contínua de casos, óbitos e de cada variável climática
+num eixo de períodos (ano * 12 + mês - 1, sem buracos entre anos),
+a decomposição aditiva clássica de cada série e as estatísticas de
+normalização (mínimo, máximo, média e desvio no período inteiro):
+
+- tendência: média móvel centrada 2x12 (vazia nos seis primeiros e nos seis
+  últimos meses, e onde falta algum mês da janela);
+- sazonalidade: média da série sem tendência em cada mês do ano, centrada
+  em zero;
+- resíduo: o que sobra da série.
+
+Tudo é montado a partir dos tensores estado x variável x mês do cubo
+(`cubo.series_mensais`) e salvo em disco por versão dos dados, ao lado do
+cubo; os meses anexados por `painel.incremental` são somados à camada
+anterior por `atualizar`. O gráfico de comparação e as faixas de verão do painel saem desses
+vetores para qualquer número de anos:
+
+    python -m painel.sazonalidade --estado MG
+"""
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from painel.config import caminho_artefato, temporario_ao_lado
+from painel.cubo import TODOS, agregar_celulas, observar, series_mensais
+
+# Séries somadas entre estados; as climáticas são a média das observações
+VARIAVEIS_SOMADAS = ["Casos_Total", "Obitos_Total"]
+
+PERIODO_SAZONAL = 12
+
+# Dez, Jan e Fev
+MESES_VERAO = (12, 1, 2)
+
+COMPONENTES = ("observado", "tendencia", "sazonal", "residuo")
+
+
+def tendencia(serie, periodo=PERIODO_SAZONAL):
+    """Média móvel centrada 2 x `periodo` ao longo do último eixo."""
+    resultado = np.full(serie.shape, np.nan)
+    n_meses = serie.shape[-1]
+    if n_meses <= periodo:
+        return resultado
+    pesos = np.r_[0.5, np.ones(periodo - 1), 0.5] / periodo
+    # Janelas (views) de periodo + 1 meses; um mês ausente esvazia a janela
+    janelas = sliding_window_view(serie, periodo + 1, axis=-1)
+    resultado[..., periodo // 2:n_meses - periodo // 2] = janelas @ pesos
+    return resultado
+
+
+def decompor(serie, periodo_inicial, periodo=PERIODO_SAZONAL):
+    """Tendência, sazonalidade e resíduo aditivos de `serie` ao longo do último eixo."""
+    componente_tendencia = tendencia(serie, periodo)
+    sem_tendencia = serie - componente_tendencia
+
+    sazonal = componente_sazonal(sem_tendencia, periodo_inicial, periodo)
+    return {
+        "tendencia": componente_tendencia,
+        "sazonal": sazonal,
+        "residuo": serie - componente_tendencia - sazonal,
+    }
+
+
+def componente_sazonal(sem_tendencia, periodo_inicial, periodo=PERIODO_SAZONAL):
+    """Média da série sem tendência em cada mês do ano, centrada em zero e repetida no eixo."""
+    # Soma e contagem com uma matriz indicadora (meses x 12)
+    meses = (periodo_inicial + np.arange(sem_tendencia.shape[-1])) % periodo
+    indicadora = (meses[:, None] == np.arange(periodo)).astype("float64")
+    validos = np.isfinite(sem_tendencia)
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        medias = (np.where(validos, sem_tendencia, 0.0) @ indicadora) / (validos @ indicadora)
+        medias = medias - np.nanmean(medias, axis=-1, keepdims=True)
+    return medias[..., meses]
+
+
+def estatisticas(serie):
+    """Mínimo, máximo, média e desvio ao longo do último eixo, ignorando meses sem dados."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return {
+            "minimo": np.nanmin(serie, axis=-1),
+            "maximo": np.nanmax(serie, axis=-1),
+            "media": np.nanmean(serie, axis=-1),
+            "desvio": np.nanstd(serie, axis=-1),
+        }
+
+
+def construir(cubo_dados):
+    """Camada completa: séries, componentes, estatísticas e os meses de verão do eixo."""
+    camada = series_mensais(cubo_dados, VARIAVEIS_SOMADAS)
+    periodo_inicial = int(camada["periodos"][0]) if len(camada["periodos"]) else 0
+    observado = observar(camada["somas"], camada["contagens"], camada["acumuladas"])
+    camada.update({
+        "observado": observado,
+        **decompor(observado, periodo_inicial),
+        "estatisticas": estatisticas(observado),
+        "verao": np.isin(camada["periodos"] % 12 + 1, MESES_VERAO),
+    })
+    return camada
+
+
+def serie_selecao(camada, estados):
+    """Componentes e estatísticas (forma variáveis x meses) de um conjunto de estados.
+
+    Um estado e todos os estados saem prontos da camada (views, sem cópia);
+    outras combinações somam as séries dos estados e decompõem na hora, o
+    que custa só variáveis x meses.
+    """
+    disponiveis = camada["estados"][:-1]
+    estados = sorted(set(estados) & set(disponiveis))
+    if len(estados) == len(disponiveis):
+        linha = len(disponiveis)
+    elif len(estados) == 1:
+        linha = disponiveis.index(estados[0])
+    else:
+        linhas = [disponiveis.index(e) for e in estados]
+        observado = observar(camada["somas"][linhas].sum(axis=0),
+                             camada["contagens"][linhas].sum(axis=0), camada["acumuladas"])
+        return {
+            "observado": observado,
+            **decompor(observado, int(camada["periodos"][0])),
+            "estatisticas": estatisticas(observado),
+        }
+    return {
+        **{componente: camada[componente][linha] for componente in COMPONENTES},
+        "estatisticas": {nome: valores[linha] for nome, valores in camada["estatisticas"].items()},
+    }
+
+
+def normalizar(series, componente="observado"):
+    """Componente escalado pelas estatísticas da série observada (forma variáveis x meses).
+
+    Série e tendência vão para [0, 1] pelo mínimo e máximo da série no
+    período inteiro; sazonalidade e resíduo, que oscilam em torno de zero,
+    só são divididos pela amplitude. Série constante tem amplitude 1.
+    """
+    minimo = series["estatisticas"]["minimo"][:, None]
+    amplitude = series["estatisticas"]["maximo"][:, None] - minimo
+    amplitude = np.where(amplitude > 0, amplitude, 1.0)
+    if componente in ("observado", "tendencia"):
+        return (series[componente] - minimo) / amplitude
+    return series[componente] / amplitude
+
+
+def atualizar(camada, lote, cubo_dados):
+    """Camada com as linhas do `lote` somadas, sem reconstruí-la a partir do cubo.
+
+    As séries só mudam nos estados e meses do lote e em todos os estados
+    somados. A média móvel é recalculada só nos meses cuja janela alcança o
+    lote (numa anexação mensal, os últimos 12); sazonalidade, resíduo e
+    estatísticas dependem da série inteira e são refeitos só nas linhas
+    afetadas. Um lote com estado novo, ou anterior ao início do eixo, cai na
+    reconstrução a partir de `cubo_dados` (o cubo já atualizado).
+    """
+    celulas = agregar_celulas(lote, VARIAVEIS_SOMADAS)
+    estados = celulas.index.get_level_values("ESTADO").astype(str)
+    periodos_lote = (celulas.index.get_level_values("ANO_IS").to_numpy(dtype="int64") * 12
+                     + celulas.index.get_level_values("MES_IS").to_numpy(dtype="int64") - 1)
+    disponiveis = camada["estados"][:-1]
+    if (celulas.empty or not len(camada["periodos"]) or not set(estados) <= set(disponiveis)
+            or periodos_lote.min() < camada["periodos"][0]):
+        return construir(cubo_dados)
+
+    inicio = int(camada["periodos"][0])
+    n_meses = max(len(camada["periodos"]), int(periodos_lote.max()) - inicio + 1)
+
+    def estender(valores, preenchimento):
+        extra = n_meses - valores.shape[-1]
+        return np.pad(valores, [(0, 0)] * (valores.ndim - 1) + [(0, extra)],
+                      constant_values=preenchimento)
+
+    acumuladas = camada["acumuladas"]
+    somadas = [v for v, a in zip(camada["variaveis"], acumuladas) if a]
+    medias = [v for v, a in zip(camada["variaveis"], acumuladas) if not a]
+    celulas = celulas.reindex(columns=somadas + [f"{v}_soma" for v in medias]
+                              + [f"{v}_n" for v in medias], fill_value=0)
+    valores = celulas[somadas + [f"{v}_soma" for v in medias]].to_numpy(dtype="float64")
+    contagens_lote = np.hstack([np.zeros((len(celulas), len(somadas))),
+                                celulas[[f"{v}_n" for v in medias]].to_numpy(dtype="float64")])
+
+    # Células do lote e, em todos os estados somados, a diferença que elas causam
+    linhas = pd.Index(disponiveis).get_indexer(estados)
+    colunas = periodos_lote - inicio
+    somas, contagens = estender(camada["somas"], 0.0), estender(camada["contagens"], 0.0)
+    antes = contagens[linhas, :, colunas]
+    # Nas variáveis somadas a contagem é 1 por estado com o mês no cubo
+    depois = np.where(acumuladas, 1.0, antes + contagens_lote)
+    somas[linhas, :, colunas] += valores
+    contagens[linhas, :, colunas] = depois
+    np.add.at(somas[-1].T, colunas, valores)
+    np.add.at(contagens[-1].T, colunas, depois - antes)
+
+    afetadas = np.r_[np.unique(linhas), len(disponiveis)]
+    primeira, ultima = int(colunas.min()), int(colunas.max()) + 1
+    observado = estender(camada["observado"], np.nan)
+    observado[afetadas, :, primeira:ultima] = observar(
+        somas[afetadas, :, primeira:ultima], contagens[afetadas, :, primeira:ultima], acumuladas
+    )
+
+    meio = PERIODO_SAZONAL // 2
+    componente_tendencia = estender(camada["tendencia"], np.nan)
+    de, ate = max(primeira - meio, meio), min(ultima + meio, n_meses - meio)
+    if de < ate:
+        trecho = observado[afetadas, :, de - meio:ate + meio]
+        componente_tendencia[afetadas, :, de:ate] = tendencia(trecho)[..., meio:-meio]
+
+    # Nas linhas não afetadas a sazonalidade dos meses novos repete o mês do ano
+    periodos = inicio + np.arange(n_meses)
+    perfil = np.full(camada["sazonal"].shape[:-1] + (PERIODO_SAZONAL,), np.nan)
+    perfil[..., camada["periodos"][-PERIODO_SAZONAL:] % 12] = camada["sazonal"][..., -PERIODO_SAZONAL:]
+    sazonal = perfil[..., periodos % 12]
+    sazonal[afetadas] = componente_sazonal(observado[afetadas] - componente_tendencia[afetadas], inicio)
+
+    residuo = estender(camada["residuo"], np.nan)
+    residuo[afetadas] = observado[afetadas] - componente_tendencia[afetadas] - sazonal[afetadas]
+    resumo = {nome: valores.copy() for nome, valores in camada["estatisticas"].items()}
+    for nome, valores_afetados in estatisticas(observado[afetadas]).items():
+        resumo[nome][afetadas] = valores_afetados
+    return {
+        **camada,
+        "periodos": periodos,
+        "somas": somas,
+        "contagens": contagens,
+        "observado": observado,
+        "tendencia": componente_tendencia,
+        "sazonal": sazonal,
+        "residuo": residuo,
+        "estatisticas": resumo,
+        "verao": np.isin(periodos % 12 + 1, MESES_VERAO),
+    }
+
+
+def caminho_camada(versao):
+    return caminho_artefato("agregados", f"sazonalidade_{versao}.joblib")
+
+
+def salvar_camada(camada, versao):
+    import joblib
+
+    caminho = caminho_camada(versao)
+    temporario = temporario_ao_lado(caminho)
+    joblib.dump(camada, temporario)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def carregar_ou_construir(versao, cubo_dados):
+    """Camada salva para a `versao` dos dados ou uma nova, construída do cubo."""
+    import joblib
+
+    caminho = caminho_camada(versao)
+    if os.path.exists(caminho):
+        return joblib.load(caminho)
+    camada = construir(cubo_dados)
+    salvar_camada(camada, versao)
+    return camada
+
+
+if __name__ == "__main__":
+    from painel import cubo, dados
+
+    parser = argparse.ArgumentParser(description="Decomposição sazonal das séries mensais, por estado.")
+    parser.add_argument("--estado", default=TODOS, help="Estado exibido (padrão: todos somados)")
+    parser.add_argument("--variavel", default="Casos_Total")
+    args = parser.parse_args()
+
+    versao = dados.versao_dados()
+    cubo_dados = cubo.carregar_ou_construir(versao, dados.carregar_dados)
+    inicio = time.perf_counter()
+    camada = construir(cubo_dados)
+    forma = " x ".join(str(n) for n in camada["observado"].shape)
+    print(f"Camada ({forma}) em {1000 * (time.perf_counter() - inicio):.1f} ms")
+    carregar_ou_construir(versao, cubo_dados)
+
+    linha = camada["estados"].index(args.estado)
+    coluna = camada["variaveis"].index(args.variavel)
+    print(pd.DataFrame({
+        "ANO_IS": camada["periodos"] // 12,
+        "MES_IS": camada["periodos"] % 12 + 1,
+        **{componente: camada[componente][linha, coluna] for componente in COMPONENTES},
+    }).to_string(index=False))
@@ -0,0 +1,29 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ESTADOS = ["AC", "ES", "MG", "RJ", "SP"]
+ANOS = [2015, 2016, 2018]  # 2017 fica de fora de propósito
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    """Várias linhas por célula, com meses faltando em alguns estados."""
+    rng = np.random.default_rng(0)
+    celulas = [(e, a, m) for e, a, m in itertools.product(ESTADOS, ANOS, range(1, 13))
+               if rng.random() > 0.15]
+    repeticoes = rng.integers(1, 4, len(celulas))
+    linhas = np.repeat(np.array(celulas, dtype=object), repeticoes, axis=0)
+    n = len(linhas)
+    df = pd.DataFrame({
+        "ESTADO": pd.Categorical(linhas[:, 0]),
+        "ANO_IS": linhas[:, 1].astype("int16"),
+        "MES_IS": linhas[:, 2].astype("int8"),
+        **{col: rng.integers(0, 50, n).astype("int32") for col in ["Casos_Total", "Casos_M", "Casos_F"]},
+        **{col: rng.integers(0, 10, n).astype("int32") for col in ["Obitos_Total", "Obitos_M", "Obitos_F"]},
+        "TEMPERATURA": rng.normal(25, 3, n).astype("float32"),
+    })
+    df.loc[rng.random(n) < 0.1, "TEMPERATURA"] = np.nan
+    return df
@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from painel import benchmark
+from painel.config import DIRETORIO_RAIZ
+
+
+@pytest.fixture(scope="module")
+def memoria(tmp_path_factory):
+    # Dataset, população e artefatos vêm do ambiente e são lidos no import
+    # dos módulos do painel: a medida roda num processo novo, como no benchmark
+    temporario = tmp_path_factory.mktemp("benchmark")
+    df = benchmark.gerar_sintetico(benchmark.MINIMO_LINHAS_ORCAMENTO)
+    caminho_csv = str(temporario / "dataset.csv")
+    caminho_populacao = str(temporario / "populacao.csv")
+    benchmark.escrever_csv(df, caminho_csv)
+    benchmark.populacao_sintetica(df, 0).to_csv(caminho_populacao, index=False)
+    del df
+
+    ambiente = {**os.environ, "PAINEL_ARTEFATOS": str(temporario / "artefatos"),
+                "PAINEL_CSV": caminho_csv, "PAINEL_POPULACAO": caminho_populacao}
+    codigo = "import json; from painel import benchmark; print(json.dumps(benchmark.medir_memoria()))"
+    processo = subprocess.run([sys.executable, "-c", codigo], env=ambiente, cwd=DIRETORIO_RAIZ,
+                              capture_output=True, text=True)
+    assert processo.returncode == 0, processo.stderr
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("etapa", sorted(benchmark.ORCAMENTO_MEMORIA))
+def test_pico_de_memoria_dentro_do_orcamento(memoria, etapa):
+    medida = memoria["etapas"][etapa]
+    assert medida["razao"] <= benchmark.ORCAMENTO_MEMORIA[etapa], (
+        f"{etapa}: pico {medida['pico_mb']:.1f} MiB = {medida['razao']:.2f}x "
+        f"o dataset de {memoria['tamanho_dataset_mb']:.1f} MiB"
+    )
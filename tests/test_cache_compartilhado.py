@@ -0,0 +1,175 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from painel.cache_compartilhado import CacheCompartilhado, tamanho_objeto
+
+
+class Relogio:
+    """Relógio manual para o tempo de vida dos itens."""
+
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def _contador():
+    chamadas = []
+
+    def construir(valor):
+        def funcao():
+            chamadas.append(valor)
+            return valor
+        return funcao
+
+    return construir, chamadas
+
+
+def test_item_expira_depois_do_ttl():
+    relogio = Relogio()
+    cache = CacheCompartilhado(ttl_segundos=10, relogio=relogio, tamanho=lambda valor: 1)
+    construir, chamadas = _contador()
+
+    assert cache.obter("dados", "v1", construir("a")) == "a"
+    relogio.agora = 10
+    assert cache.obter("dados", "v1", construir("b")) == "a"
+    relogio.agora = 10.5
+    assert cache.obter("dados", "v1", construir("c")) == "c"
+    assert chamadas == ["a", "c"]
+    assert cache.estatisticas()["expiradas"] == 1
+
+
+def test_ttl_por_item():
+    relogio = Relogio()
+    cache = CacheCompartilhado(ttl_segundos=100, relogio=relogio, tamanho=lambda valor: 1)
+    cache.obter("pacote", "v1", lambda: "curto", ttl_segundos=1)
+    relogio.agora = 2
+    assert cache.obter("pacote", "v1", lambda: "novo") == "novo"
+
+
+def test_remove_o_menos_usado_pelo_numero_de_itens():
+    cache = CacheCompartilhado(max_itens=2, relogio=Relogio(), tamanho=lambda valor: 1)
+    construir, chamadas = _contador()
+    cache.obter("t", "a", construir("a"))
+    cache.obter("t", "b", construir("b"))
+    cache.obter("t", "a", construir("a2"))  # "a" passa a ser o mais recente
+    cache.obter("t", "c", construir("c"))  # remove "b"
+
+    assert cache.obter("t", "a", construir("a3")) == "a"
+    assert cache.obter("t", "b", construir("b2")) == "b2"
+    assert chamadas == ["a", "b", "c", "b2"]
+    assert cache.estatisticas()["removidas"] == 2
+
+
+def test_remove_o_menos_usado_pelo_limite_de_bytes():
+    cache = CacheCompartilhado(max_bytes=100, relogio=Relogio(), tamanho=len)
+    cache.obter("t", "a", lambda: "x" * 40)
+    cache.obter("t", "b", lambda: "y" * 40)
+    cache.obter("t", "c", lambda: "z" * 40)  # 120 bytes: sai "a"
+
+    estatisticas = cache.estatisticas()
+    assert estatisticas["itens"] == 2
+    assert estatisticas["bytes"] == 80
+    assert cache.obter("t", "a", lambda: "novo") == "novo"
+
+
+def test_item_maior_que_o_limite_fica_sozinho():
+    cache = CacheCompartilhado(max_bytes=10, relogio=Relogio(), tamanho=len)
+    cache.obter("t", "a", lambda: "x" * 5)
+    assert cache.obter("t", "b", lambda: "y" * 50) == "y" * 50
+    assert cache.estatisticas()["itens"] == 1
+    assert cache.obter("t", "b", lambda: "outro") == "y" * 50
+
+
+def test_chaves_normalizadas():
+    cache = CacheCompartilhado(relogio=Relogio(), tamanho=lambda valor: 1)
+    cache.obter("figura", {"estados": ["SP", "ES"], "anos": [np.int16(2018)]}, lambda: 1)
+    assert cache.obter("figura", {"anos": [2018], "estados": ["ES", "SP"]}, lambda: 2) == 1
+
+
+def test_mesma_chave_simultanea_constroi_uma_vez():
+    cache = CacheCompartilhado(relogio=Relogio(), tamanho=lambda valor: 1)
+    n_threads = 8
+    barreira = threading.Barrier(n_threads)
+    chamadas = []
+
+    def construir():
+        chamadas.append(1)
+        time.sleep(0.2)  # as outras threads chegam durante a construção
+        return "valor"
+
+    resultados = []
+
+    def sessao():
+        barreira.wait()
+        resultados.append(cache.obter("dados", "v1", construir))
+
+    threads = [threading.Thread(target=sessao) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(chamadas) == 1
+    assert resultados == ["valor"] * n_threads
+    estatisticas = cache.estatisticas()
+    assert estatisticas["faltas"] + estatisticas["acertos"] == n_threads
+    assert estatisticas["esperas"] + estatisticas["acertos"] == n_threads - 1
+
+
+def test_falha_na_construcao_libera_a_chave():
+    cache = CacheCompartilhado(relogio=Relogio(), tamanho=lambda valor: 1)
+    comecou, liberar = threading.Event(), threading.Event()
+
+    def construir_com_falha():
+        comecou.set()
+        liberar.wait(5)
+        raise RuntimeError("falhou")
+
+    erros, resultados = [], []
+
+    def primeira():
+        try:
+            cache.obter("dados", "v1", construir_com_falha)
+        except RuntimeError as erro:
+            erros.append(erro)
+
+    def segunda():
+        resultados.append(cache.obter("dados", "v1", lambda: "ok"))
+
+    t1 = threading.Thread(target=primeira)
+    t1.start()
+    comecou.wait(5)
+    t2 = threading.Thread(target=segunda)
+    t2.start()
+    time.sleep(0.1)  # a segunda espera a construção da primeira
+    liberar.set()
+    t1.join(5)
+    t2.join(5)
+
+    assert len(erros) == 1
+    assert resultados == ["ok"]
+    assert cache.obter("dados", "v1", lambda: "nunca") == "ok"
+    assert not cache._construcoes
+
+
+def test_falha_nao_deixa_item_no_cache():
+    cache = CacheCompartilhado(relogio=Relogio(), tamanho=lambda valor: 1)
+
+    def falhar():
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        cache.obter("dados", "v1", falhar)
+    assert cache.obter("dados", "v1", lambda: "depois") == "depois"
+
+
+def test_tamanho_de_views_conta_os_proprios_bytes():
+    base = np.zeros(1000)
+    assert tamanho_objeto(base[:10]) == 80
+    somente_leitura = np.frombuffer(bytes(800), dtype="float64")
+    assert tamanho_objeto(somente_leitura) == 800
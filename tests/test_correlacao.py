@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from painel import correlacao
+
+N_MESES = 40
+
+
+@pytest.fixture(scope="module")
+def series():
+    """Clima (2 estados x 3 variáveis x meses) e casos (2 estados x meses), com buracos.
+
+    O segundo estado só tem casos em 8 meses: com defasagens grandes, sobram
+    menos pares que MINIMO_PARES.
+    """
+    rng = np.random.default_rng(0)
+    clima = rng.normal(size=(2, 3, N_MESES))
+    clima[rng.random(clima.shape) < 0.1] = np.nan
+    casos = rng.poisson(5, size=(2, N_MESES)).astype("float64")
+    casos[0, rng.random(N_MESES) < 0.1] = np.nan
+    casos[1, :] = np.nan
+    casos[1, 2:10] = rng.poisson(5, 8)
+    # Empates, para o posto médio do Spearman
+    casos[0, ::5] = 3
+    return clima, casos, correlacao.correlacoes_defasadas(clima, casos)
+
+
+CELULAS = [(0, v, d) for v in range(3) for d in correlacao.DEFASAGENS] + [(1, 0, 0), (1, 2, 2)]
+
+
+@pytest.mark.parametrize("estado, variavel, defasagem", CELULAS)
+def test_igual_a_shift_do_pandas(series, estado, variavel, defasagem):
+    clima, casos, medidas = series
+    x = pd.Series(clima[estado, variavel]).shift(defasagem)
+    y = pd.Series(casos[estado])
+    pares = int((x.notna() & y.notna()).sum())
+
+    assert medidas["pares"][estado, variavel, defasagem] == pares
+    for metodo in ("pearson", "spearman"):
+        obtido = medidas[metodo][estado, variavel, defasagem]
+        if pares < correlacao.MINIMO_PARES:
+            assert np.isnan(obtido)
+        else:
+            assert obtido == pytest.approx(x.corr(y, method=metodo), abs=1e-10)
+
+
+def test_poucos_pares_viram_nan(series):
+    _, _, medidas = series
+    poucos = medidas["pares"] < correlacao.MINIMO_PARES
+    assert poucos.any()  # o segundo estado nas defasagens maiores
+    assert np.isnan(medidas["pearson"][poucos]).all()
+    assert np.isnan(medidas["spearman"][poucos]).all()
+    assert np.isfinite(medidas["pearson"][~poucos]).all()
+
+
+def test_defasagem_recupera_relacao_atrasada():
+    """Casos que repetem o clima de 3 meses antes têm correlação 1 na defasagem 3."""
+    rng = np.random.default_rng(1)
+    clima = rng.normal(size=(1, 1, N_MESES))
+    casos = np.full((1, N_MESES), np.nan)
+    casos[0, 3:] = 2 * clima[0, 0, :-3] + 1
+    medidas = correlacao.correlacoes_defasadas(clima, casos, defasagens=[0, 3, 5])
+    assert medidas["pearson"][0, 0, 1] == pytest.approx(1.0)
+    assert medidas["spearman"][0, 0, 1] == pytest.approx(1.0)
+    assert abs(medidas["pearson"][0, 0, 0]) < 0.9
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from painel import calculos, cubo
+
+from conftest import ANOS, ESTADOS
+
+@pytest.fixture(scope="module")
+def cubo_dados(dataset):
+    return cubo.construir_cubo(dataset, somas=["Casos_Total", "Obitos_Total"], medias=["TEMPERATURA"])
+
+
+def _mascara(df, estados, anos, mes_inicio, mes_fim):
+    return (df["ESTADO"].astype(str).isin(estados) & df["ANO_IS"].isin(anos)
+            & df["MES_IS"].between(mes_inicio, mes_fim))
+
+
+def _selecoes():
+    rng = np.random.default_rng(1)
+    selecoes = [
+        (ESTADOS, ANOS, 1, 12),
+        (["ES"], [2015], 1, 1),
+        (["SP"], [2018], 12, 12),
+        (["MG", "RJ"], [2016, 2017], 3, 6),  # 2017 não existe no cubo
+        (["XX", "ES"], ANOS, 2, 11),  # XX não existe no cubo
+        (["AC"], [2014], 1, 12),  # recorte vazio
+    ]
+    for _ in range(30):
+        estados = list(rng.choice(ESTADOS, rng.integers(1, len(ESTADOS) + 1), replace=False))
+        anos = [int(a) for a in rng.choice(ANOS + [2017], rng.integers(1, 5), replace=False)]
+        mes_inicio = int(rng.integers(1, 13))
+        selecoes.append((estados, anos, mes_inicio, int(rng.integers(mes_inicio, 13))))
+    return selecoes
+
+
+@pytest.mark.parametrize("estados, anos, mes_inicio, mes_fim", _selecoes())
+def test_totais_batem_com_mascara_do_pandas(dataset, cubo_dados, estados, anos, mes_inicio, mes_fim):
+    esperado = dataset[_mascara(dataset, estados, anos, mes_inicio, mes_fim)]
+    resultado = calculos.totais(calculos.filtrar(cubo_dados, estados, anos, mes_inicio, mes_fim))
+    assert resultado["casos"] == esperado["Casos_Total"].sum()
+    assert resultado["obitos"] == esperado["Obitos_Total"].sum()
+
+
+@pytest.mark.parametrize("estados, anos, mes_inicio, mes_fim", _selecoes())
+def test_celulas_batem_com_mascara_do_pandas(dataset, cubo_dados, estados, anos, mes_inicio, mes_fim):
+    esperado = (dataset[_mascara(dataset, estados, anos, mes_inicio, mes_fim)]
+                .groupby(["ESTADO", "ANO_IS", "MES_IS"], observed=True)
+                .agg(Casos_Total=("Casos_Total", "sum"), TEMPERATURA=("TEMPERATURA", "mean"))
+                .reset_index())
+    fatias = calculos.filtrar(cubo_dados, estados, anos, mes_inicio, mes_fim)
+    obtido = (cubo.agregar(fatias["mensal"], cubo.CHAVES, ["Casos_Total"], ["TEMPERATURA"])
+              .sort_values(cubo.CHAVES))
+
+    assert len(obtido) == len(esperado)
+    np.testing.assert_array_equal(obtido["ESTADO"].astype(str), esperado["ESTADO"].astype(str))
+    np.testing.assert_array_equal(obtido["ANO_IS"], esperado["ANO_IS"])
+    np.testing.assert_array_equal(obtido["MES_IS"], esperado["MES_IS"])
+    np.testing.assert_array_equal(obtido["Casos_Total"], esperado["Casos_Total"])
+    np.testing.assert_allclose(obtido["TEMPERATURA"], esperado["TEMPERATURA"], rtol=1e-5)
+
+
+def test_casos_por_estado_no_ano_inteiro_usa_o_rollup(dataset, cubo_dados):
+    fatias = calculos.filtrar(cubo_dados, ["ES", "SP"], [2016, 2018])
+    assert fatias["totais"].index.names == ["ESTADO", "ANO_IS"]
+    obtido = calculos.casos_por_estado(fatias).set_index("ESTADO")["Casos_Total"]
+    mascara = _mascara(dataset, ["ES", "SP"], [2016, 2018], 1, 12)
+    esperado = dataset[mascara].groupby("ESTADO", observed=True)["Casos_Total"].sum()
+    pd.testing.assert_series_equal(obtido.sort_index(), esperado.rename_axis("ESTADO").sort_index(),
+                                   check_dtype=False, check_index_type=False, check_categorical=False)
+
+
+def _periodos(df):
+    return df["ANO_IS"].astype("int64") * 12 + df["MES_IS"].astype("int64") - 1
+
+
+def _divisoes(df):
+    periodos = _periodos(df)
+    ultimo = periodos == periodos.max()
+    # Último mês, com algumas linhas caindo em células que já existem
+    yield df[~ultimo], pd.concat([df[ultimo], df[~ultimo].tail(20)])
+    # Meses no meio da série
+    meio = periodos.isin(periodos.drop_duplicates().sort_values().iloc[10:14])
+    yield df[~meio], df[meio]
+    # Estado que ainda não estava no cubo
+    novo = df["ESTADO"].astype(str) == "AC"
+    yield df[~novo], df[novo]
+
+
+@pytest.mark.parametrize("caso", range(3))
+def test_atualizar_cubo_igual_a_reconstruir(dataset, caso):
+    historico, lote = list(_divisoes(dataset))[caso]
+    atualizado = cubo.atualizar_cubo(cubo.construir_cubo(historico), lote)
+    esperado = cubo.construir_cubo(pd.concat([historico, lote]))
+
+    assert atualizado["estados"] == esperado["estados"]
+    assert atualizado["anos"] == esperado["anos"]
+    for nivel in ["estado_ano_mes", "estado_ano"]:
+        indice = atualizado[nivel]
+        pd.testing.assert_frame_equal(indice["tabela"].sort_index(), esperado[nivel]["tabela"].sort_index())
+        # Eixo de períodos ordenado e coerente com a tabela, bitmaps por estado
+        np.testing.assert_array_equal(indice["periodos"], np.sort(indice["periodos"]))
+        anos = indice["tabela"].index.get_level_values("ANO_IS").to_numpy(dtype="int64")
+        assert (indice["periodos"] // 12 == anos).all()
+        siglas = indice["tabela"].index.get_level_values("ESTADO").astype(str).to_numpy()
+        assert sorted(indice["bitmaps"]) == sorted(esperado[nivel]["bitmaps"])
+        for estado, bitmap in indice["bitmaps"].items():
+            np.testing.assert_array_equal(bitmap, siglas == estado)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from painel import populacao
+
+
+@pytest.fixture
+def tabela(tmp_path):
+    caminho = tmp_path / "populacao.csv"
+    caminho.write_text(
+        "ESTADO,ANO_IS,POPULACAO\n"
+        "ES,2010,100\n"
+        "ES,2014,500\n"
+        "MG,2012,1000\n"
+    )
+    return populacao.carregar_populacao(str(caminho))
+
+
+def _por_linha(tabela, pares):
+    df = pd.DataFrame(pares, columns=["ESTADO", "ANO_IS"])
+    return populacao.populacao_por_linha(df, tabela)
+
+
+def test_ano_faltando_usa_o_ano_mais_proximo(tabela):
+    # 2011 está mais perto de 2010, 2013 de 2014 e 2012 empata (fica o anterior)
+    resultado = _por_linha(tabela, [("ES", 2011), ("ES", 2012), ("ES", 2013)])
+    np.testing.assert_array_equal(resultado, [100, 100, 500])
+
+
+def test_anos_fora_da_tabela_usam_o_extremo(tabela):
+    resultado = _por_linha(tabela, [("ES", 2005), ("ES", 2020), ("MG", 2010), ("MG", 2016)])
+    np.testing.assert_array_equal(resultado, [100, 500, 1000, 1000])
+
+
+def test_ano_presente_usa_o_proprio_valor(tabela):
+    np.testing.assert_array_equal(_por_linha(tabela, [("ES", 2014), ("MG", 2012)]), [500, 1000])
+
+
+def test_estado_desconhecido_recebe_nan(tabela):
+    resultado = _por_linha(tabela, [("XX", 2012), ("ES", 2010)])
+    assert np.isnan(resultado[0])
+    assert resultado[1] == 100
+
+
+def test_pares_repetidos_sao_rejeitados(tmp_path):
+    caminho = tmp_path / "populacao.csv"
+    caminho.write_text("ESTADO,ANO_IS,POPULACAO\nES,2010,100\nES,2010,200\n")
+    with pytest.raises(ValueError):
+        populacao.carregar_populacao(str(caminho))
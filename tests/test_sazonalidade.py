@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from painel import cubo, sazonalidade
+
+
+def _periodos(df):
+    return df["ANO_IS"].astype("int64") * 12 + df["MES_IS"].astype("int64") - 1
+
+
+def _divisoes(df):
+    # Dois meses novos, com algumas linhas caindo em células que já existem. Só
+    # 2015 e 2016: com 2017 de fora, 2018 não tem nenhum mês com média móvel
+    continuos = df[df["ANO_IS"] <= 2016]
+    ultimos = _periodos(continuos) >= _periodos(continuos).max() - 1
+    yield continuos[~ultimos], pd.concat([continuos[ultimos], continuos[~ultimos].tail(20)])
+    periodos = _periodos(df)
+    # Meses no meio da série (a média móvel muda dos dois lados)
+    meio = periodos.isin(periodos.drop_duplicates().sort_values().iloc[10:14])
+    yield df[~meio], df[meio]
+    # Só um estado recebe o mês novo: os outros ficam sem dados nele
+    novo = (periodos == periodos.max()) & (df["ESTADO"].astype(str) != "ES")
+    yield df[~novo], df[novo]
+    # Estado que ainda não estava na camada: reconstrução a partir do cubo
+    estado_novo = df["ESTADO"].astype(str) == "AC"
+    yield df[~estado_novo], df[estado_novo]
+
+
+@pytest.mark.parametrize("caso", range(4))
+def test_atualizar_igual_a_reconstruir(dataset, caso):
+    historico, lote = list(_divisoes(dataset))[caso]
+    cubo_antigo = cubo.construir_cubo(historico)
+    cubo_novo = cubo.atualizar_cubo(cubo_antigo, lote)
+    atualizada = sazonalidade.atualizar(sazonalidade.construir(cubo_antigo), lote, cubo_novo)
+    esperada = sazonalidade.construir(cubo.construir_cubo(pd.concat([historico, lote])))
+
+    assert atualizada["estados"] == esperada["estados"]
+    assert atualizada["variaveis"] == esperada["variaveis"]
+    for chave in ["periodos", "verao", "somas", "contagens", *sazonalidade.COMPONENTES]:
+        np.testing.assert_allclose(atualizada[chave], esperada[chave], rtol=1e-9, equal_nan=True,
+                                   err_msg=chave)
+    for nome, valores in esperada["estatisticas"].items():
+        np.testing.assert_allclose(atualizada["estatisticas"][nome], valores, rtol=1e-9, equal_nan=True,
+                                   err_msg=nome)
+
+
+def test_atualizar_nao_altera_a_camada_anterior(dataset):
+    historico, lote = next(_divisoes(dataset))
+    cubo_antigo = cubo.construir_cubo(historico)
+    camada = sazonalidade.construir(cubo_antigo)
+    copia = {chave: valores.copy() for chave, valores in camada.items() if isinstance(valores, np.ndarray)}
+    sazonalidade.atualizar(camada, lote, cubo.atualizar_cubo(cubo_antigo, lote))
+    for chave, valores in copia.items():
+        np.testing.assert_array_equal(camada[chave], valores)